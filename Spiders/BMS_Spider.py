@@ -1,94 +1,75 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import time
-import os
+from Spiders.base_spider import Field, StoreSpider
+
+# Function to read the model from the title ("... | QA55Q60" -> "QA55Q60", otherwise its first word)
+def model_from_title(product):
+    product_title = product['Title']
+    if product_title is None:
+        return None
+    if "|" in product_title:
+        return product_title.split('|')[-1].strip()
+    return product_title.split()[0] if product_title else "N/A"
+
+# Function to remove the currency " JD" and the thousands separators to keep only the numeric value
+def price_value(price):
+    return price.replace(" JD", "").replace(",", "")
+
+SPIDER = StoreSpider(
+    store='BMS',
+    csv_file='BMSproducts.csv',
+    parser='html.parser',
+    listing_url='https://bmsmena.com/search?type=product&options%5Bunavailable_products%5D=last&options%5Bprefix%5D=none&q={query}&page={page}',
+    product_links='div.product-collection__title a',
+    fields={
+        'Title': Field('h4'),
+        'Model': Field(derive=model_from_title),
+        'Brand': Field(value='Samsung'),  # Placeholder for now
+        'Category': Field(value='N/A'),  # Placeholder for now
+        'Price': Field('span#js-product-price', clean=price_value),
+        'Image URL': Field('img.main-image', attr='data-zoom-image', clean=lambda src: "https:" + src),
+    },
+    listing_cards='div.product-collection',
+    listing_fields={
+        'Title': Field('div.product-collection__title h4'),
+        'Model': Field(derive=model_from_title),
+        'Brand': Field(value='Samsung'),
+        'Category': Field(value='N/A'),
+        'Price': Field('div.product-collection__price span.price', clean=price_value),
+        'Image URL': Field('div.product-collection__image img', attr='src', clean=lambda src: "https:" + src if src.startswith('//') else src),
+    },
+)
+
+# Function to read the product URLs of a search results page
+def parse_product_urls_bmsmena(soup):
+    return SPIDER.parse_product_urls(soup, 'https://bmsmena.com')
+
+# Function to yield the product URLs of each search results page, up to max_pages
+def iter_product_urls_bmsmena(search_query, max_pages=5, session=None):
+    return SPIDER.iter_product_urls(search_query, max_pages, session=session)
 
 # Function to get product URLs from the search results page
 def get_product_urls_bmsmena(search_query, max_pages=5, session=None):
-    base_url = f'https://bmsmena.com/search?type=product&options%5Bunavailable_products%5D=last&options%5Bprefix%5D=none&q={search_query}'
-    product_urls = []
-
-    for page in range(1, max_pages + 5):
-        url = base_url + f'&page={page}'
-
-        response = session.get(url) if session else requests.get(url)
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Find all product links
-        product_containers = soup.find_all('div', class_='product-collection__title')
-
-        if not product_containers:
-            break  # Stop if no products are found
-
-        for container in product_containers:
-            link_tag = container.find('a')
-            if link_tag and 'href' in link_tag.attrs:
-                product_url = "https://bmsmena.com" + link_tag['href']
-                product_urls.append(product_url)
-
-        time.sleep(1)  # Pause to avoid overloading the server
+    return SPIDER.product_urls(search_query, max_pages, session=session)
 
-    return product_urls
+# Function to download a product page
+def fetch_product_page_bmsmena(url, session=None):
+    return SPIDER.fetch_product_page(url, session=session)
 
 # Function to scrape details from a single product page
 def scrape_product_details_bmsmena(url, session=None):
-    response = session.get(url) if session else requests.get(url)
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    # Extract Product Title
-    name_tag = soup.find('h4')
-    product_title = name_tag.get_text(strip=True) if name_tag else "N/A"
-
-    # Extract Product Model
-    if "|" in product_title:
-        product_model = product_title.split('|')[-1].strip()
-    else:
-        product_model = product_title.split()[0] if product_title else "N/A"
-
-    # Extract Price
-    price_tag = soup.find('span', id='js-product-price')
-    product_price = price_tag.get_text(strip=True) if price_tag else "N/A"
-
-    # Remove the currency " JD" to keep only the numeric value
-    if product_price != "N/A":
-        product_price = product_price.replace(" JD", "").replace(",", "")
-
-    # Extract Image URL
-    image_tag = soup.find('img', class_='main-image')
-    image_url = "https:" + image_tag['data-zoom-image'] if image_tag and 'data-zoom-image' in image_tag.attrs else "N/A"
-    store = 'BMS'
-
-    return {
-        'Title': product_title,
-        'Model': product_model,
-        'Brand': 'Samsung',  # Placeholder for now
-        'Category': 'N/A',  # Placeholder for now
-        'Price': product_price,
-        'Image URL': image_url,
-        'Product URL': url,
-        'Store': store,
-    }
-
-# Main function to scrape multiple products and save them to a unified CSV file
-def scrape_multiple_products_bmsmena(search_query, max_pages=5, session=None):
-    product_urls = get_product_urls_bmsmena(search_query, max_pages, session=session)
-    all_products = []
+    return SPIDER.scrape_product(url, session=session)
 
-    for url in product_urls:
-        product_info = scrape_product_details_bmsmena(url, session=session)
-        all_products.append(product_info)
-        time.sleep(1)  # Pause to avoid overloading the server
+# Function to read the details of a downloaded product page
+def parse_product_details_bmsmena(url, content):
+    return SPIDER.parse_product(url, content)
 
-    # Save data to a unified CSV file that overwrites existing files
-    scraped_data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Scraped_Data'))  # Path to the Scraped_Data folder
-    os.makedirs(scraped_data_dir, exist_ok=True)  # Create the folder if it doesn't exist
-    csv_filename = os.path.join(scraped_data_dir, 'BMSproducts.csv')
+# Function to scrape BMS product pages one by one as they are fetched, max_workers pages at a time
+def iter_products_bmsmena(search_query, max_pages=5, session=None, max_workers=1, recrawl=None, dedup=None):
+    return SPIDER.iter_products(search_query, max_pages, session=session, max_workers=max_workers, recrawl=recrawl, dedup=dedup)
 
-    df = pd.DataFrame(all_products)
-    df.to_csv(csv_filename, index=False)
+# Function to scrape multiple product pages
+def scrape_multiple_products_bmsmena(search_query, max_pages=5, session=None, max_workers=1):
+    return list(iter_products_bmsmena(search_query, max_pages, session=session, max_workers=max_workers))
 
-def CrawlBMS(term, pages=1, session=None):
-    search_query = term  # Example search term
-    max_pages = pages  # Set the maximum number of pages to scrape
-    scrape_multiple_products_bmsmena(search_query, max_pages, session=session)
+def CrawlBMS(term, pages=1, session=None, max_workers=1, sink=None, recrawl=None, dedup=None, fast=False, errors=None):
+    # Stream products into the sink, or save them to a unified CSV file that overwrites existing files
+    SPIDER.crawl(term, pages, session=session, max_workers=max_workers, sink=sink, recrawl=recrawl, dedup=dedup, fast=fast, errors=errors)
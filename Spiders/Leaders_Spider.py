@@ -1,88 +1,71 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd 
-import os
+from brand_resolver import get_brand_resolver
+from Spiders.base_spider import BROWSER_HEADERS, Field, StoreSpider
+from structured_data import SCHEMA_PATHS
 
-# Data storage for all products
-all_products = []
+# Function to get the brand from the title (a known brand name at its start, otherwise its first word)
+def brand_from_title(product):
+    return get_brand_resolver().from_title(product['Title']) if product['Title'] else None
+
+SPIDER = StoreSpider(
+    store='Leaders',
+    csv_file='LeadersProducts.csv',
+    parser='html.parser',
+    first_page_url='https://leaders.jo/en/?s={query}&post_type=product&dgwt_wcas=1&lang=en',
+    listing_url='https://leaders.jo/en/page/{page}/?s={query}&post_type=product&dgwt_wcas=1&lang=en',
+    product_links='a.woocommerce-LoopProduct-link',
+    headers=BROWSER_HEADERS,
+    fields={
+        'Title': Field('h1.product_title.entry-title', json_ld=SCHEMA_PATHS['Title']),
+        'Model': Field('span:-soup-contains("Model Number:") > strong', json_ld=SCHEMA_PATHS['Model']),
+        'Brand': Field(derive=brand_from_title),
+        'Price': Field('ins.woocommerce-Price-amount', 'span.woocommerce-Price-amount.amount', json_ld=SCHEMA_PATHS['Price']),  # Sale price first
+        'Image URL': Field('a[href]', attr='href', json_ld=SCHEMA_PATHS['Image URL']),
+    },
+    listing_cards='li.product, div.product-grid-item',
+    listing_fields={
+        'Title': Field('.woocommerce-loop-product__title', 'h3.wd-entities-title a'),
+        'Brand': Field(derive=brand_from_title),
+        'Price': Field('span.price ins span.woocommerce-Price-amount', 'span.price span.woocommerce-Price-amount'),
+        'Image URL': Field('img', attr='src'),
+    },
+)
 
 # Function to scrape product details from an individual product page
-def scrape_product_details_leaders(url):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    response = requests.get(url, headers=headers)
-    soup = BeautifulSoup(response.content, 'html.parser')
-    
-    # Extract title
-    #title_tag = soup.find('h1', class_='woocommerce-loop-product__title') or soup.find('h1', class_='product_title entry-title')
-    title_tag = soup.find('h1', class_='product_title entry-title')
-    title = title_tag.get_text(strip=True) if title_tag else "N/A"
-    
-    # Extract price with multiple format options
-    price_tag = soup.find('ins', class_='woocommerce-Price-amount') or soup.find('span', class_='woocommerce-Price-amount amount')
-    price = price_tag.get_text(strip=True) if price_tag else "N/A"
-    
-    # Extract model
-    model_tag = soup.find('span', string=lambda x: x and "Model Number:" in x)
-    model = model_tag.find('strong').get_text(strip=True) if model_tag and model_tag.find('strong') else "N/A"
-    
-    # Extract brand
-    brand = title.split()[0] if title else "N/A"
-    
-    # Extract image URL
-    image_tag = soup.find('a', href=True)
-    image_url = image_tag['href'] if image_tag else "N/A"
-    
-    # Return product information
-    return {
-        'Title': title,
-        'Model': model,
-        'Brand': brand,
-        'Price': price,
-        'Image URL': image_url,
-        'Product URL': url,
-        'Store': 'Leaders'
-    }
+def scrape_product_details_leaders(url, session=None):
+    return SPIDER.scrape_product(url, session=session)
+
+# Function to read the product details of a downloaded product page
+def parse_product_details_leaders(url, content):
+    return SPIDER.parse_product(url, content)
+
+# Function to download a product page
+def fetch_product_page_leaders(url, session=None):
+    return SPIDER.fetch_product_page(url, session=session)
+
+# Function to download a search results page
+def fetch_search_page_leaders(search_url, session=None):
+    return SPIDER.fetch(search_url, session=session)
 
-# Function to scrape URLs of products from a search results page
-def scrape_product_urls_leaders(search_url):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    response = requests.get(search_url, headers=headers)
-    soup = BeautifulSoup(response.content, 'html.parser')
-    
-    # Collect product URLs (avoid duplicates by using a set)
-    product_links = set()
-    for a_tag in soup.find_all('a', class_='woocommerce-LoopProduct-link', href=True):
-        product_links.add(a_tag['href'])
-    
-    return list(product_links)
+# Function to read the product URLs of a search results page
+def parse_product_urls_leaders(soup):
+    return SPIDER.parse_product_urls(soup, 'https://leaders.jo/en/')
 
-# Main function to scrape multiple pages and store in a CSV
-def scrape_multiple_products_leaders(search_term, max_pages):
-    base_url = f'https://leaders.jo/en/?s={search_term}&post_type=product&dgwt_wcas=1&lang=en'
-    
-    for page in range(1, max_pages + 1):
-        search_url = base_url if page == 1 else f'https://leaders.jo/en/page/{page}/?s={search_term}&post_type=product&dgwt_wcas=1&lang=en'
-        
-        product_urls = scrape_product_urls_leaders(search_url)
-        for url in product_urls:
-            product_info = scrape_product_details_leaders(url)
-            all_products.append(product_info)
-    
-    # Save data to a unified CSV file that overwrites existing files
-    scraped_data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Scraped_Data'))  # Path to the Scraped_Data folder
-    os.makedirs(scraped_data_dir, exist_ok=True)  # Create the folder if it doesn't exist
-    csv_filename = os.path.join(scraped_data_dir, 'LeadersProducts.csv')  # Correctly create the full path for the CSV
+# Function to yield the product URLs of each search results page, up to max_pages
+def iter_product_urls_leaders(search_term, max_pages, session=None):
+    return SPIDER.iter_product_urls(search_term, max_pages, session=session)
 
-    df = pd.DataFrame(all_products)
-    df.to_csv(csv_filename, mode='w', index=False, header=True)  # Use the full path here
+# Function to scrape product URLs from the search results pages
+def scrape_product_urls_leaders(search_term, max_pages, session=None):
+    return SPIDER.product_urls(search_term, max_pages, session=session)
 
+# Function to scrape Leaders product pages one by one as they are fetched, max_workers pages at a time
+def iter_products_leaders(search_term, max_pages, session=None, max_workers=1, recrawl=None, dedup=None):
+    return SPIDER.iter_products(search_term, max_pages, session=session, max_workers=max_workers, recrawl=recrawl, dedup=dedup)
 
+# Function to scrape multiple product pages
+def scrape_multiple_products_leaders(search_term, max_pages, session=None, max_workers=1):
+    return list(iter_products_leaders(search_term, max_pages, session=session, max_workers=max_workers))
 
-def CrawlLeaders(term, pages = 1):
-    search_term = term
-    max_pages = pages
-    scrape_multiple_products_leaders(search_term, max_pages)
+def CrawlLeaders(term, pages=1, session=None, max_workers=1, sink=None, recrawl=None, dedup=None, fast=False, errors=None):
+    # Stream products into the sink, or save them to a unified CSV file that overwrites existing files
+    SPIDER.crawl(term, pages, session=session, max_workers=max_workers, sink=sink, recrawl=recrawl, dedup=dedup, fast=fast, errors=errors)
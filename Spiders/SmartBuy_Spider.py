@@ -1,98 +1,71 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import json
-import os
+import re
+from Spiders.base_spider import BROWSER_HEADERS, Field, StoreSpider
+
+# Every field is read from the product's JSON-LD; pages without it give no product
+SPIDER = StoreSpider(
+    store='Smart Buy',
+    csv_file='SmartBuyProducts.csv',
+    parser='html.parser',
+    first_page_url='https://smartbuy-me.com/search?type=product&q={query}',
+    listing_url='https://smartbuy-me.com/search?type=product&q={query}&page={page}',
+    product_links='a.product-item__image-wrapper',
+    headers=BROWSER_HEADERS,
+    requires_json_ld=True,
+    fields={
+        'Title': Field(json_ld=[('name',)]),
+        'Model': Field(json_ld=[('offers', 0, 'name'), ('offers', 'name')]),
+        'Brand': Field(json_ld=[('brand', 'name')]),
+        'Category': Field(json_ld=[('category',)]),
+        'Price': Field(json_ld=[('offers', 0, 'price'), ('offers', 'price')]),
+        'Image URL': Field(json_ld=[('image', 'url'), ('image',)]),
+    },
+    # The product cards have everything but the model and the category
+    listing_cards='div.product-item',
+    listing_fields={
+        'Title': Field('a.product-item__title'),
+        'Brand': Field('a.product-item__vendor'),
+        'Price': Field('span.price', clean=lambda price: re.sub(r'[^0-9.]', '', price) or None),  # "Sale priceJOD 249.99" -> "249.99"
+        'Image URL': Field('img.product-item__primary-image', attr='src', clean=lambda src: "https:" + src if src.startswith('//') else src),
+    },
+)
+
+# Function to get the URL of every search results page of a search URL
+def search_pages(search_url):
+    return lambda page: search_url if page == 1 else f"{search_url}&page={page}"  # First page URL, then subsequent page URLs
+
+# Function to read the product URLs of a search results page
+def parse_product_urls(soup):
+    return SPIDER.parse_product_urls(soup, 'https://smartbuy-me.com')
+
+# Function to yield the product URLs of each search results page, up to max_pages
+def iter_product_urls(search_url, max_pages, session=None):
+    return SPIDER.iter_listing(search_pages(search_url), max_pages, session=session)
 
 # Function to scrape product URLs from the search results page
 def scrape_product_urls(search_url, max_pages, session=None):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
-    product_urls = []
-    
-    for page in range(1, max_pages + 1):
-        if page == 1:
-            url = search_url  # First page URL
-        else:
-            url = f"{search_url}&page={page}"  # Subsequent page URLs
-        
-        response = session.get(url, headers=headers) if session else requests.get(url, headers=headers)
-        soup = BeautifulSoup(response.content, 'html.parser')
+    return [url for urls in iter_product_urls(search_url, max_pages, session=session) for url in urls]
 
-        # Find all product links on the page
-        product_links = soup.find_all('a', class_='product-item__image-wrapper')
-        
-        for link in product_links:
-            product_url = "https://smartbuy-me.com" + link['href']
-            product_urls.append(product_url)
-    
-    return product_urls
+# Function to download a product page
+def fetch_product_page(url, session=None):
+    return SPIDER.fetch_product_page(url, session=session)
 
 # Function to scrape JSON-LD data from a product page
 def scrape_json_ld(url, session=None):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    response = session.get(url, headers=headers) if session else requests.get(url, headers=headers)
-    soup = BeautifulSoup(response.content, 'html.parser')
-
-    # Find the JSON-LD script in the page
-    json_ld_tag = soup.find('script', type='application/ld+json')
-    store = 'Smart Buy'
-
-    if json_ld_tag:
-        try:
-            # Parse the JSON data
-            json_data = json.loads(json_ld_tag.string)
+    return SPIDER.scrape_product(url, session=session)
 
-            # Extract product information from the JSON-LD structure
-            product_info = {
-                'Title': json_data.get('name', 'N/A'),
-                'Model': json_data.get('offers', [{}])[0].get('name', 'N/A'),
-                'Brand': json_data.get('brand', {}).get('name', 'N/A'),
-                'Category': json_data.get('category', 'N/A'),
-                'Price': json_data.get('offers', [{}])[0].get('price', 'N/A'),
-                'Image URL': json_data.get('image', {}).get('url', 'N/A') if isinstance(json_data.get('image'), dict) else json_data.get('image'),
-                'Product URL': url,
-                'Store': store
-            }
-            return product_info
-        except json.JSONDecodeError as e:
-            print(f"Error parsing JSON: {e}")
-            return None
-    else:
-        print(f"No JSON-LD data found at {url}")
-        return None
+# Function to read the JSON-LD data of a downloaded product page
+def parse_json_ld(url, content):
+    return SPIDER.parse_product(url, content)
 
+# Function to scrape product pages one by one as they are fetched, max_workers pages at a time
+def iter_products(search_url, max_pages, session=None, max_workers=1, recrawl=None, dedup=None, fast=False):
+    return SPIDER.iter_products(None, max_pages, session=session, max_workers=max_workers, recrawl=recrawl, dedup=dedup,
+                                page_url=search_pages(search_url), fast=fast)
 
 # Function to scrape multiple product pages
-def scrape_multiple_products(search_url, max_pages, session=None):
-    all_products = []
-    
-    # Step 1: Scrape all product URLs from the search results pages
-    product_urls = scrape_product_urls(search_url, max_pages, session=session)
-
-    # Step 2: Scrape each product page for JSON-LD data
-    for url in product_urls:
-        product_info = scrape_json_ld(url, session=session)
-        if product_info:
-            all_products.append(product_info)
-
-    return all_products
-
-def CrawlSmartBuy(term, pages=1, session=None):
-    search_query = term
-    max_pages = pages  # Number of search result pages to scrape
-    search_url = f'https://smartbuy-me.com/search?type=product&q={search_query}'
-
-    products = scrape_multiple_products(search_url, max_pages, session=session)
-
-    # Save data to CSV
-    scraped_data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Scraped_Data'))  # Path to the Scraped_Data folder
-    os.makedirs(scraped_data_dir, exist_ok=True)  # Create the folder if it doesn't exist
-    csv_filename = os.path.join(scraped_data_dir, 'SmartBuyProducts.csv')  # Specify the new filename
+def scrape_multiple_products(search_url, max_pages, session=None, max_workers=1):
+    return list(iter_products(search_url, max_pages, session=session, max_workers=max_workers))
 
-    df = pd.DataFrame(products)
-    df.to_csv(csv_filename, index=False)  # Use the full path here
+def CrawlSmartBuy(term, pages=1, session=None, max_workers=1, sink=None, recrawl=None, dedup=None, fast=False, errors=None):
+    # Stream products into the sink, or save them to Scraped_Data/SmartBuyProducts.csv
+    SPIDER.crawl(term, pages, session=session, max_workers=max_workers, sink=sink, recrawl=recrawl, dedup=dedup, fast=fast, errors=errors)
@@ -0,0 +1,237 @@
+from urllib.parse import urljoin
+from concurrent_fetch import fetch_concurrently
+from html_parser import parse_html, selector_tags
+from paginator import new_product_urls, paginate
+from rate_limiter import polite_get
+from recrawl import product_fetcher
+from sinks import deliver_products
+from structured_data import find_product, read_path
+from url_dedup import clean_url
+
+# Declarative spiders. A store is described by its search URLs, the CSS selector of its product links and
+# how each product field is read from a product page (CSS selectors or JSON-LD paths); StoreSpider does the
+# rest the same way for every store: pagination and prefetch, concurrent product fetches, URL dedup and
+# recrawl selection, parse timing, and delivery into a sink or the store's CSV file. Sessions bring the
+# politeness scheduler, pooled connections, retries and the page cache.
+# Product pages are read from their structured data first (structured_data.py, no DOM); the page is only
+# parsed when a field has to come from its selectors, and then only the elements those selectors start from
+# (html_parser.py, with the spider's parser backend).
+# In fast mode the products are read from the cards of the search results pages, and a product page is
+# only fetched for the products whose card lacks one of the fields asked for (FAST_FIELDS by default).
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+# Fields a listing card must have in fast mode for its product page to be skipped. The model and category
+# are needed too: matching.py and the brand resolver key on model codes.
+FAST_FIELDS = ('Title', 'Price', 'Model', 'Category')
+
+
+# How one product field is read from a product page. json_ld reads the first of the paths (tuples of keys
+# and list indexes, see structured_data.SCHEMA_PATHS) found in the page's schema.org Product; when none is,
+# the first of the CSS selectors that matches is used (its text, or attr); join reads every match and joins
+# their texts; derive computes the value from the fields read before it; value is a constant.
+# clean is applied to what was found in the page's HTML (or derived), json_ld_clean to what was found in
+# its JSON-LD; a JSON-LD value that json_ld_clean turns into None is read from the selectors instead.
+class Field:
+    def __init__(self, *selectors, attr=None, join=None, json_ld=(), derive=None, value=None, clean=None, json_ld_clean=None, default='N/A'):
+        self.selectors = selectors
+        self.attr = attr
+        self.join = join
+        self.json_ld = json_ld
+        self.derive = derive
+        self.value = value
+        self.clean = clean
+        self.json_ld_clean = json_ld_clean
+        self.default = default
+
+    def read_html(self, soup):
+        for selector in self.selectors:
+            if self.join is not None:
+                tags = soup.select(selector)
+                if tags:
+                    return self.join.join(tag.get_text(strip=True) for tag in tags)
+                continue
+            tag = soup.select_one(selector)
+            if tag is None:
+                continue
+            if self.attr is None:
+                return tag.get_text(strip=True)
+            if tag.has_attr(self.attr):
+                return tag[self.attr]
+        return None
+
+    # Function to read the field from the page's schema.org Product, already cleaned; None when it isn't there
+    def read_json_ld(self, data):
+        if not self.json_ld or data is None:
+            return None
+        found = read_path(data, self.json_ld)
+        if found is not None and self.json_ld_clean is not None:
+            found = self.json_ld_clean(found)
+        return found
+
+    # Function to read the field without the DOM or JSON-LD; None when it needs the page's selectors (or has no value)
+    def read_structured(self, product):
+        if self.value is not None:
+            return self.value
+        if self.derive is not None:
+            return self.derive(product)
+        return None
+
+    def finish(self, found):
+        if found is None:
+            return self.default
+        return self.clean(found) if self.clean else found
+
+
+class StoreSpider:
+    # store: the 'Store' value of its products; csv_file: its file in Scraped_Data.
+    # listing_url: search URL template with {query} and {page}; first_page_url: template for page 1 when it differs.
+    # product_links: CSS selector of the product links on a search results page.
+    # fields: product field name -> Field, read in order. requires_json_ld: pages without Product JSON-LD give no product.
+    # fast_path=False parses every product page up front, like the spiders did before structured data.
+    # parser: html_parser backend ('lxml', 'html.parser'), html.parser by default.
+    # listing_cards: CSS selector of a product card on a search results page; listing_fields: product field name ->
+    # Field read inside the card (fast mode).
+    def __init__(self, store, csv_file, listing_url, product_links, fields, first_page_url=None,
+                 headers=None, requires_json_ld=False, fast_path=True, listing_cards=None, listing_fields=None, parser=None):
+        self.store = store
+        self.csv_file = csv_file
+        self.listing_url = listing_url
+        self.first_page_url = first_page_url
+        self.product_links = product_links
+        self.fields = fields
+        self.headers = headers
+        self.requires_json_ld = requires_json_ld
+        self.reads_json_ld = any(field.json_ld for field in fields.values())
+        self.fast_path = fast_path
+        self.listing_cards = listing_cards
+        self.listing_fields = listing_fields or {}
+        self.parser = parser
+        # Product pages are parsed only as far as the field selectors need (None: the whole page)
+        self.parse_only = selector_tags([selector for field in fields.values() for selector in field.selectors])
+
+    def fetch(self, url, session=None):
+        return session.get(url, headers=self.headers) if session else polite_get(url, headers=self.headers)
+
+    def page_url(self, query, page):
+        template = self.first_page_url if page == 1 and self.first_page_url else self.listing_url
+        return template.format(query=query, page=page)
+
+    # Function to read the product URLs of a search results page (in page order, without repeats)
+    def parse_product_urls(self, soup, base_url):
+        product_urls = {}
+        for link in soup.select(self.product_links):
+            if link.get('href'):
+                product_urls[urljoin(base_url, link['href'])] = None
+        return list(product_urls)
+
+    # Function to read the products of a search results page from its cards, as far as the cards show them.
+    # Fields a card doesn't have are None.
+    def parse_listing_products(self, soup, base_url):
+        products = {}
+        for card in soup.select(self.listing_cards) if self.listing_cards else []:
+            link = card.select_one(self.product_links)
+            if link is None or not link.get('href'):
+                continue
+            product = {}
+            for name in self.fields:
+                field = self.listing_fields.get(name)
+                found = field.read_structured(product) if field is not None else None
+                if found is None and field is not None and field.selectors:
+                    found = field.read_html(card)
+                product[name] = None if found is None else field.finish(found)
+            product['Product URL'] = urljoin(base_url, link['href'])
+            product['Store'] = self.store
+            products.setdefault(product['Product URL'], product)
+        return list(products.values())
+
+    # Function to yield the product URLs of each search results page; page_url(page) gives the page URLs.
+    # parse(soup, base_url) reads the URLs of a page (parse_product_urls by default).
+    def iter_listing(self, page_url, max_pages, session=None, parse=None):
+        base_url = page_url(1)
+        parse = parse or self.parse_product_urls
+        return paginate(lambda url: self.fetch(url, session), page_url, lambda soup: parse(soup, base_url), max_pages, parser=self.parser)
+
+    def iter_product_urls(self, query, max_pages, session=None):
+        return self.iter_listing(lambda page: self.page_url(query, page), max_pages, session)
+
+    def product_urls(self, query, max_pages, session=None):
+        return [url for urls in self.iter_product_urls(query, max_pages, session) for url in urls]
+
+    def fetch_product_page(self, url, session=None):
+        return self.fetch(url, session).content
+
+    # Function to read the product on a downloaded product page (None when the page has none)
+    def parse_product(self, url, content):
+        data = find_product(content) if self.reads_json_ld else None
+        if data is None and self.requires_json_ld:
+            print(f"No JSON-LD data found at {url}")
+            return None
+
+        soup = None if self.fast_path else parse_html(content, self.parser, self.parse_only)
+        product = {}
+        for name, field in self.fields.items():
+            found = field.read_json_ld(data)
+            if found is not None:
+                product[name] = found  # Structured values don't go through the HTML clean
+                continue
+            found = field.read_structured(product)
+            if found is None and field.selectors:
+                if soup is None:
+                    soup = parse_html(content, self.parser, self.parse_only)  # Only pages missing a field are parsed
+                found = field.read_html(soup)
+            product[name] = field.finish(found)
+        product['Product URL'] = url
+        product['Store'] = self.store
+        return product
+
+    def scrape_product(self, url, session=None):
+        return self.parse_product(url, self.fetch_product_page(url, session))
+
+    # Function to scrape product pages one by one as they are fetched, max_workers pages at a time.
+    # Product URLs are dispatched page by page while the next search results page downloads.
+    # page_url(page) overrides the search URLs built from query. fast=True (or the tuple of fields the products
+    # need, FAST_FIELDS by default) reads the products from the search results pages; see iter_listing_products.
+    # errors: list the product pages that fail are added to (see fetch_concurrently); None raises their errors.
+    def iter_products(self, query, max_pages, session=None, max_workers=1, recrawl=None, dedup=None, page_url=None, fast=False, errors=None):
+        page_url = page_url or (lambda page: self.page_url(query, page))
+        fetch_product = product_fetcher(lambda url: self.fetch_product_page(url, session), self.parse_product, recrawl)
+        if fast:
+            return self.iter_listing_products(page_url, max_pages, session, max_workers, recrawl, dedup, fetch_product,
+                                              FAST_FIELDS if fast is True else fast, errors)
+        product_urls = new_product_urls(self.iter_listing(page_url, max_pages, session), dedup, recrawl)
+        return fetch_concurrently(fetch_product, product_urls, max_workers, errors)
+
+    # Function to build the products from the search results pages. Products whose card lacks one of the fields
+    # in needed have their product page fetched (max_workers at a time); its fields win, the card fills its gaps.
+    def iter_listing_products(self, page_url, max_pages, session, max_workers, recrawl, dedup, fetch_product, needed, errors=None):
+        cards = {}  # Cleaned product URL -> product read from its card
+
+        def parse(soup, base_url):
+            products = self.parse_listing_products(soup, base_url)
+            for product in products:
+                cards[clean_url(product['Product URL'])] = product
+            return [product['Product URL'] for product in products]
+
+        def product_from_card(url):
+            card = cards[clean_url(url)]
+            if all(card.get(name) is not None for name in needed):
+                product = {name: self.fields[name].default if value is None else value for name, value in card.items()}
+                product['Product URL'] = url  # The link as dedup cleaned it, like the product pages get
+                return product
+            product = fetch_product(url)
+            if product is not None:
+                for name, value in card.items():
+                    if product.get(name) == 'N/A' and value is not None:
+                        product[name] = value
+            return product
+
+        product_urls = new_product_urls(self.iter_listing(page_url, max_pages, session, parse), dedup, recrawl)
+        return fetch_concurrently(product_from_card, product_urls, max_workers, errors)
+
+    # Function to crawl a search: stream the products into the sink, or save them to the store's CSV file
+    def crawl(self, query, max_pages=1, session=None, max_workers=1, sink=None, recrawl=None, dedup=None, fast=False, errors=None):
+        products = self.iter_products(query, max_pages, session=session, max_workers=max_workers, recrawl=recrawl, dedup=dedup, fast=fast,
+                                      errors=errors)
+        deliver_products(products, sink, self.csv_file)
@@ -1,108 +1,167 @@
-from flask import Flask, request, jsonify
-from run_spiders import RunSpiders
-from data_processing import process_and_save
-from database_setup import db, Product
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, stream_with_context
+from pipeline import run_pipeline
+from http_cache import get_shared_cache
+from jobs import JobManager
+from metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY
+from recrawl import DEFAULT_MAX_AGE
+from response_cache import ResponseCache
+from search_index import apply_search, search_rank
+from result_sets import filter_job_results, release_products
+from pagination import PaginationError, STREAM_FORMATS, fetch_page, parse_page_args, stream_rows
+from database_setup import db, Product, products_stamp, upgrade_schema
 import os
-from sqlalchemy import func, or_
+from sqlalchemy import String, func, type_coerce
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///products.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+DATABASE_URI = 'sqlite:///products.db'
+
+api = Blueprint('api', __name__)  # The routes below; create_app serves them from a database
+# Read endpoints are cached until the next write, here or in a crawl worker; every app keeps its database's responses apart
+response_cache = ResponseCache(stamp=products_stamp, scope=lambda: current_app.config['SQLALCHEMY_DATABASE_URI'])
 
 def clear_database():
     try:
-        # Delete products where saved is False or saved is null
-        rows_to_delete = db.session.query(Product).filter(
-            or_(Product.saved == False, Product.saved == None)
-        )
-        num_rows_deleted = rows_to_delete.delete(synchronize_session=False)  # Optimized deletion
-        db.session.commit()
+        # Delete unsaved products, except the results of jobs that are still running or can still be looked up
+        num_rows_deleted = release_products(scrape_jobs.job_ids())
+        response_cache.invalidate()
         print(f"Deleted {num_rows_deleted} rows from the database.")
     except Exception as e:
         db.session.rollback()
         print(f"Failed to clear database: {e}")
 
 
-@app.route('/api/scrape', methods=['POST'])
+# Runs in a background worker: one scrape job from start to finish
+def run_scrape_job(job):
+    incremental = job.options.get('incremental', False)
+    if not incremental:
+        with app.app_context():
+            clear_database()  # Clear old results before scraping; other jobs' results are kept
+    # Products are saved while the spiders are still crawling; each saved batch invalidates the read cache
+    return run_pipeline(job.query, progress=job, on_saved=response_cache.invalidate, incremental=incremental,
+                        max_age=job.options.get('max_age', DEFAULT_MAX_AGE), job_id=job.id, fast=job.options.get('fast', False))
+
+scrape_jobs = JobManager(run_scrape_job)
+
+@api.route('/api/scrape', methods=['POST'])
 def run_scraper():
     query = request.json.get('query', '').strip()
     if not query:
         return jsonify({"status": "error", "message": "No query provided."}), 400
 
+    # Incremental scrapes keep the existing products and skip pages that are fresh or unchanged
+    options = {}
+    if request.json.get('incremental'):
+        options['incremental'] = True
+        try:
+            options['max_age'] = int(request.json.get('max_age', DEFAULT_MAX_AGE))
+        except (TypeError, ValueError):
+            return jsonify({"status": "error", "message": "max_age must be a number of seconds."}), 400
+    # Fast scrapes read the products from the search results pages and skip most product pages
+    if request.json.get('fast'):
+        options['fast'] = True
+
+    job, created = scrape_jobs.submit(query, **options)
+    return jsonify({
+        "status": "accepted",
+        "message": "Scraping started." if created else "A scrape for this query is already running.",
+        "job_id": job.id,
+        "state": job.state,
+    }), 202
+
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = scrape_jobs.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+# Function to turn a product row into the JSON the API returns
+def serialize_product(product, with_timestamp=False):
+    result = {
+        "id": product.id,
+        "title": product.title,
+        "model": product.model,
+        "brand": product.brand,
+        "category": product.category,
+        "price": product.price,
+        "product_url": product.product_url,
+        "image_url": product.image_url,
+        "store": product.store,
+        "product_group_id": product.product_group_id
+    }
+    if with_timestamp:
+        result["timestamp"] = product.timestamp.strftime('%Y-%m-%d %H:%M:%S')  # Format timestamp
+    return result
+
+# Function to answer a listing request: the full list by default, one page when limit/cursor is given,
+# or a streamed NDJSON / JSON array when stream is given
+def list_products(products_query, keys, serialize):
     try:
-        clear_database()  # Clear the database before scraping
-        RunSpiders(query)
-        process_and_save(query)
-        return jsonify({"status": "success", "message": "Scraping and processing completed."})
-    except Exception as e:
-        return jsonify({"status": "error", "message": f"Error during scraping: {str(e)}"}), 500
+        paginated, limit, cursor, stream = parse_page_args(request.args)
+        if stream:
+            body = stream_rows(products_query, keys, cursor, serialize, stream)
+            return Response(stream_with_context(body), mimetype=STREAM_FORMATS[stream])
+        if paginated:
+            return jsonify(fetch_page(products_query, keys, limit, cursor, serialize))
+    except PaginationError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    products = products_query.order_by(None).order_by(*(key.desc() if descending else key for key, descending in keys)).all()
+    return jsonify([serialize(product) for product in products])
 
-@app.route('/api/products', methods=['GET'])
+@api.route('/api/products', methods=['GET'])
+@response_cache.cached
 def get_products():
     query = request.args.get('query', '').strip().lower()
+    search_text = request.args.get('q', '').strip()
+    job_id = request.args.get('job_id', '').strip()
     products_query = Product.query
+    keys = [(Product.id, False)]
+    if job_id:
+        # Only the products one scrape job found
+        products_query = filter_job_results(products_query, job_id)
     if query:
         products_query = products_query.filter(
             func.lower(Product.search_query).contains(query)
         )
-    products = products_query.all()
-    results = [
-        {
-            "id": product.id,
-            "title": product.title,
-            "model": product.model,
-            "brand": product.brand,
-            "category": product.category,
-            "price": product.price,
-            "product_url": product.product_url,
-            "image_url": product.image_url,
-            "store": product.store
-        }
-        for product in products
-    ]
-    return jsonify(results)
-
-@app.route('/api/product/<int:product_id>', methods=['GET'])
+    if search_text:
+        # Ranked full-text search over title, model, brand and category (prefixes match too)
+        products_query = apply_search(products_query, Product, search_text)
+        keys = [(search_rank(), False), (Product.id, False)]
+    return list_products(products_query, keys, serialize_product)
+
+@api.route('/api/product/<int:product_id>', methods=['GET'])
+@response_cache.cached
 def get_product(product_id):
     product = Product.query.get(product_id)
     if not product:
         return jsonify({"status": "error", "message": "Product not found"}), 404
 
-    result = {
-        "id": product.id,
-        "title": product.title,
-        "model": product.model,
-        "brand": product.brand,
-        "category": product.category,
-        "price": product.price,
-        "product_url": product.product_url,
-        "image_url": product.image_url,
-        "store": product.store
-    }
-    return jsonify(result)
+    return jsonify(serialize_product(product))
+
+@api.route('/api/product/<int:product_id>/matches', methods=['GET'])
+@response_cache.cached
+def get_product_matches(product_id):
+    product = db.session.get(Product, product_id)
+    if not product:
+        return jsonify({"status": "error", "message": "Product not found"}), 404
+
+    # The same product at every store, cheapest first, for price comparison
+    matches = [product]
+    if product.product_group_id is not None:
+        matches = Product.query.filter_by(product_group_id=product.product_group_id).order_by(
+            Product.price.is_(None), Product.price, Product.id
+        ).all()
+    return jsonify([serialize_product(match) for match in matches])
 
-@app.route('/api/saved_products', methods=['GET'])
+@api.route('/api/saved_products', methods=['GET'])
+@response_cache.cached
 def get_saved_products():
-    saved_products = Product.query.filter_by(saved=True).order_by(Product.timestamp.desc()).all()
-    results = [
-        {
-            "id": product.id,
-            "title": product.title,
-            "model": product.model,
-            "brand": product.brand,
-            "category": product.category,
-            "price": product.price,
-            "product_url": product.product_url,
-            "image_url": product.image_url,
-            "store": product.store,
-            "timestamp": product.timestamp.strftime('%Y-%m-%d %H:%M:%S')  # Format timestamp
-        }
-        for product in saved_products
-    ]
-    return jsonify(results)
-
-@app.route('/api/save_product', methods=['POST'])
+    saved_products = Product.query.filter_by(saved=True)
+    # Newest first; the timestamp is compared as the text SQLite stores so cursors round-trip exactly
+    timestamp = func.coalesce(type_coerce(Product.timestamp, String), '')
+    keys = [(timestamp, True), (Product.id, True)]
+    return list_products(saved_products, keys, lambda product: serialize_product(product, with_timestamp=True))
+
+@api.route('/api/save_product', methods=['POST'])
 def save_product():
     data = request.json
     product = Product.query.get(data.get('id'))
@@ -112,12 +171,13 @@ def save_product():
     try:
         product.saved = True
         db.session.commit()
+        response_cache.invalidate()
         return jsonify({"status": "success", "message": "Product saved successfully."})
     except Exception as e:
         db.session.rollback()
         return jsonify({"status": "error", "message": str(e)}), 500
 
-@app.route('/api/delete_saved_product/<int:product_id>', methods=['DELETE'])
+@api.route('/api/delete_saved_product/<int:product_id>', methods=['DELETE'])
 def delete_saved_product(product_id):
     product = Product.query.get(product_id)
     if not product:
@@ -126,15 +186,55 @@ def delete_saved_product(product_id):
     try:
         product.saved = False
         db.session.commit()
+        response_cache.invalidate()
         return jsonify({"status": "success", "message": "Product unsaved successfully."})
     except Exception as e:
         db.session.rollback()
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@api.route('/api/http_cache', methods=['GET'])
+def get_http_cache_stats():
+    # Hit/miss/bytes-saved counters of the page cache shared by the spiders
+    return jsonify(get_shared_cache().stats())
+
+@api.route('/api/response_cache', methods=['GET'])
+def get_response_cache_stats():
+    # Hit/miss/304 counters of the read endpoint cache
+    return jsonify(response_cache.stats())
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Crawl and pipeline metrics of this process in the Prometheus text format
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+# Function to build the API app over a database (products.db in the instance folder by default).
+# The database is not touched here: run init_database (or `flask --app app init-db`) before serving it.
+def create_app(database_uri=DATABASE_URI):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(api)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        init_database(app)
+        print("Database and tables created!")
+
+    return app
+
+# Function to create the tables and bring a database created by an older version up to date
+def init_database(app):
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+
+# Scrape jobs clear old results through this app; the pipeline saves through data_processing's app
+app = create_app()
+
 if __name__ == '__main__':
     if os.path.exists('products.db'):
         os.remove('products.db')
     
-    with app.app_context():
-        db.create_all()
+    init_database(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,79 @@
+import argparse
+import os
+import random
+import string
+import sys
+import time
+from difflib import get_close_matches
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from brand_resolver import BrandResolver
+
+# Brand lookups against a synthetic 5,000-brand dictionary: the old difflib scan of the whole
+# brand list per distinct spelling, against BrandResolver (hash table, then trigram candidates).
+
+SYLLABLES = ['ka', 'ro', 'mi', 'tel', 'son', 'vex', 'dra', 'lux', 'pro', 'zen', 'tor', 'ni', 'sa', 'via', 'gor', 'el']
+
+
+def synthetic_brands(count, seed=0):
+    rng = random.Random(seed)
+    brands = {}
+    while len(brands) < count:
+        name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+        brands.setdefault(name, [f'{name} Electronics', f'{name} Home'])
+    return brands
+
+
+# Function to make spellings the way they show up in scraped data: exact, other case, one typo
+def scraped_spellings(brands, count, seed=1):
+    rng = random.Random(seed)
+    names = list(brands)
+    spellings = []
+    for _ in range(count):
+        brand = rng.choice(names)
+        kind = rng.random()
+        if kind < 0.3:
+            spelling = brand.upper()
+        elif kind < 0.5:
+            spelling = rng.choice(brands[brand])
+        else:
+            i = rng.randrange(len(brand))
+            spelling = brand[:i] + rng.choice(string.ascii_lowercase) + brand[i + 1:]
+        spellings.append((spelling, brand))
+    return spellings
+
+
+def old_match(brand, names):
+    matches = get_close_matches(brand.strip().title(), names, n=1, cutoff=0.7)
+    return matches[0] if matches else None
+
+
+def run(name, resolve, spellings):
+    start = time.perf_counter()
+    correct = sum(resolve(spelling) == brand for spelling, brand in spellings)
+    seconds = time.perf_counter() - start
+    print(f"{name:<26}{seconds:>9.2f}{seconds / len(spellings) * 1000:>12.3f}{correct / len(spellings):>10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark difflib brand matching vs the indexed brand resolver.')
+    parser.add_argument('--brands', type=int, default=5_000)
+    parser.add_argument('--lookups', type=int, default=1_000, help='Distinct scraped spellings to resolve')
+    args = parser.parse_args()
+
+    brands = synthetic_brands(args.brands)
+    spellings = scraped_spellings(brands, args.lookups)
+    names = list(brands)
+
+    start = time.perf_counter()
+    resolver = BrandResolver(brands)
+    print(f"{args.brands:,} brands, index built in {time.perf_counter() - start:.2f}s; {args.lookups:,} lookups")
+    print(f"{'':<26}{'time (s)':>9}{'ms/lookup':>12}{'correct':>10}")
+    run('difflib over brand list', lambda spelling: old_match(spelling, names), spellings)
+    run('BrandResolver (cold)', resolver.resolve, spellings)
+    run('BrandResolver (memoized)', resolver.resolve, spellings)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_processing import clean_frame, normalize_columns, preprocess_row
+
+# Compares the per-row cleaning path (DataFrame.apply + preprocess_row) with the
+# column-wise clean_frame on a synthetic scrape, and checks both give the same output.
+
+TITLES = ['  samsung 55" crystal uhd tv ', 'LG OLED evo C3', 'conti rice cooker', 'Sony Bravia 4K', '', np.nan]
+MODELS = ['ua55du7000', 'OLED65C3', ' epc08a001 ', 'KD-55X75', 'N/A', np.nan]
+BRANDS = ['samsung', 'Samsnug', 'lg', 'LG ', 'sony', 'Phillips', 'toshiba', 'Hisens', 'Conti', 'Spark', '', np.nan]
+CATEGORIES = ['TELEVISION', 'Home Appliances', 'kitchen appliances', 'N/A', '']
+PRICES = ['1,299 JD', '499.00JOD', '35', '29.99', 'Call us', '1.2.3', '', np.nan]
+STORES = ['Smart Buy', 'BMS', 'Diamond Star', 'LG vision', 'Leaders']
+
+
+def synthetic_scrape(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    pick = lambda values: np.array(values, dtype=object)[rng.integers(0, len(values), rows)]
+    ids = np.arange(rows).astype(str)
+    return pd.DataFrame({
+        'Title': pick(TITLES),
+        'Model': pick(MODELS),
+        'Brand': pick(BRANDS),
+        'Category': pick(CATEGORIES),
+        'Price': pick(PRICES),
+        'Image URL': np.char.add(' https://cdn.example/img/', ids).astype(object),
+        'Product URL': np.char.add('https://example.com/product/', ids).astype(object),
+        'Store': pick(STORES),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-row vs column-wise cleaning.')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    data = normalize_columns(synthetic_scrape(args.rows))
+    print(f"Cleaning {args.rows:,} rows")
+
+    start = time.perf_counter()
+    expected = pd.DataFrame(data.apply(lambda row: preprocess_row(row, 'tv'), axis=1).tolist())
+    rowwise = time.perf_counter() - start
+    print(f"per-row (apply):    {rowwise:8.2f}s  {args.rows / rowwise:12,.0f} rows/s")
+
+    start = time.perf_counter()
+    result = clean_frame(data, 'tv')
+    vectorized = time.perf_counter() - start
+    print(f"column-wise:        {vectorized:8.2f}s  {args.rows / vectorized:12,.0f} rows/s")
+
+    pd.testing.assert_frame_equal(result, expected)
+    print(f"outputs match, speedup {rowwise / vectorized:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
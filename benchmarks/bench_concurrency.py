@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fixture_server import FixtureServer, route_stores_to
+from rate_limiter import PolitenessScheduler, SHARED_SCHEDULER
+from run_spiders import create_session, STORE_CONCURRENCY
+from Spiders.BMS_Spider import scrape_multiple_products_bmsmena
+from Spiders.DiamondStar_Spider import scrape_multiple_products_diamondstar
+from Spiders.LGvision_Spider import scrape_multiple_products_newvision
+from Spiders.SmartBuy_Spider import scrape_multiple_products
+
+# Wall-clock time per store with sequential product fetching (before) and with the
+# per-store concurrency limits from run_spiders.STORE_CONCURRENCY (after).
+# The stores are served by the local fixture server, so no real website is contacted.
+
+STORES = {
+    'CrawlBMS': lambda q, pages, session, workers: scrape_multiple_products_bmsmena(q, pages, session=session, max_workers=workers),
+    'CrawlDiamondStar': lambda q, pages, session, workers: scrape_multiple_products_diamondstar(q, pages, session=session, max_workers=workers),
+    'CrawlLGvision': lambda q, pages, session, workers: scrape_multiple_products_newvision(q, pages, session=session, max_workers=workers),
+    'CrawlSmartBuy': lambda q, pages, session, workers: scrape_multiple_products(
+        f'https://smartbuy-me.com/search?type=product&q={q}', pages, session=session, max_workers=workers
+    ),
+}
+
+
+def time_store(crawl, session, pages, workers):
+    start = time.perf_counter()
+    products = crawl('tv', pages, session, workers)
+    return time.perf_counter() - start, len(products)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sequential vs concurrent product fetching per store.')
+    parser.add_argument('--pages', type=int, default=3)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated server latency in seconds')
+    parser.add_argument('--stores', nargs='*', default=list(STORES))
+    parser.add_argument('--polite', action='store_true', help='Apply the per-host budgets from rate_limiter.HOST_LIMITS')
+    args = parser.parse_args()
+
+    # Without --polite the scheduler never holds a request back, so only the fetch concurrency is measured
+    scheduler = SHARED_SCHEDULER if args.polite else PolitenessScheduler(limits={}, default_rate=1e6, default_max_in_flight=64)
+
+    with FixtureServer(latency=args.latency, pages=args.pages, per_page=args.per_page) as server:
+        session = create_session(retries=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504], scheduler=scheduler)
+        session = route_stores_to(session, server.base_url)
+
+        print(f"{'store':<18}{'products':>10}{'before (s)':>12}{'after (s)':>12}{'workers':>9}{'speedup':>9}")
+        for name in args.stores:
+            workers = STORE_CONCURRENCY.get(name, 1)
+            before, count = time_store(STORES[name], session, args.pages, 1)
+            after, _ = time_store(STORES[name], session, args.pages, workers)
+            print(f"{name:<18}{count:>10}{before:>12.2f}{after:>12.2f}{workers:>9}{before / after:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
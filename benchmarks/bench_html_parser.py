@@ -0,0 +1,74 @@
+import argparse
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.recorded_stores import SPIDERS, recorded_pages
+from html_parser import available_backends, parse_html
+from paginator import last_page_number
+
+# Pages parsed per second by every spider on the recorded store pages (benchmarks/fixtures/stores), for each
+# HTML parser backend installed, parsing the whole page or only the elements the spider reads (parse_only):
+#   product   the product page parsed into a tree and every field read from its selectors (no JSON-LD)
+#   listing   the search results page parsed and its product URLs and last page number read
+# Smart Buy reads its product pages from JSON-LD only and never parses them, so it only has a listing row.
+
+
+def variants():
+    for backend in available_backends():
+        yield backend, backend, False
+        yield f'{backend} only', backend, True
+
+
+def time_pages(parse, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for url, body in pages:
+            parse(url, body)
+    return len(pages) * repeat / (time.perf_counter() - start)
+
+
+def product_parser(spider, backend, strained):
+    spider = copy.copy(spider)
+    spider.parser, spider.fast_path, spider.reads_json_ld = backend, False, False
+    spider.parse_only = spider.parse_only if strained else None
+    return spider.parse_product
+
+
+def listing_parser(spider, backend):
+    def parse(url, body):
+        soup = parse_html(body, backend)
+        return spider.parse_product_urls(soup, url), last_page_number(soup)
+    return parse
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the HTML parser backends on the recorded store pages.')
+    parser.add_argument('--repeat', type=int, default=20, help='times every recorded page is parsed')
+    args = parser.parse_args()
+
+    pages = {}
+    for store, kind, url, body in recorded_pages():
+        pages.setdefault((store, kind), []).append((url, body))
+
+    names = [name for name, _, _ in variants()]
+    print(f"{'pages/s':<24}" + ''.join(f'{name:>18}' for name in names))
+    for spider in SPIDERS:
+        for kind in ('product', 'listing'):
+            if (spider.store, kind) not in pages or kind == 'product' and not spider.parse_only:
+                continue
+            row = []
+            for _, backend, strained in variants():
+                if kind == 'listing':
+                    parse = listing_parser(spider, backend) if not strained else None  # Listings need the whole page
+                else:
+                    parse = product_parser(spider, backend, strained)
+                row.append(f'{time_pages(parse, pages[spider.store, kind], args.repeat):>18.0f}' if parse else f"{'-':>18}")
+            print(f'{spider.store + " " + kind:<24}' + ''.join(row))
+
+
+if __name__ == '__main__':
+    main()
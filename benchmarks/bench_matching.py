@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from matching import evaluate_matches, match_products
+
+# Matching time and pairwise precision/recall on the labelled fixture set and on a synthetic
+# catalogue where each model is listed by several stores with the formatting each store uses.
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'product_matches.json')
+STORES = ['Smart Buy', 'BMS', 'Diamond Star', 'LG vision']
+BRANDS = {'Samsung': ['UA', 'QA', 'WW', 'RT'], 'LG': ['OLED', 'UR', 'F4R', 'GN'], 'Sony': ['KD', 'XR'], 'Hisense': ['HX', 'RB']}
+SUFFIXES = ['', 'UXJO', '.AMAE', '/FH', 'AUXTW']
+
+
+def load_fixture():
+    products = json.load(open(FIXTURE_PATH))['products']
+    return [(p['id'], p['title'], p['model'], p['brand'], p['store']) for p in products], {p['id']: p['group'] for p in products}
+
+
+def synthetic_catalogue(rows, seed=0):
+    rng = random.Random(seed)
+    products, labels = [], {}
+    model_id = 0
+    while len(products) < rows:
+        brand = rng.choice(list(BRANDS))
+        code = f'{rng.choice(BRANDS[brand])}{rng.choice([43, 50, 55, 65, 75])}{rng.choice("ABCDKT")}{rng.randint(1000, 99999)}'
+        for store in rng.sample(STORES, rng.randint(1, 4)):
+            product_id = len(products) + 1
+            style = rng.random()
+            if style < 0.4:
+                title, model = f'{brand} {code[2:6]} Smart TV', code + rng.choice(SUFFIXES)
+            elif style < 0.7:
+                title, model = f'{brand} Smart TV | {code}', code
+            else:
+                title, model = f'{brand} TV {"-".join([code[:4], code[4:]])}', 'N/A'
+            products.append((product_id, title, model, brand, store))
+            labels[product_id] = model_id
+        model_id += 1
+    return products[:rows], {product_id: labels[product_id] for product_id, *_ in products[:rows]}
+
+
+def run(name, products, labels):
+    start = time.perf_counter()
+    groups = match_products(products)
+    seconds = time.perf_counter() - start
+    scores = evaluate_matches(groups, labels)
+    print(f"{name:<28}{len(products):>9,}{seconds:>10.2f}{scores['precision']:>11.3f}{scores['recall']:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark cross-store product matching.')
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'data set':<28}{'products':>9}{'time (s)':>10}{'precision':>11}{'recall':>8}")
+    run('labelled fixtures', *load_fixture())
+    run('synthetic catalogue', *synthetic_catalogue(args.rows))
+
+
+if __name__ == '__main__':
+    main()
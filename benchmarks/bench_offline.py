@@ -0,0 +1,182 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from unittest import mock
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import data_processing
+import app as api
+from benchmarks.bench_upsert import make_app
+from benchmarks.recorded_stores import FIXTURES_DIR, RecordedStoreServer, recorded_pages, recorded_session
+from benchmarks.results import write_results
+from run_spiders import RunSpiders
+from sinks import CsvSink
+from Spiders.BMS_Spider import parse_product_details_bmsmena, scrape_product_details_bmsmena
+from Spiders.DiamondStar_Spider import parse_product_details_diamondstar, scrape_product_details_diamondstar
+from Spiders.LGvision_Spider import parse_product_details_newvision, scrape_product_details_newvision
+from Spiders.Leaders_Spider import parse_product_details_leaders, scrape_product_details_leaders
+from Spiders.SmartBuy_Spider import parse_json_ld, scrape_json_ld
+
+# Offline benchmark suite over the recorded store pages (benchmarks/fixtures/stores), so numbers from
+# different commits are comparable and nothing depends on the stores being up:
+#   parse     pages/s of every spider's product page parser, on the recorded bytes
+#   scrape    pages/s of every spider's scrape function (fetch + parse) against RecordedStoreServer
+#   crawl     RunSpiders + process_and_save for the recorded query, into a temporary database
+#   fast      RunSpiders in fast mode (products read from the search results pages)
+#   api       p50/p90/p99 latency of the read endpoints, with the response cache missed and hit
+# Results are written as JSON; compare two runs with python benchmarks/results.py OLD.json NEW.json
+
+# Store -> parser of its product pages (url, content)
+PARSERS = {
+    'BMS': parse_product_details_bmsmena,
+    'Diamond Star': parse_product_details_diamondstar,
+    'LG vision': parse_product_details_newvision,
+    'Smart Buy': parse_json_ld,
+    'Leaders': parse_product_details_leaders,
+}
+
+# Store -> scrape function as (url, query, session)
+SCRAPERS = {
+    'BMS': lambda url, query, session: scrape_product_details_bmsmena(url, session=session),
+    'Diamond Star': lambda url, query, session: scrape_product_details_diamondstar(url, query, session=session),
+    'LG vision': lambda url, query, session: scrape_product_details_newvision(url, session=session),
+    'Smart Buy': lambda url, query, session: scrape_json_ld(url, session=session),
+    'Leaders': lambda url, query, session: scrape_product_details_leaders(url, session=session),
+}
+
+API_REQUESTS = ['/api/products', '/api/products?query=tv', '/api/products?q=smart', '/api/products?limit=10', '/api/product/1', '/api/saved_products']
+
+
+def percentiles(seconds):
+    p50, p90, p99 = np.percentile(np.array(seconds) * 1000, [50, 90, 99])
+    return {'p50_ms': round(p50, 3), 'p90_ms': round(p90, 3), 'p99_ms': round(p99, 3)}
+
+
+def per_store(pages, functions):
+    by_store = {}
+    for store, _, url, body in pages:
+        if store in functions:
+            by_store.setdefault(store, []).append((url, body))
+    return by_store
+
+
+# Function to time every parser over its store's recorded product pages
+def bench_parse(repeat):
+    results = {}
+    for store, pages in per_store(recorded_pages(kind='product'), PARSERS).items():
+        parse = PARSERS[store]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for url, body in pages:
+                parse(url, body)
+        elapsed = time.perf_counter() - start
+        results[parse.__name__] = {'pages': len(pages) * repeat, 'seconds': round(elapsed, 4), 'pages_per_second': round(len(pages) * repeat / elapsed, 1)}
+    return results
+
+
+# Function to time every scrape function (one request and its parse per page) against the recorded server
+def bench_scrape(server, query, repeat):
+    session = recorded_session(server)
+    results = {}
+    for store, pages in per_store(recorded_pages(kind='product'), SCRAPERS).items():
+        scrape = SCRAPERS[store]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for url, _ in pages:
+                scrape(url, query, session)
+        elapsed = time.perf_counter() - start
+        results[store] = {'pages': len(pages) * repeat, 'seconds': round(elapsed, 4), 'pages_per_second': round(len(pages) * repeat / elapsed, 1)}
+    return results
+
+
+# Function to time a whole crawl of the recorded query: RunSpiders into CSV files, then process_and_save
+def bench_crawl(server, query, tmp_dir):
+    session = recorded_session(server)
+    sink = CsvSink(tmp_dir)
+    requests_before = server.request_count
+    start = time.perf_counter()
+    RunSpiders(query, sink=sink, session=session)
+    sink.close()
+    crawled = time.perf_counter()
+    with mock.patch.object(data_processing, 'app', make_app(os.path.join(tmp_dir, 'crawl.db'))):
+        data_processing.process_and_save(query, folder=tmp_dir)
+    saved = time.perf_counter()
+    return {
+        'products': sum(len(products) for products in sink.products.values()),
+        'requests': server.request_count - requests_before,
+        'crawl_seconds': round(crawled - start, 4),
+        'process_and_save_seconds': round(saved - crawled, 4),
+        'total_seconds': round(saved - start, 4),
+    }
+
+
+# Function to time a fast-mode crawl of the recorded query and count the requests it makes
+def bench_fast_crawl(server, query):
+    session = recorded_session(server)
+    products = []
+    requests_before = server.request_count
+    start = time.perf_counter()
+    RunSpiders(query, sink=products.append, session=session, fast=True)
+    return {
+        'products': len(products),
+        'requests': server.request_count - requests_before,
+        'crawl_seconds': round(time.perf_counter() - start, 4),
+    }
+
+
+# Function to serve app.py's routes from a database filled by bench_crawl, and time each read endpoint
+def bench_api(tmp_dir, repeat):
+    bench_app = api.create_app(f"sqlite:///{os.path.join(tmp_dir, 'crawl.db')}")
+    api.init_database(bench_app)
+
+    client = bench_app.test_client()
+    results = {}
+    for path in API_REQUESTS:
+        missed, hit = [], []
+        for _ in range(repeat):
+            api.response_cache.invalidate()
+            start = time.perf_counter()
+            status = client.get(path).status_code
+            missed.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            client.get(path)
+            hit.append(time.perf_counter() - start)
+        results[path] = {'status': status, 'uncached': percentiles(missed), 'cached': percentiles(hit)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks over the recorded store pages.')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    parser.add_argument('--repeat', type=int, default=20, help='passes over the recorded pages for the parse and scrape benchmarks')
+    parser.add_argument('--api-requests', type=int, default=200, help='requests per endpoint for the api benchmark')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the recorded server waits before answering')
+    parser.add_argument('--output', help='results file (default benchmarks/results/<commit>-offline.json)')
+    args = parser.parse_args()
+
+    with RecordedStoreServer(args.fixtures, latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp_dir:
+        query = server.manifest['query']
+        results = {'parse': bench_parse(args.repeat)}
+        for name, stats in results['parse'].items():
+            print(f"{name:<40}{stats['pages_per_second']:>10.1f} pages/s")
+        results['scrape'] = bench_scrape(server, query, args.repeat)
+        for store, stats in results['scrape'].items():
+            print(f"scrape {store:<33}{stats['pages_per_second']:>10.1f} pages/s")
+        results['crawl'] = bench_crawl(server, query, tmp_dir)
+        print(f"crawl: {results['crawl']['products']} products, {results['crawl']['requests']} requests, "
+              f"{results['crawl']['crawl_seconds']:.2f}s crawling + {results['crawl']['process_and_save_seconds']:.2f}s process_and_save")
+        results['fast'] = bench_fast_crawl(server, query)
+        print(f"fast crawl: {results['fast']['products']} products, {results['fast']['requests']} requests, {results['fast']['crawl_seconds']:.2f}s crawling")
+        results['api'] = bench_api(tmp_dir, args.api_requests)
+        for path, stats in results['api'].items():
+            print(f"{path:<40} uncached p50 {stats['uncached']['p50_ms']:.2f}ms p99 {stats['uncached']['p99_ms']:.2f}ms | "
+                  f"cached p50 {stats['cached']['p50_ms']:.2f}ms p99 {stats['cached']['p99_ms']:.2f}ms")
+    write_results('offline', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
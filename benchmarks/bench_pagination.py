@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_search import synthetic_products
+from bench_upsert import make_app
+from app import serialize_product
+from database_setup import db, Product, upgrade_schema
+from data_processing import save_products
+from pagination import encode_cursor, fetch_page, stream_rows
+
+# Peak memory and time to export every product: one big list (the old /api/products)
+# against the streamed NDJSON mode, plus the cost of a deep page with OFFSET vs a keyset cursor.
+
+KEYS = [(Product.id, False)]
+
+
+def full_list():
+    return json.dumps([serialize_product(product) for product in Product.query.order_by(Product.id).all()])
+
+
+def streamed():
+    size = 0
+    for chunk in stream_rows(Product.query, KEYS, None, serialize_product, 'ndjson'):
+        size += len(chunk)  # Stands in for writing the chunk to the socket
+    return size
+
+
+def measured(export):
+    tracemalloc.start()
+    start = time.perf_counter()
+    export()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark full-list vs streamed exports and OFFSET vs keyset pages.')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--limit', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = make_app(os.path.join(tmp_dir, 'pages.db'))
+        with app.app_context():
+            db.create_all()
+            upgrade_schema()
+            save_products(synthetic_products(args.rows))
+            db.session.remove()
+
+            print(f"Export of {args.rows:,} products   {'time (s)':>10}{'peak (MB)':>11}")
+            for name, export in [('full list', full_list), ('streamed ndjson', streamed)]:
+                seconds, peak = measured(export)
+                db.session.remove()
+                print(f"{name:<30}{seconds:>10.2f}{peak:>11.1f}")
+
+            deep = args.rows - args.limit
+            cursor = encode_cursor([deep])  # Ids run from 1, so this is where OFFSET deep starts
+            start = time.perf_counter()
+            offset_page = Product.query.order_by(Product.id).offset(deep).limit(args.limit).all()
+            offset_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            keyset_page = fetch_page(Product.query, KEYS, args.limit, cursor, serialize_product)
+            keyset_ms = (time.perf_counter() - start) * 1000
+            assert [product.id for product in offset_page] == [item['id'] for item in keyset_page['items']]
+            print(f"Last page ({args.limit} rows): OFFSET {offset_ms:.1f} ms, keyset cursor {keyset_ms:.1f} ms")
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
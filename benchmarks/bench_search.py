@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_upsert import make_app
+from database_setup import db, Product, upgrade_schema
+from data_processing import save_products
+from search_index import apply_search
+
+# Query latency for the old substring filter (LIKE '%term%', a full table scan)
+# against the FTS5 index used by /api/products?q=...
+
+BRANDS = ['Samsung', 'LG', 'Sony', 'Toshiba', 'Hisense', 'Conti', 'Philips', 'Tornado']
+CATEGORIES = ['Television', 'Home Appliances', 'Kitchen Appliances', 'Mobiles', 'Laptops']
+WORDS = ['smart', 'crystal', 'uhd', 'oled', 'rice', 'cooker', 'washer', 'inverter', 'galaxy', 'gaming', 'steam', 'iron']
+QUERIES = ['samsung', 'oled', 'rice cooker', 'gal', 'hisense uhd', '4242', 'toshiba steam 777']
+
+
+def synthetic_products(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    pick = lambda values: np.array(values, dtype=object)[rng.integers(0, len(values), rows)]
+    brands = pick(BRANDS)
+    return pd.DataFrame({
+        'title': [f'{brand} {a} {b} {i}' for i, (brand, a, b) in enumerate(zip(brands, pick(WORDS), pick(WORDS)))],
+        'model': [f'M-{i}' for i in range(rows)],
+        'brand': brands,
+        'category': pick(CATEGORIES),
+        'price': rng.integers(10, 2000, rows).astype(float),
+        'product_url': [f'https://example.com/product/{i}' for i in range(rows)],
+        'image_url': 'N/A',
+        'store': 'Smart Buy',
+        'search_query': 'bench',
+    })
+
+
+def like_search(search_text, limit=None):
+    products_query = Product.query
+    for word in search_text.split():
+        pattern = f'%{word}%'
+        products_query = products_query.filter(db.or_(
+            Product.title.ilike(pattern), Product.model.ilike(pattern),
+            Product.brand.ilike(pattern), Product.category.ilike(pattern),
+        ))
+    return products_query.limit(limit).all()
+
+
+def timed(search, query, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = search(query)
+    return (time.perf_counter() - start) / repeat * 1000, len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark LIKE scans vs the FTS5 product index.')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=None, help='Only load the first N matches, like a result page')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = make_app(os.path.join(tmp_dir, 'search.db'))
+        with app.app_context():
+            db.create_all()
+            upgrade_schema()
+            save_products(synthetic_products(args.rows))
+
+            like = lambda query: like_search(query, args.limit)
+            fts = lambda query: apply_search(Product.query, Product, query).limit(args.limit).all()
+            print(f"{args.rows:,} products, limit {args.limit}")
+            print(f"{'query':<20}{'LIKE (ms)':>10}{'rows':>8}{'FTS5 (ms)':>11}{'rows':>8}")
+            like_total = fts_total = 0
+            for query in QUERIES:
+                like_ms, like_rows = timed(like, query, args.repeat)
+                fts_ms, fts_rows = timed(fts, query, args.repeat)
+                like_total, fts_total = like_total + like_ms, fts_total + fts_ms
+                print(f"{query:<20}{like_ms:>10.1f}{like_rows:>8}{fts_ms:>11.1f}{fts_rows:>8}")
+            db.session.remove()
+            db.engine.dispose()
+
+    print(f"overall speedup: {like_total / fts_total:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import copy
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import Spiders.base_spider as base_spider
+from html_parser import parse_html
+from benchmarks.recorded_stores import SPIDERS, recorded_pages
+
+# Product pages parsed per second by every spider on the recorded store pages (benchmarks/fixtures/stores):
+#   dom          every page parsed into a tree first, the fields read from the tree (fast_path=False)
+#   structured   the fields read from the page's JSON-LD/microdata bytes, the page only parsed for missing ones
+# "no DOM" is the share of pages the structured path read without building a tree.
+
+
+# Counts the trees the spiders build
+class SoupCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+        return parse_html(*args, **kwargs)
+
+
+def time_parse(spider, pages, repeat):
+    counter = SoupCounter()
+    with mock.patch.object(base_spider, 'parse_html', counter):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for url, body in pages:
+                spider.parse_product(url, body)
+        elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed, 1 - counter.count / (len(pages) * repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the structured data fast path against full DOM parsing.')
+    parser.add_argument('--repeat', type=int, default=20, help='times every recorded page is parsed')
+    args = parser.parse_args()
+
+    pages = {}
+    for store, _, url, body in recorded_pages(kind='product'):
+        pages.setdefault(store, []).append((url, body))
+
+    print(f"{'':<14}{'pages':>7}{'dom/s':>10}{'structured/s':>14}{'speedup':>9}{'no DOM':>8}")
+    for spider in SPIDERS:
+        if spider.store not in pages:
+            continue
+        dom_spider = copy.copy(spider)
+        dom_spider.fast_path = False
+        dom, _ = time_parse(dom_spider, pages[spider.store], args.repeat)
+        structured, no_dom = time_parse(spider, pages[spider.store], args.repeat)
+        print(f"{spider.store:<14}{len(pages[spider.store]):>7}{dom:>10.0f}{structured:>14.0f}{structured / dom:>8.1f}x{no_dom:>8.0%}")
+
+
+if __name__ == '__main__':
+    main()
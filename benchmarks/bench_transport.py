@@ -0,0 +1,85 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fixture_server import FixtureServer
+from rate_limiter import PolitenessScheduler
+from run_spiders import create_session
+from transport import transport_stats
+
+# Connections opened, bytes on the wire and pages/s when fetching product pages from a local keep-alive
+# server (realistic page chrome, gzip when asked for), for:
+#   requests.get      no session, a new TCP connection per page (the old fallback of the spiders)
+#   default adapter   one shared session with requests' default HTTPAdapter (pool of 10 per host), as before
+#   transport         create_session: pool per host sized to the in-flight limit, keep-alive, gzip, timeouts
+#   transport, identity   the same without compression
+
+
+# Counts the "Connection pool is full, discarding connection" warnings of urllib3
+class DiscardCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        if 'discarding connection' in record.getMessage():
+            self.count += 1
+
+
+def run(server, get, pages, threads, discarded):
+    urls = [f'{server.base_url}/smartbuy-me.com/products/bench-{i}' for i in range(pages)]
+    connections, sent, discarded_before = server.connections, server.bytes_sent, discarded.count
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        sizes = list(executor.map(lambda url: len(get(url).content), urls))
+    elapsed = time.perf_counter() - start
+    return {
+        'seconds': elapsed,
+        'pages_per_second': pages / elapsed,
+        'connections': server.connections - connections,
+        'discarded': discarded.count - discarded_before,
+        'wire_kb': (server.bytes_sent - sent) / 1024,
+        'page_kb': sum(sizes) / len(sizes) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the pooled HTTP transport against a local keep-alive server.')
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=16, help='requests in flight at once (the scheduler limit of the host)')
+    parser.add_argument('--latency', type=float, default=0.005, help='Simulated server latency in seconds')
+    args = parser.parse_args()
+
+    discarded = DiscardCounter()
+    logging.getLogger('urllib3.connectionpool').addHandler(discarded)
+    logging.getLogger('urllib3.connectionpool').propagate = False
+
+    scheduler = PolitenessScheduler(limits={'127.0.0.1': (1e6, args.threads)})
+    default_session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=scheduler)
+    default_session.mount('http://', HTTPAdapter())  # What create_session mounted before the pooled transport
+    session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=scheduler)
+    variants = {
+        'requests.get': requests.get,
+        'default adapter': default_session.get,
+        'transport': session.get,
+        'transport, identity': lambda url: session.get(url, headers={'Accept-Encoding': 'identity'}),
+    }
+
+    with FixtureServer(latency=args.latency, pages=1, per_page=1, chrome=True, compress=True) as server:
+        print(f"{'':<22}{'pages/s':>10}{'conns':>8}{'discarded':>11}{'wire KB':>10}{'page KB':>9}")
+        for name, get in variants.items():
+            result = run(server, get, args.pages, args.threads, discarded)
+            print(f"{name:<22}{result['pages_per_second']:>10.0f}{result['connections']:>8}{result['discarded']:>11}"
+                  f"{result['wire_kb']:>10.0f}{result['page_kb']:>9.1f}")
+    print(f'transport reuse: {transport_stats(session)}')
+
+
+if __name__ == '__main__':
+    main()
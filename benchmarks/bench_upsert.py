@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database_setup import db, Product, upgrade_schema
+from data_processing import save_products
+
+# Ingest time for the old save loop (one SELECT per product, no index on product_url)
+# against save_products (unique index + batched INSERT ... ON CONFLICT DO UPDATE).
+# OLD_SCHEMA carries every column the Product model maps, but none of the new indexes.
+
+OLD_SCHEMA = '''
+    CREATE TABLE products (
+        id INTEGER NOT NULL PRIMARY KEY, title VARCHAR(255), model VARCHAR(255), brand VARCHAR(100),
+        category VARCHAR(100), price FLOAT, product_url VARCHAR(500), image_url VARCHAR(500),
+        store VARCHAR(100), search_query VARCHAR(255), saved BOOLEAN, timestamp DATETIME,
+        content_hash VARCHAR(40), product_group_id INTEGER
+    )
+'''
+
+
+def cleaned_products(rows, price_offset=0):
+    return pd.DataFrame({
+        'title': [f'Product {i}' for i in range(rows)],
+        'model': [f'M-{i}' for i in range(rows)],
+        'brand': 'Samsung',
+        'category': 'Television',
+        'price': [float(i % 1000 + price_offset) for i in range(rows)],
+        'product_url': [f'https://example.com/product/{i}' for i in range(rows)],
+        'image_url': [f'https://example.com/img/{i}.jpg' for i in range(rows)],
+        'store': 'Smart Buy',
+        'search_query': 'tv',
+    })
+
+
+# The save loop process_and_save used before the bulk upsert
+def save_products_rowwise(cleaned_data):
+    for _, row in cleaned_data.iterrows():
+        product = Product.query.filter_by(product_url=row['product_url']).first()
+        if product:
+            for col in ['title', 'model', 'brand', 'category', 'price', 'image_url', 'store', 'search_query']:
+                setattr(product, col, row[col])
+        else:
+            db.session.add(Product(**{col: row[col] for col in cleaned_data.columns}))
+    db.session.commit()
+
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    return app
+
+
+def timed(save, data):
+    start = time.perf_counter()
+    save(data)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-row saving vs bulk upsert.')
+    parser.add_argument('--rows', type=int, default=20_000)
+    args = parser.parse_args()
+
+    first, second = cleaned_products(args.rows), cleaned_products(args.rows, price_offset=1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        old_app = make_app(os.path.join(tmp_dir, 'old.db'))
+        with old_app.app_context():
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql(OLD_SCHEMA)
+            old_insert, old_update = timed(save_products_rowwise, first), timed(save_products_rowwise, second)
+
+        new_app = make_app(os.path.join(tmp_dir, 'new.db'))
+        with new_app.app_context():
+            db.create_all()
+            upgrade_schema()
+            new_insert, new_update = timed(save_products, first), timed(save_products, second)
+            assert Product.query.count() == args.rows
+
+    print(f"{args.rows:,} products      {'insert (s)':>12}{'re-ingest (s)':>15}")
+    print(f"{'per-row, no index':<20}{old_insert:>12.2f}{old_update:>15.2f}")
+    print(f"{'bulk upsert':<20}{new_insert:>12.2f}{new_update:>15.2f}")
+    print(f"speedup: {old_insert / new_insert:.0f}x insert, {old_update / new_update:.0f}x re-ingest")
+
+
+if __name__ == '__main__':
+    main()
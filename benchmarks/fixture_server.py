@@ -0,0 +1,419 @@
+import functools
+import gzip
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from requests.adapters import HTTPAdapter
+
+# Local stand-in for the real stores. Every page a spider asks for is generated here with the
+# same markup the spider parses, so crawls can be timed without touching the live websites.
+
+LAST_MODIFIED = 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+STORE_HOSTS = ['smartbuy-me.com', 'bmsmena.com', 'diamondstarjo.com', 'newvision.jo', 'leaders.jo']
+
+
+def _slug(host, page, index, query=None):
+    prefix = f"{host.split('.')[0]}-{query}" if query else host.split('.')[0]
+    return f"{prefix}-p{page}-{index}"
+
+
+def _product_number(slug):
+    return sum(ord(c) for c in slug) % 900 + 100
+
+
+# Product JSON-LD the WooCommerce stores print at the end of their product pages
+def woocommerce_json_ld(name, sku, price, image, category):
+    data = {
+        '@context': 'https://schema.org/',
+        '@type': 'Product',
+        'name': name,
+        'sku': sku,
+        'category': category,
+        'image': image,
+        'offers': [{'@type': 'Offer', 'price': price, 'priceCurrency': 'JOD', 'availability': 'http://schema.org/InStock'}],
+    }
+    return f'<script type="application/ld+json">{json.dumps(data)}</script>'
+
+
+# Header, menu and footer around the content, so pages have the size and clutter of the real ones.
+# Nothing in it matches the selectors the spiders look for.
+@functools.lru_cache(maxsize=None)
+def page_chrome(host, links=64):
+    name = host.split('.')[0]
+    head = (
+        '<meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">'
+        f'<meta property="og:site_name" content="{name}"><meta name="description" content="Shop electronics and home appliances at {name}.">'
+        + ''.join(f'<link rel="stylesheet" href="https://{host}/assets/css/bundle-{i}.min.css?ver=6.4.{i}">' for i in range(12))
+        + '<style>' + ''.join(f'.menu-item-{i}{{display:inline-block;padding:{i % 7}px 12px;color:#{i * 9973 % 0xffffff:06x}}}' for i in range(links)) + '</style>'
+    )
+    menu = ''.join(
+        f'<li class="menu-item menu-item-{i}"><a class="menu-link" href="https://{host}/collections/category-{i}">Category {i}</a>'
+        f'<ul class="sub-menu">' + ''.join(f'<li><a href="https://{host}/collections/category-{i}-{j}">Subcategory {i}.{j}</a></li>' for j in range(3))
+        + '</ul></li>'
+        for i in range(links // 4)
+    )
+    header = (
+        f'<div class="site-header"><div class="topbar"><span class="topbar-text">Free delivery in Amman on orders over 50 JOD</span></div>'
+        f'<div class="logo"><img src="https://{host}/assets/logo.svg" alt="{name}" width="180" height="48"></div>'
+        f'<form class="search-form" action="https://{host}/search"><input type="search" name="q" placeholder="Search products"></form>'
+        f'<nav class="main-navigation"><ul class="menu">{menu}</ul></nav></div>'
+    )
+    footer = (
+        '<div class="site-footer"><div class="footer-columns">'
+        + ''.join(f'<div class="footer-column"><p class="footer-title">Section {c}</p><ul>'
+                  + ''.join(f'<li><a href="https://{host}/pages/info-{c}-{i}">Information page {c}.{i}</a></li>' for i in range(links // 16))
+                  + '</ul></div>' for c in range(4))
+        + '</div><form class="newsletter"><input type="email" name="email"><button type="submit">Subscribe</button></form>'
+        + f'<p class="copyright">&copy; 2024 {name}. All rights reserved.</p></div>'
+        + '<script>window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments)}gtag("js",new Date());'
+        + ''.join(f'gtag("config","G-{i:08d}");' for i in range(20)) + '</script>'
+        + ''.join(f'<script src="https://{host}/assets/js/chunk-{i}.js?ver=6.4.{i}" defer></script>' for i in range(10))
+    )
+    return head, header, footer
+
+
+# Function to wrap a generated page in its store's page chrome
+def with_chrome(host, html):
+    head, header, footer = page_chrome(host)
+    if '<head>' in html:
+        html = html.replace('<head>', '<head>' + head, 1)
+    else:
+        html = html.replace('<html>', f'<html><head>{head}</head>', 1)
+    return html.replace('<body>', '<body>' + header, 1).replace('</body>', footer + '</body>', 1)
+
+
+# Pagination links under a listing page; page_href(n) is the link to page n
+def shopify_pagination(page, pages, page_href):
+    links = ''.join(
+        f'<span class="page current">{n}</span>' if n == page else f'<span class="page"><a href="{page_href(n)}">{n}</a></span>'
+        for n in range(1, pages + 1)
+    )
+    following = f'<span class="next"><a href="{page_href(page + 1)}">Next &raquo;</a></span>' if page < pages else ''
+    return f'<div class="pagination">{links}{following}</div>'
+
+
+def woocommerce_pagination(page, pages, page_href):
+    links = ''.join(
+        f'<li><span aria-current="page" class="page-numbers current">{n}</span></li>' if n == page else
+        f'<li><a class="page-numbers" href="{page_href(n)}">{n}</a></li>'
+        for n in range(1, pages + 1)
+    )
+    following = f'<li><a class="next page-numbers" href="{page_href(page + 1)}">&rarr;</a></li>' if page < pages else ''
+    return f'<nav class="woocommerce-pagination"><ul class="page-numbers">{links}{following}</ul></nav>'
+
+
+# Listing pages (one per store). Like the real ones, every product card has the title, price and image
+# the product page shows; model and category are only on the product pages.
+def smartbuy_listing(slugs, pagination=''):
+    items = ''.join(
+        f'<div class="product-item"><a class="product-item__image-wrapper" href="/products/{slug}">'
+        f'<img class="product-item__primary-image" src="//smartbuy-me.com/cdn/shop/files/{slug}.jpg"></a>'
+        f'<div class="product-item__info"><a class="product-item__vendor" href="/collections/vendors?q=Samsung">Samsung</a>'
+        f'<a class="product-item__title" href="/products/{slug}">Smart Buy Product {slug}</a>'
+        f'<div class="product-item__price-list price-list"><span class="price"><span class="visually-hidden">Sale price</span>JOD {_product_number(slug)}.99</span></div>'
+        f'</div></div>' for slug in slugs
+    )
+    return f'<html><body><div class="product-list">{items}</div>{pagination}</body></html>'
+
+
+def bms_listing(slugs, pagination=''):
+    items = ''.join(
+        f'<div class="product-collection"><div class="product-collection__image"><img src="//bmsmena.com/cdn/shop/products/{slug}.jpg"></div>'
+        f'<div class="product-collection__title"><h4><a href="/products/{slug}">Samsung Smart TV {slug} | QA{_product_number(slug)}</a></h4></div>'
+        f'<div class="product-collection__price"><span class="price">{_product_number(slug)},000 JD</span></div></div>'
+        for slug in slugs
+    )
+    return f'<html><body>{items}{pagination}</body></html>'
+
+
+def woocommerce_listing(host, slugs, prefix='', pagination='', name='Product'):
+    items = ''.join(
+        f'<div class="product-grid-item"><a class="woocommerce-LoopProduct-link" href="https://{host}{prefix}/product/{slug}/">'
+        f'<img src="https://{host}/wp-content/uploads/{slug}.jpg"></a>'
+        f'<h3 class="wd-entities-title"><a href="https://{host}{prefix}/product/{slug}/">{name} {slug}</a></h3>'
+        f'<span class="price"><span class="woocommerce-Price-amount amount">{_product_number(slug)}.00 JOD</span></span></div>'
+        for slug in slugs
+    )
+    return f'<html><body><div class="products">{items}</div>{pagination}</body></html>'
+
+
+# Product pages (one per store)
+def smartbuy_product(slug):
+    data = {
+        '@context': 'http://schema.org/',
+        '@type': 'Product',
+        'name': f'Smart Buy Product {slug}',
+        'brand': {'@type': 'Brand', 'name': 'Samsung'},
+        'category': 'TELEVISION',
+        'image': {'@type': 'ImageObject', 'url': f'https://smartbuy-me.com/cdn/shop/files/{slug}.jpg'},
+        'offers': [{'@type': 'Offer', 'name': f'UA{_product_number(slug)}', 'price': f'{_product_number(slug)}.99', 'priceCurrency': 'JOD'}],
+    }
+    return (
+        f'<html><head><title>{slug}</title><script type="application/ld+json">{json.dumps(data)}</script></head>'
+        f'<body><h1>{data["name"]}</h1></body></html>'
+    )
+
+
+def bms_product(slug):
+    return (
+        f'<html><body><h4>Samsung Smart TV {slug} | QA{_product_number(slug)}</h4>'
+        f'<span id="js-product-price">{_product_number(slug)},000 JD</span>'
+        f'<img class="main-image" data-zoom-image="//bmsmena.com/cdn/shop/products/{slug}.jpg"></body></html>'
+    )
+
+
+def diamondstar_product(slug):
+    return (
+        f'<html><body><h1 class="product_title wd-entities-title">Conti Product {slug}</h1>'
+        f'<p class="price"><span class="woocommerce-Price-amount amount">{_product_number(slug)}.00 JD</span></p>'
+        f'<span class="sku">DS-{_product_number(slug)}</span><a href="/category/home/" rel="tag">Home Appliances</a>'
+        f'<a data-elementor-open-lightbox="no" href="https://diamondstarjo.com/wp-content/uploads/{slug}.jpg">img</a>'
+        + woocommerce_json_ld(f'Conti Product {slug}', f'DS-{_product_number(slug)}', f'{_product_number(slug)}.00',
+                              f'https://diamondstarjo.com/wp-content/uploads/{slug}.jpg', 'Home Appliances')
+        + '</body></html>'
+    )
+
+
+def newvision_product(slug):
+    return (
+        f'<html><body><h3 class="wd-entities-title">LG Product {slug}</h3>'
+        f'<p class="price pewc-main-price"><span class="woocommerce-Price-amount amount">{_product_number(slug)}.00 JOD</span></p>'
+        f'<span class="sku">LG-{_product_number(slug)}</span>'
+        f'<span class="posted_in">Categories: <a href="/c/tv/">TV</a>, <a href="/c/oled/">OLED</a></span>'
+        f'<a data-elementor-open-lightbox="no" href="https://newvision.jo/wp-content/uploads/{slug}.jpg">img</a>'
+        + woocommerce_json_ld(f'LG Product {slug}', f'LG-{_product_number(slug)}', f'{_product_number(slug)}.00',
+                              f'https://newvision.jo/wp-content/uploads/{slug}.jpg', 'TV')
+        + '</body></html>'
+    )
+
+
+def leaders_product(slug):
+    return (
+        f'<html><body><a href="https://leaders.jo/en/">Leaders</a>'
+        f'<h1 class="product_title entry-title">Samsung Product {slug}</h1>'
+        f'<span class="woocommerce-Price-amount amount">{_product_number(slug)}.00JOD</span>'
+        f'<span>Model Number: <strong>SM-{_product_number(slug)}</strong></span>'
+        + woocommerce_json_ld(f'Samsung Product {slug}', f'SM-{_product_number(slug)}', f'{_product_number(slug)}.00',
+                              f'https://leaders.jo/wp-content/uploads/{slug}.jpg', 'Electronics')
+        + '</body></html>'
+    )
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    # One handler per TCP connection; keep-alive requests reuse it
+    def setup(self):
+        super().setup()
+        self.server.connection_opened()
+
+    def do_GET(self):
+        server = self.server
+        server.request_started(self.path)
+        try:
+            self.respond()
+        finally:
+            server.request_finished()
+
+    def respond(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        throttled = server.take_throttle()
+        if throttled is not None:
+            status, retry_after = throttled
+            self.send_response(status)
+            self.send_header('Retry-After', str(retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        # Requests arrive as /<store host>/<original path>
+        parts = urlsplit(self.path)
+        host, _, path = parts.path.lstrip('/').partition('/')
+        path = '/' + path
+        params = parse_qs(parts.query)
+        body = self.route(host, path, params)
+        status = 200
+        if body is None:
+            status = 404
+            body = '<html><body>Not found</body></html>'
+        if server.chrome:
+            body = with_chrome(host, body)
+
+        data = body.encode('utf-8')
+        etag = '"%s"' % hashlib.sha1(data).hexdigest()
+        if self.headers.get('If-None-Match') == etag or self.headers.get('If-Modified-Since') == LAST_MODIFIED:
+            server.not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if server.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            data = gzip.compress(data, compresslevel=6)
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(data)
+        with server._log_lock:
+            server.bytes_sent += len(data)
+
+    def listing_slugs(self, host, page):
+        server = self.server
+        if page < 1 or page > server.pages:
+            return []
+        query = self.query if server.per_query else None
+        return [_slug(host, page, i, query) for i in range(server.per_page)]
+
+    # Pagination links for a listing page, when the server prints them and the page has products
+    def pagination_links(self, render, page, slugs, page_href):
+        return render(page, self.server.pages, page_href) if self.server.pagination and slugs else ''
+
+    def route(self, host, path, params):
+        page_param = params.get('page') or params.get('paged') or ['1']
+        # Search term, reduced to letters and digits so it can go into a slug
+        self.query = ''.join(c for c in (params.get('q') or params.get('s') or [''])[0].lower() if c.isalnum())
+        if host == 'smartbuy-me.com':
+            if path == '/search':
+                page = int(page_param[0])
+                slugs = self.listing_slugs(host, page)
+                return smartbuy_listing(slugs, self.pagination_links(shopify_pagination, page, slugs, lambda n: f'/search?page={n}&q={self.query}&type=product'))
+            if path.startswith('/products/'):
+                return smartbuy_product(path.rsplit('/', 1)[-1])
+        elif host == 'bmsmena.com':
+            if path == '/search':
+                page = int(page_param[0])
+                slugs = self.listing_slugs(host, page)
+                return bms_listing(slugs, self.pagination_links(shopify_pagination, page, slugs, lambda n: f'/search?page={n}&q={self.query}&type=product'))
+            if path.startswith('/products/'):
+                return bms_product(path.rsplit('/', 1)[-1])
+        elif host == 'diamondstarjo.com':
+            if path == '/' or path.startswith('/page/'):
+                page = int(path.strip('/').split('/')[-1]) if path.startswith('/page/') else 1
+                slugs = self.listing_slugs(host, page)
+                pagination = self.pagination_links(woocommerce_pagination, page, slugs, lambda n: f'https://{host}/page/{n}/?s={self.query}&post_type=product')
+                return woocommerce_listing(host, slugs, pagination=pagination, name='Conti Product') if slugs else None
+            if path.startswith('/product/'):
+                return diamondstar_product(path.strip('/').rsplit('/', 1)[-1])
+        elif host == 'newvision.jo':
+            if path == '/en/':
+                page = int(page_param[0])
+                slugs = self.listing_slugs(host, page)
+                pagination = self.pagination_links(woocommerce_pagination, page, slugs, lambda n: f'https://{host}/en/?post_type=product&s={self.query}&paged={n}')
+                return woocommerce_listing(host, slugs, '/en', pagination, 'LG Product') if slugs else None
+            if path.startswith('/en/product/'):
+                return newvision_product(path.strip('/').rsplit('/', 1)[-1])
+        elif host == 'leaders.jo':
+            if path == '/en/' or path.startswith('/en/page/'):
+                page = int(path.strip('/').split('/')[-1]) if path.startswith('/en/page/') else 1
+                slugs = self.listing_slugs(host, page)
+                pagination = self.pagination_links(woocommerce_pagination, page, slugs, lambda n: f'https://{host}/en/page/{n}/?s={self.query}&post_type=product')
+                return woocommerce_listing(host, slugs, '/en', pagination, 'Samsung Product') if slugs else None
+            if path.startswith('/en/product/'):
+                return leaders_product(path.strip('/').rsplit('/', 1)[-1])
+        return None
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    # per_query=True gives every search term its own products; otherwise all searches list the same ones.
+    # chrome=True adds a realistic header, menu and footer to every page.
+    # pagination=False leaves out the pagination links, like stores whose last page can't be read from the listing.
+    # compress=True gzips bodies for clients that accept it.
+    def __init__(self, latency=0.05, pages=3, per_page=20, port=0, per_query=False, chrome=False, pagination=True, compress=False):
+        super().__init__(('127.0.0.1', port), FixtureHandler)
+        self.latency = latency
+        self.pages = pages
+        self.per_page = per_page
+        self.per_query = per_query
+        self.chrome = chrome
+        self.pagination = pagination
+        self.compress = compress
+        self.connections = 0  # TCP connections accepted
+        self.bytes_sent = 0  # Body bytes written, after compression
+        self.request_log = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.throttled = []
+        self.not_modified = 0
+        self._log_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def request_started(self, path):
+        with self._log_lock:
+            self.request_log.append((time.monotonic(), path))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def connection_opened(self):
+        with self._log_lock:
+            self.connections += 1
+
+    def request_finished(self):
+        with self._log_lock:
+            self.in_flight -= 1
+
+    # Answer the next `count` requests with status (429 or 503) and the given Retry-After
+    def throttle(self, count, retry_after, status=429):
+        with self._log_lock:
+            self.throttled.extend([(status, retry_after)] * count)
+
+    def take_throttle(self):
+        with self._log_lock:
+            return self.throttled.pop(0) if self.throttled else None
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# Adapter that sends requests for the real store hosts to the fixture server instead
+class FixtureAdapter(HTTPAdapter):
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        request = request.copy()
+        parts = urlsplit(request.url)
+        request.url = f"{self.base_url}/{parts.netloc}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else '')
+        return super().send(request, **kwargs)
+
+
+# Function to point an existing session at the fixture server for every store host
+def route_stores_to(session, base_url, adapter=None):
+    adapter = adapter or FixtureAdapter(base_url, pool_maxsize=32)
+    for host in STORE_HOSTS:
+        session.mount(f'https://{host}', adapter)
+    return session
@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from benchmarks.fixture_server import FixtureAdapter, FixtureServer, route_stores_to
+from http_cache import normalize_url
+from rate_limiter import PolitenessScheduler
+from record_replay import Recorder
+from run_spiders import create_session
+from Spiders import BMS_Spider, DiamondStar_Spider, LGvision_Spider, Leaders_Spider, SmartBuy_Spider
+
+# Recorded store pages for the offline benchmarks. `record` runs every spider's listing and product
+# fetches for one query through a record_replay.Recorder and saves each response under benchmarks/fixtures/stores
+# with a manifest (the pages are kept as files so they can be read and diffed);
+# RecordedStoreServer serves them back, so benchmarks see exactly the same bytes on every run.
+# Usage:
+#   python benchmarks/recorded_stores.py record            record from the local fixture server (realistic page chrome)
+#   python benchmarks/recorded_stores.py record --live     record from the real stores
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'stores')
+MANIFEST_NAME = 'manifest.json'
+RECORD_QUERY = 'tv'
+RECORD_PAGES = 3  # Listing pages RunSpiders asks every store for
+
+# The spiders whose listing and product pages are recorded
+SPIDERS = [BMS_Spider.SPIDER, DiamondStar_Spider.SPIDER, LGvision_Spider.SPIDER, SmartBuy_Spider.SPIDER, Leaders_Spider.SPIDER]
+
+
+def load_manifest(fixtures_dir=FIXTURES_DIR):
+    with open(os.path.join(fixtures_dir, MANIFEST_NAME), encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Function to get the recorded pages as (store, kind, url, body) for the pages that answered 200
+def recorded_pages(fixtures_dir=FIXTURES_DIR, kind=None):
+    pages = []
+    for entry in load_manifest(fixtures_dir)['pages']:
+        if entry['status'] == 200 and (kind is None or entry['kind'] == kind):
+            with open(os.path.join(fixtures_dir, entry['file']), 'rb') as f:
+                pages.append((entry['store'], entry['kind'], entry['url'], f.read()))
+    return pages
+
+
+# Function to record every page the spiders fetch for a query and write them with their manifest.
+# The session paces requests with the given scheduler (the shared one, with the real stores' limits, by default).
+def record(adapter, source, query=RECORD_QUERY, pages=RECORD_PAGES, fixtures_dir=FIXTURES_DIR, scheduler=None):
+    recorder = Recorder(None, query)
+    session = create_session(retries=0, backoff_factor=0, status_forcelist=[], **({'scheduler': scheduler} if scheduler else {}))
+    for scheme in ('http://', 'https://'):
+        session.mount(scheme, recorder.adapter(adapter))
+
+    for spider in SPIDERS:
+        recorder.tags.update(store=spider.store, kind='listing')
+        urls = spider.product_urls(query, pages, session)
+        recorder.tags['kind'] = 'product'
+        for url in urls:
+            spider.fetch_product_page(url, session)
+    return export_manifest(recorder.archive, source, fixtures_dir)
+
+
+# Function to write a recorded archive (record_replay.TransportArchive with store and kind tags) as one file
+# per page plus the manifest RecordedStoreServer and recorded_pages read
+def export_manifest(archive, source, fixtures_dir=FIXTURES_DIR):
+    os.makedirs(fixtures_dir, exist_ok=True)
+    manifest = {
+        'description': 'Store pages recorded by benchmarks/recorded_stores.py and served back by RecordedStoreServer.',
+        'source': source,
+        'query': archive.query,
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'pages': [],
+    }
+    counters = {}
+    for entry, body in archive.items():
+        host = urlsplit(entry['url']).hostname
+        number = counters[host, entry['kind']] = counters.get((host, entry['kind']), 0) + 1
+        page = {
+            'url': entry['url'],
+            'store': entry['store'],
+            'kind': entry['kind'],
+            'status': entry['status'],
+            'content_type': CaseInsensitiveDict(entry['headers']).get('Content-Type', 'text/html; charset=utf-8'),
+            'file': f"{host}/{entry['kind']}-{number:02d}.html",
+        }
+        os.makedirs(os.path.join(fixtures_dir, host), exist_ok=True)
+        with open(os.path.join(fixtures_dir, page['file']), 'wb') as f:
+            f.write(body)
+        manifest['pages'].append(page)
+    with open(os.path.join(fixtures_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class RecordedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        # Requests arrive as /<store host>/<original path>, like on the fixture server
+        host, _, rest = self.path.lstrip('/').partition('/')
+        entry = server.pages.get(normalize_url(f'https://{host}/{rest}'))
+        if entry is None:
+            status, content_type, body = 404, 'text/html; charset=utf-8', b'<html><body>Not recorded</body></html>'
+        else:
+            status, content_type, body = entry
+        with server.lock:
+            server.request_count += 1
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# Serves the recorded pages; point a session at it with fixture_server.route_stores_to
+class RecordedStoreServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR, latency=0.0, port=0):
+        super().__init__(('127.0.0.1', port), RecordedHandler)
+        self.latency = latency
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self.pages = {}
+        self.manifest = load_manifest(fixtures_dir)
+        for entry in self.manifest['pages']:
+            with open(os.path.join(fixtures_dir, entry['file']), 'rb') as f:
+                self.pages[normalize_url(entry['url'])] = (entry['status'], entry['content_type'], f.read())
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# Function to build a session whose store requests go to a RecordedStoreServer
+def recorded_session(server):
+    session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=PolitenessScheduler(limits={}, default_rate=10000, default_max_in_flight=64))
+    route_stores_to(session, server.base_url)
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record store pages for the offline benchmarks.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_command = commands.add_parser('record')
+    record_command.add_argument('--live', action='store_true', help='record from the real stores instead of the local fixture server')
+    record_command.add_argument('--query', default=RECORD_QUERY)
+    record_command.add_argument('--output', default=FIXTURES_DIR)
+    args = parser.parse_args()
+
+    if args.live:
+        manifest = record(HTTPAdapter(), 'live stores', args.query, fixtures_dir=args.output)
+    else:
+        with FixtureServer(latency=0, pages=2, per_page=3, chrome=True) as server:
+            manifest = record(FixtureAdapter(server.base_url), 'benchmarks/fixture_server.py (chrome=True, pages=2, per_page=3)',
+                              args.query, fixtures_dir=args.output, scheduler=PolitenessScheduler(limits={}, default_rate=1000))
+    print(f"Recorded {len(manifest['pages'])} pages into {args.output}")
+
+
+if __name__ == '__main__':
+    main()
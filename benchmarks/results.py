@@ -0,0 +1,90 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# JSON results of the offline benchmarks, tagged with the commit they were measured on, and the
+# comparison of two result files.
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+REGRESSION_THRESHOLD = 0.10  # Relative change reported as a regression or an improvement
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'commit': git_commit(),
+        'measured_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+# Function to write a benchmark's results, by default to benchmarks/results/<commit>-<suite>.json
+def write_results(suite, results, path=None):
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{git_commit() or 'uncommitted'}-{suite}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'suite': suite, 'environment': environment(), 'results': results}, f, indent=2)
+    print(f'Results written to {path}')
+    return path
+
+
+# Function to flatten nested results into {'a.b.c': number}
+def flatten(results, prefix=''):
+    values = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            values.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+# Function to compare two result files. Metric names say which way is better: throughput (per_second)
+# should go up, everything else measured (seconds, ms) should go down; counts are only listed.
+def compare(old_path, new_path, threshold=REGRESSION_THRESHOLD):
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    old_values, new_values = flatten(old['results']), flatten(new['results'])
+    rows = []
+    for name in sorted(old_values.keys() & new_values.keys()):
+        before, after = old_values[name], new_values[name]
+        change = (after - before) / before if before else 0.0
+        if 'per_second' in name:
+            verdict = 'regression' if change < -threshold else 'improvement' if change > threshold else ''
+        elif 'seconds' in name or name.endswith('_ms'):
+            verdict = 'regression' if change > threshold else 'improvement' if change < -threshold else ''
+        else:
+            verdict = ''
+        rows.append((name, before, after, change, verdict))
+    return old['environment'].get('commit'), new['environment'].get('commit'), rows
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit('usage: python benchmarks/results.py OLD.json NEW.json')
+    old_commit, new_commit, rows = compare(sys.argv[1], sys.argv[2])
+    print(f"{'metric':<60}{old_commit or 'old':>14}{new_commit or 'new':>14}{'change':>10}")
+    for name, before, after, change, verdict in rows:
+        print(f'{name:<60}{before:>14.4g}{after:>14.4g}{change:>+10.1%}  {verdict}')
+    if any(verdict == 'regression' for *_, verdict in rows):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
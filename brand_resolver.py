@@ -0,0 +1,98 @@
+import json
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+# Brand normalization. Every alias in the dictionary is reduced to a key (lower case, letters and digits only);
+# a brand is first looked up by its key in a hash table, and only when that fails compared with the few aliases
+# that share trigrams with it. Both steps are memoized, so each distinct spelling is resolved once.
+
+DEFAULT_ALIASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Data', 'brand_aliases.json')
+FUZZY_CUTOFF = 0.7  # Same cutoff the old difflib matching used
+MIN_FUZZY_LENGTH = 4  # Shorter keys (lg, mi, hp) only match exactly
+MAX_CANDIDATES = 20  # Aliases sharing the most trigrams that get a full similarity check
+TITLE_WORDS = 3  # Longest brand name looked for at the start of a title, in words
+CACHE_SIZE = 65536
+
+KEY_PATTERN = re.compile(r'[\W_]+', re.UNICODE)
+UNKNOWN_BRANDS = {'', 'n/a', 'nan', 'none'}
+
+
+# Function to reduce a brand to the key it is looked up by ('Black+Decker' -> 'blackdecker')
+def brand_key(brand):
+    return KEY_PATTERN.sub('', str(brand).lower())
+
+
+def trigrams(key):
+    padded = f' {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class BrandResolver:
+    # aliases maps each canonical brand name to the other spellings it appears under
+    def __init__(self, aliases, cutoff=FUZZY_CUTOFF):
+        self.cutoff = cutoff
+        self.exact = {}
+        for brand, spellings in aliases.items():
+            for spelling in [brand, *spellings]:
+                key = brand_key(spelling)
+                if key:
+                    self.exact.setdefault(key, brand)
+        self.index = defaultdict(list)
+        for key in self.exact:
+            if len(key) < MIN_FUZZY_LENGTH:
+                continue
+            for gram in trigrams(key):
+                self.index[gram].append(key)
+        self.resolve = lru_cache(maxsize=CACHE_SIZE)(self._resolve)
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_ALIASES_PATH, cutoff=FUZZY_CUTOFF):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f)['brands'], cutoff)
+
+    # Function to get the canonical name of a brand, or None when nothing in the dictionary is close enough
+    def _resolve(self, brand):
+        key = brand_key(brand)
+        if not key or brand.strip().lower() in UNKNOWN_BRANDS:
+            return None
+        if key in self.exact:
+            return self.exact[key]
+        if len(key) < MIN_FUZZY_LENGTH:
+            return None
+
+        shared = Counter(candidate for gram in trigrams(key) for candidate in self.index.get(gram, ()))
+        best, best_score = None, self.cutoff
+        for candidate, _ in shared.most_common(MAX_CANDIDATES):
+            score = SequenceMatcher(None, key, candidate).ratio()
+            if score >= best_score:
+                best, best_score = candidate, score
+        return self.exact[best] if best else None
+
+    # Function to find the brand a product title starts with ('Black and Decker Iron' -> 'Black & Decker').
+    # Only exact aliases count here; falls back to the first word, the old guess.
+    def from_title(self, title):
+        words = str(title or '').split()
+        if not words:
+            return 'N/A'
+        for length in range(min(TITLE_WORDS, len(words)), 0, -1):
+            brand = self.exact.get(brand_key(' '.join(words[:length])))
+            if brand:
+                return brand
+        return words[0]
+
+
+_default_resolver = None
+_default_lock = threading.Lock()
+
+
+# Function to get the resolver for the bundled alias dictionary, loaded on first use
+def get_brand_resolver():
+    global _default_resolver
+    with _default_lock:
+        if _default_resolver is None:
+            _default_resolver = BrandResolver.from_file()
+        return _default_resolver
@@ -0,0 +1,42 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from metrics import in_current_context
+
+logger = logging.getLogger(__name__)
+
+# Default number of product pages fetched at once when a store has no explicit limit
+DEFAULT_MAX_WORKERS = 4
+
+# Function to run fetch(url) for every url, at most max_workers at a time; max_workers=1 fetches one by one.
+# Results are yielded in the order of urls (a slow page holds back the ones after it), None results are skipped.
+# An exception from fetch is raised to the caller, unless errors is a list: failed fetches are then logged,
+# appended to it as (url, exception) and skipped, so one broken page doesn't end a store's crawl.
+def fetch_concurrently(fetch, urls, max_workers=1, errors=None):
+    if max_workers is None or max_workers <= 1:
+        for url in urls:
+            result = _fetched(url, lambda: fetch(url), errors)
+            if result is not None:
+                yield result
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(url, executor.submit(in_current_context(fetch), url)) for url in urls]  # Keep the crawl's metrics
+        try:
+            for url, future in futures:
+                result = _fetched(url, future.result, errors)
+                if result is not None:
+                    yield result
+        finally:
+            for _, future in futures:
+                future.cancel()  # The pages not started yet when the caller stops or a fetch fails
+
+
+def _fetched(url, result, errors):
+    if errors is None:
+        return result()
+    try:
+        return result()
+    except Exception as e:
+        logger.warning('Error fetching %s: %s', url, e)
+        errors.append((url, e))
+        return None
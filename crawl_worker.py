@@ -0,0 +1,277 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+from data_processing import app as default_app, db, upgrade_schema, normalize_columns, clean_frame, save_products, fill_missing_prices
+from database_setup import FrontierTask, products_stamp
+from matching import assign_product_groups
+from metrics import CrawlMetrics, collecting, in_current_context
+from rate_limiter import HOST_LIMITS, PolitenessScheduler
+from response_cache import mark_changed
+from run_spiders import create_session
+from url_dedup import BloomFilter, UrlDeduplicator
+from Spiders import BMS_Spider, DiamondStar_Spider, LGvision_Spider, SmartBuy_Spider
+
+# Crawl workers: separate processes, on one machine or several sharing the database, that take their work from
+# the crawl_frontier table instead of running every spider in the Flask process.
+# A job is seeded with one listing task per store; a worker that runs a listing task queues the product
+# pages it found, and a worker that runs a product task saves the product into the job's result set.
+# Tasks are leased for LEASE_TIMEOUT seconds, so the tasks of a worker that dies are picked up again.
+# Every write marks the products as changed (response_cache.mark_changed), so the API drops its cached responses.
+# Usage:
+#   python crawl_worker.py run "smart tv" --processes 4    seed a job, run 4 workers and finish the job
+#   python crawl_worker.py seed "smart tv"                  only seed; start workers with "work" (on any node)
+#   python crawl_worker.py work --wait                      keep polling for new jobs instead of exiting when idle
+#   python crawl_worker.py work --wait --bloom seen.bloom   remember queued links in a Bloom filter saved across restarts
+
+LEASE_TIMEOUT = 120  # Seconds a claimed task stays invisible to the other workers
+MAX_ATTEMPTS = 3  # A task that failed (or whose lease expired) this many times is marked failed
+WORKER_THREADS = 8  # Tasks a worker claims and fetches at a time
+POLL_INTERVAL = 1.0  # Seconds an idle worker waits before looking for work again
+DEFAULT_PAGES = 3
+
+# Store name -> its spider (Spiders/base_spider.py), for listing search results and fetching and parsing product pages
+STORES = {
+    'CrawlBMS': BMS_Spider.SPIDER,
+    'CrawlDiamondStar': DiamondStar_Spider.SPIDER,
+    'CrawlLGvision': LGvision_Spider.SPIDER,
+    'CrawlSmartBuy': SmartBuy_Spider.SPIDER,
+}
+
+CLAIMABLE = "(status = 'pending' OR (status = 'leased' AND lease_expires < :now)) AND attempts < :max_attempts"
+
+# One statement picks and leases the tasks, so two workers can never claim the same one.
+# Listing tasks go first since they produce the product tasks.
+CLAIM_STATEMENT = text(f'''
+    UPDATE crawl_frontier
+    SET status = 'leased', lease_owner = :owner, lease_token = :token, lease_expires = :expires, attempts = attempts + 1
+    WHERE id IN (
+        SELECT id FROM crawl_frontier WHERE {CLAIMABLE}
+        ORDER BY CASE kind WHEN 'listing' THEN 0 ELSE 1 END, id LIMIT :limit
+    ) AND {CLAIMABLE}
+''')
+
+EXPIRE_STATEMENT = text('''
+    UPDATE crawl_frontier SET status = 'failed', error = 'Lease expired too many times'
+    WHERE status = 'leased' AND lease_expires < :now AND attempts >= :max_attempts
+''')
+
+
+# Function to queue tasks, skipping the ones the job already has (must run inside an app context).
+# Returns the number of tasks that were new.
+def enqueue(job_id, kind, store, urls, query):
+    rows = [
+        {'job_id': job_id, 'kind': kind, 'store': store, 'url': url.strip(), 'search_query': query, 'status': 'pending', 'attempts': 0}
+        for url in dict.fromkeys(urls) if url and url.strip()
+    ]
+    if not rows:
+        return 0
+    return db.session.execute(insert(FrontierTask.__table__).on_conflict_do_nothing(), rows).rowcount
+
+
+# Function to start a crawl: one listing task per store (must run inside an app context). Returns the job id.
+def seed_frontier(query, job_id=None, stores=None):
+    job_id = job_id or uuid.uuid4().hex
+    for store in stores or STORES:
+        enqueue(job_id, 'listing', store, [query], query)
+    db.session.commit()
+    return job_id
+
+
+# Function to lease up to limit tasks to a worker (must run inside an app context)
+def claim_tasks(owner, limit, lease_timeout=LEASE_TIMEOUT, max_attempts=MAX_ATTEMPTS):
+    now = time.time()
+    token = uuid.uuid4().hex
+    db.session.execute(EXPIRE_STATEMENT, {'now': now, 'max_attempts': max_attempts})
+    db.session.execute(CLAIM_STATEMENT, {
+        'owner': owner, 'token': token, 'expires': now + lease_timeout, 'now': now, 'max_attempts': max_attempts, 'limit': limit,
+    })
+    db.session.commit()
+    return FrontierTask.query.filter_by(lease_token=token, status='leased').all()
+
+
+# Function to close a task. Ignored when the lease expired and another worker took the task over.
+def finish_task(task, error=None, max_attempts=MAX_ATTEMPTS):
+    if error is None:
+        status = 'done'
+    else:
+        status = 'failed' if task.attempts >= max_attempts else 'pending'
+    return FrontierTask.query.filter_by(id=task.id, lease_token=task.lease_token, status='leased').update(
+        {FrontierTask.status: status, FrontierTask.lease_expires: None, FrontierTask.error: error}, synchronize_session=False
+    )
+
+
+# Function to count the tasks in each state, for one job or for the whole frontier
+def frontier_counts(job_id=None):
+    query = db.session.query(FrontierTask.status, db.func.count(FrontierTask.id))
+    if job_id is not None:
+        query = query.filter(FrontierTask.job_id == job_id)
+    counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+    counts.update(dict(query.group_by(FrontierTask.status).all()))
+    return counts
+
+
+# Function to split every host's politeness budget between the worker processes crawling it at the same time
+def shared_limits(share):
+    return {host: (rate / share, max(1, in_flight // share)) for host, (rate, in_flight) in HOST_LIMITS.items()}
+
+
+# Function to run one task: returns ('urls', [product URLs]) for a listing, ('product', product or None) for a product page
+def run_task(task, session, pages):
+    spider = STORES[task.store]
+    if task.kind == 'listing':
+        return 'urls', spider.product_urls(task.url, pages, session)
+    return 'product', spider.parse_product(task.url, spider.fetch_product_page(task.url, session=session))
+
+
+class CrawlWorker:
+    def __init__(self, worker_id=None, session=None, app=None, threads=WORKER_THREADS, pages=DEFAULT_PAGES,
+                 lease_timeout=LEASE_TIMEOUT, poll_interval=POLL_INTERVAL, bloom_path=None):
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        self.session = session or create_session(retries=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504])
+        self.app = app or default_app
+        self.threads = threads
+        self.pages = pages
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self.bloom = BloomFilter.open(bloom_path) if bloom_path else None  # Otherwise queued links are kept in a set per job
+        self.dedups = {}
+        self.metrics = CrawlMetrics()
+        self.stats = {'tasks': 0, 'failed': 0, 'queued': 0, 'duplicates': 0, 'products': 0, 'lost_leases': 0}
+
+    # Function to get the links already queued for a job by this worker
+    def dedup(self, job_id):
+        if job_id not in self.dedups:
+            self.dedups[job_id] = UrlDeduplicator(self.bloom, scope=job_id)
+        return self.dedups[job_id]
+
+    # Function to work until the frontier has nothing pending or leased; with wait=True keep polling for new jobs
+    def run(self, wait=False):
+        with self.app.app_context():
+            db.create_all()
+            upgrade_schema()
+        with collecting(self.metrics), ThreadPoolExecutor(max_workers=self.threads) as executor:
+            while True:
+                with self.app.app_context():
+                    tasks = claim_tasks(self.worker_id, self.threads, self.lease_timeout)
+                    counts = frontier_counts() if not tasks else None
+                if tasks:
+                    self.process(tasks, executor)
+                    continue
+                if self.bloom is not None and self.bloom.changed:
+                    self.bloom.save()
+                if not wait and not counts['pending'] and not counts['leased']:
+                    break
+                time.sleep(self.poll_interval)  # Other workers may still queue product pages
+        self.stats['metrics'] = self.metrics.summary()
+        print(f"Crawl worker {self.worker_id} finished: {self.stats}")
+        return self.stats
+
+    def process(self, tasks, executor):
+        futures = [(task, executor.submit(in_current_context(run_task), task, self.session, self.pages)) for task in tasks]
+        products = {}
+        outcomes = []
+        for task, future in futures:
+            try:
+                kind, result = future.result()
+            except Exception as e:
+                print(f"Error fetching {task.url}: {e}")
+                outcomes.append((task, None, str(e)))
+                continue
+            outcomes.append((task, (kind, result), None))
+            if kind == 'product' and result is not None:
+                products.setdefault((task.job_id, task.search_query), []).append(result)
+
+        with self.app.app_context():
+            # Products are saved before their tasks are closed: a worker dying in between means a page is fetched twice, never lost
+            for (job_id, query), batch in products.items():
+                save_products(clean_frame(normalize_columns(pd.DataFrame(batch)), query), job_id=job_id)
+                self.stats['products'] += len(batch)
+            if products:
+                mark_changed(products_stamp())
+            for task, outcome, error in outcomes:
+                if outcome is not None and outcome[0] == 'urls':
+                    # Links this worker queued before are dropped here, the ones other workers queued by the frontier
+                    urls = self.dedup(task.job_id).for_store(task.store).select(outcome[1])
+                    queued = enqueue(task.job_id, 'product', task.store, urls, task.search_query)
+                    self.stats['queued'] += queued
+                    self.stats['duplicates'] += len(outcome[1]) - queued
+                if not finish_task(task, error):
+                    self.stats['lost_leases'] += 1
+                self.stats['tasks'] += 1
+                self.stats['failed'] += error is not None
+            db.session.commit()
+
+
+# Function to finish a crawled job: fill missing prices and match the products across stores
+def finish_job(query, app=None):
+    stats = {'prices_filled': fill_missing_prices(query)}
+    with (app or default_app).app_context():
+        stats['matching'] = assign_product_groups()
+        mark_changed(products_stamp())
+    return stats
+
+
+def _work(worker_id, share, threads, pages, wait, bloom_path=None):
+    session = create_session(retries=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504],
+                             scheduler=PolitenessScheduler(limits=shared_limits(share)))
+    CrawlWorker(worker_id, session=session, threads=threads, pages=pages, bloom_path=bloom_path).run(wait=wait)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl worker processes sharing the crawl_frontier table')
+    commands = parser.add_subparsers(dest='command', required=True)
+    seed = commands.add_parser('seed', help='queue a crawl job and print its id')
+    seed.add_argument('query')
+    seed.add_argument('--job-id')
+    work = commands.add_parser('work', help='run a worker until the frontier is empty')
+    work.add_argument('--worker-id')
+    work.add_argument('--share', type=int, default=1, help='number of workers sharing each store\'s politeness budget')
+    work.add_argument('--wait', action='store_true', help='keep polling for new jobs')
+    work.add_argument('--bloom', help='file of the Bloom filter that remembers queued links')
+    run = commands.add_parser('run', help='seed a job, crawl it with several processes, then finish it')
+    run.add_argument('query')
+    run.add_argument('--processes', type=int, default=4)
+    status = commands.add_parser('status', help='print the task counts')
+    status.add_argument('job_id', nargs='?')
+    for command in (work, run):
+        command.add_argument('--threads', type=int, default=WORKER_THREADS)
+        command.add_argument('--pages', type=int, default=DEFAULT_PAGES)
+    args = parser.parse_args()
+
+    if args.command == 'work':
+        _work(args.worker_id, args.share, args.threads, args.pages, args.wait, args.bloom)
+        return
+
+    with default_app.app_context():
+        db.create_all()
+        upgrade_schema()
+        if args.command == 'status':
+            print(frontier_counts(args.job_id))
+            return
+        job_id = seed_frontier(args.query, args.job_id if args.command == 'seed' else None)
+    print(f'Seeded crawl job {job_id}')
+
+    if args.command == 'run':
+        context = multiprocessing.get_context('spawn')
+        workers = [
+            context.Process(target=_work, args=(f'{socket.gethostname()}-{i}', args.processes, args.threads, args.pages, False))
+            for i in range(args.processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        with default_app.app_context():
+            print(f'Frontier: {frontier_counts(job_id)}')
+        print(f'Job finished: {finish_job(args.query)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,51 +2,52 @@ import pandas as pd
 import re
 from flask import Flask
 import os
-from difflib import get_close_matches
 from sklearn.impute import SimpleImputer
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from brand_resolver import get_brand_resolver
+from database_setup import db, Product, upgrade_schema
+from matching import assign_product_groups
+from metrics import timed_stage
+from result_sets import record_results
+from sinks import SCRAPED_DATA_DIR
 
 # Define the folder path containing the CSV files
-FOLDER_PATH = r"C:\Users\alhas\Desktop\Smart Web Spider\SmartSpider\Scraped_Data"
+FOLDER_PATH = SCRAPED_DATA_DIR
 OUTPUT_FILE_NAME = "cleaned_combined_data.csv"
 
-# Predefined list of known brands for normalization
-KNOWN_BRANDS = ['Samsung', 'LG', 'Sony', 'Panasonic', 'Toshiba', 'Philips', 'Hisense', 'Sharp']
+# Columns every scraped record is normalized to
+REQUIRED_COLUMNS = ['title', 'model', 'brand', 'category', 'price', 'product_url', 'image_url', 'store']
 
-# Initialize the Flask app and SQLAlchemy
+# Rows written per INSERT ... ON CONFLICT batch, and the columns a conflicting row gets updated with
+UPSERT_BATCH_SIZE = 500
+UPSERT_COLUMNS = ['title', 'model', 'brand', 'category', 'price', 'image_url', 'store', 'search_query']
+
+# Everything that is not part of a number is stripped from prices
+PRICE_PATTERN = re.compile(r'[^0-9.]')
+
+# Initialize the Flask app and attach the shared database models
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///products.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
-
-# Define the Product model
-class Product(db.Model):
-    __tablename__ = 'products'
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(255))
-    model = db.Column(db.String(255))
-    brand = db.Column(db.String(100))
-    category = db.Column(db.String(100))
-    price = db.Column(db.Float)
-    product_url = db.Column(db.String(500))
-    image_url = db.Column(db.String(500))
-    store = db.Column(db.String(100))
-    search_query = db.Column(db.String(255))  # Add search_query column
+db.init_app(app)
 
 # Helper functions for cleaning and normalization
 def clean_text(text):
     return text.strip().title() if pd.notna(text) and text != '' else 'N/A'
 
-def correct_brand(brand):
-    brand = clean_text(brand)
+# Brands are resolved against the alias dictionary in Data/brand_aliases.json; unknown ones are kept as scraped
+def match_brand(brand):
     if brand != 'N/A':
-        matches = get_close_matches(brand, KNOWN_BRANDS, n=1, cutoff=0.7)
-        return matches[0] if matches else brand
+        return get_brand_resolver().resolve(brand) or brand
     return 'N/A'
 
+def correct_brand(brand):
+    return match_brand(clean_text(brand))
+
 def clean_price(price):
     try:
-        return float(re.sub(r'[^0-9.]', '', str(price))) if pd.notna(price) and price != '' else float('nan')
+        return float(PRICE_PATTERN.sub('', str(price))) if pd.notna(price) and price != '' else float('nan')
     except ValueError:
         return float('nan')
 
@@ -74,30 +75,71 @@ def preprocess_row(row, query):
         'store': store,
         'search_query': search_query  # Include search query
     }
-    print(f"Processed Row: {processed_row}")  # Debugging
     return processed_row
 
+# Column versions of the helpers above: same results as preprocess_row, computed on whole columns at once
+def _present(column):
+    return column.notna() & (column != '')
+
+def clean_text_column(column):
+    return column.astype(str).str.strip().str.title().where(_present(column), 'N/A')
+
+def correct_brand_column(column):
+    brands = clean_text_column(column)
+    # Resolution runs once per distinct brand instead of once per row
+    corrections = {brand: match_brand(brand) for brand in brands.unique()}
+    return brands.map(corrections)
+
+def clean_price_column(column):
+    digits = column.astype(str).str.replace(PRICE_PATTERN, '', regex=True)
+    return pd.to_numeric(digits, errors='coerce').astype(float).where(_present(column))
+
+def clean_url_column(column):
+    return column.astype(str).str.strip().where(_present(column), 'N/A')
+
+# Function to give scraped records the column names used in the database ('Image URL' -> 'image_url')
+def normalize_columns(data):
+    data.columns = [col.strip().lower().replace(" ", "_") for col in data.columns]
+    # Ensure all required columns exist in the DataFrame
+    for col in REQUIRED_COLUMNS:
+        if col not in data.columns:
+            data[col] = 'N/A'
+    return data
+
+# Function to clean a normalized DataFrame column by column
+@timed_stage('clean')
+def clean_frame(data, query):
+    cleaned_data = pd.DataFrame({
+        'title': clean_text_column(data['title']),
+        'model': clean_text_column(data['model']),
+        'brand': correct_brand_column(data['brand']),
+        'category': clean_text_column(data['category']),
+        'price': clean_price_column(data['price']),
+        'product_url': clean_url_column(data['product_url']),
+        'image_url': clean_url_column(data['image_url']),
+        'store': clean_text_column(data['store']),
+        'search_query': query.lower() if query else 'n/a',
+    }, columns=REQUIRED_COLUMNS + ['search_query'])
+    if 'content_hash' in data.columns:
+        # Only set by incremental recrawls
+        cleaned_data['content_hash'] = data['content_hash'].where(_present(data['content_hash']), None)
+    return cleaned_data.reset_index(drop=True)
+
 # Function to clean and combine data from multiple files
-def clean_and_combine(files, query):
+def clean_and_combine(files, query, folder=FOLDER_PATH):
     all_data = []
     for file_name in files:
-        file_path = os.path.join(FOLDER_PATH, file_name)
+        file_path = os.path.join(folder, file_name)
         print(f"Processing file: {file_name}...")
         try:
             data = pd.read_csv(file_path)
-            data.columns = [col.strip().lower().replace(" ", "_") for col in data.columns]
+            data = normalize_columns(data)
             data.drop_duplicates(inplace=True)
-            # Ensure all required columns exist in the DataFrame
-            required_columns = ['title', 'model', 'brand', 'category', 'price', 'product_url', 'image_url', 'store']
-            for col in required_columns:
-                if col not in data.columns:
-                    data[col] = 'N/A'
-            cleaned_data = data.apply(lambda row: preprocess_row(row, query), axis=1).tolist()
-            all_data.extend(cleaned_data)
+            all_data.append(clean_frame(data, query))
         except Exception as e:
             print(f"Error reading or processing {file_name}: {e}")
 
-    combined_df = pd.DataFrame(all_data)
+    combined_df = pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame()
     # Ensure all required columns exist in the combined DataFrame
     required_columns = ['title', 'model', 'brand', 'category', 'price', 'product_url', 'image_url', 'store', 'search_query']
     for col in required_columns:
@@ -114,48 +156,71 @@ def clean_and_combine(files, query):
     
     return combined_df
 
-# Main function to process and save data
-def process_and_save(query):
+# Function to insert or update cleaned products in batches keyed on product_url (must run inside an app context).
+# With a job_id the products are also added to that job's result set. Returns the number of inserted and updated rows.
+@timed_stage('upsert')
+def save_products(cleaned_data, batch_size=UPSERT_BATCH_SIZE, job_id=None):
+    columns = ['product_url'] + UPSERT_COLUMNS + (['content_hash'] if 'content_hash' in cleaned_data.columns else [])
+    rows = cleaned_data.drop_duplicates(subset='product_url', keep='last')[columns]
+    records = rows.astype(object).where(rows.notna(), None).to_dict('records')  # NaN prices are stored as NULL
+
+    table = Product.__table__
+    statement = insert(table)
+    updates = {col: statement.excluded[col] for col in UPSERT_COLUMNS}
+    if 'content_hash' in columns:
+        updates['content_hash'] = func.coalesce(statement.excluded.content_hash, table.c.content_hash)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.product_url],
+        set_={**updates, 'timestamp': func.now()},
+    )
+
+    totals = {'inserted': 0, 'updated': 0}
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        urls = [record['product_url'] for record in batch]
+        updated = db.session.query(func.count(Product.id)).filter(Product.product_url.in_(urls)).scalar()
+        db.session.execute(statement, batch)
+        totals['inserted'] += len(batch) - updated
+        totals['updated'] += updated
+        print(f"Saved batch of {len(batch)} products: {len(batch) - updated} inserted, {updated} updated")
+    if job_id is not None:
+        record_results(job_id, [record['product_url'] for record in records])
+    db.session.commit()
+    return totals
+
+# Function to fill prices that could not be parsed with the median price of the query's products.
+# The streaming pipeline saves rows before the whole result set is known, so this runs once at the end.
+def fill_missing_prices(query):
+    search_query = query.lower() if query else 'n/a'
+    with app.app_context():
+        products = Product.query.filter_by(search_query=search_query)
+        prices = pd.Series([p.price for p in products.filter(Product.price.isnot(None))], dtype=float)
+        if prices.empty:
+            return 0
+        filled = products.filter(Product.price.is_(None)).update({Product.price: float(prices.median())}, synchronize_session=False)
+        db.session.commit()
+        return filled
+
+# Main function to process and save data; folder is where the spiders' CSV files are (a job's own folder when given)
+def process_and_save(query, folder=FOLDER_PATH):
     # Ensure database tables are created
     with app.app_context():
         db.create_all()
+        upgrade_schema()
     
     csv_files = ["BMSproducts.csv", "DiamondStarProducts.csv", "LGVisionProducts.csv", "SmartBuyProducts.csv"]
-    cleaned_data = clean_and_combine(csv_files, query)
+    cleaned_data = clean_and_combine(csv_files, query, folder)
     
     if not cleaned_data.empty:
         required_columns = ['title', 'model', 'brand', 'category', 'price', 'product_url', 'image_url', 'store', 'search_query']
         cleaned_data = cleaned_data[required_columns]
-        output_file = os.path.join(FOLDER_PATH, OUTPUT_FILE_NAME)
+        output_file = os.path.join(folder, OUTPUT_FILE_NAME)
         cleaned_data.to_csv(output_file, index=False)
         
         # Save to database
         with app.app_context():
-            for _, row in cleaned_data.iterrows():
-                product = Product.query.filter_by(product_url=row['product_url']).first()
-                if product:
-                    product.title = row['title']
-                    product.model = row['model']
-                    product.brand = row['brand']
-                    product.category = row['category']
-                    product.price = row['price']
-                    product.image_url = row['image_url']
-                    product.store = row['store']
-                    product.search_query = row['search_query']  # Update search_query field
-                else:
-                    product = Product(
-                        title=row['title'],
-                        model=row['model'],
-                        brand=row['brand'],
-                        category=row['category'],
-                        price=row['price'],
-                        product_url=row['product_url'],
-                        image_url=row['image_url'],
-                        store=row['store'],
-                        search_query=row['search_query']  # Add search_query field
-                    )
-                    db.session.add(product)
-            db.session.commit()
+            save_products(cleaned_data)
+            print(f"Matched products across stores: {assign_product_groups()}")
         print("Cleaned data saved to CSV and database")
     else:
         print("No data to save. Please check the input files.")
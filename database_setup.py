@@ -1,5 +1,7 @@
+import threading
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from search_index import ensure_search_index
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///products.db'
@@ -15,14 +17,76 @@ class Product(db.Model):
     brand = db.Column(db.String(100))
     category = db.Column(db.String(100))
     price = db.Column(db.Float)
-    product_url = db.Column(db.String(500))
+    product_url = db.Column(db.String(500), unique=True, index=True)  # Upserts are keyed on the product URL
     image_url = db.Column(db.String(500))
     store = db.Column(db.String(100))
     search_query = db.Column(db.String(255))  # New column for storing search query
     saved = db.Column(db.Boolean, default=False)  # Flag for saved products
     timestamp = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())  # Timestamp for updates
+    content_hash = db.Column(db.String(40))  # SHA-1 of the product page HTML, used by incremental recrawls
+    product_group_id = db.Column(db.Integer, index=True)  # Shared by the same product at different stores
+
+# Result set of a scrape job: the products it found, so jobs running at the same time keep separate results
+class JobProduct(db.Model):
+    __tablename__ = 'job_products'
+    job_id = db.Column(db.String(32), primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True, index=True)
+
+# Persistent crawl frontier shared by crawl worker processes: listing and product pages waiting to be fetched.
+# A worker leases a task until lease_expires; if it dies, the task becomes visible to the other workers again.
+class FrontierTask(db.Model):
+    __tablename__ = 'crawl_frontier'
+    __table_args__ = (
+        db.UniqueConstraint('job_id', 'store', 'kind', 'url'),  # A URL is only queued once per job
+        db.Index('ix_crawl_frontier_status_lease', 'status', 'lease_expires'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(32), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # 'listing' (url is the search term) or 'product'
+    store = db.Column(db.String(50), nullable=False)
+    url = db.Column(db.String(500), nullable=False)
+    search_query = db.Column(db.String(255))
+    status = db.Column(db.String(10), default='pending', nullable=False)  # pending, leased, done or failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    lease_owner = db.Column(db.String(100))
+    lease_token = db.Column(db.String(32))
+    lease_expires = db.Column(db.Float)  # Unix time
+    error = db.Column(db.Text)
+
+# Function to get the stamp file that processes writing products touch for the API's response cache
+# (response_cache.mark_changed), next to the database file of the current app (run inside an app context)
+def products_stamp():
+    database = db.engine.url.database
+    return f'{database}.changed' if database and database != ':memory:' else None
+
+_upgrade_lock = threading.Lock()  # Jobs starting together must not run the same ALTER TABLE twice
+
+# Function to bring a products table created by an older version up to date (run inside an app context)
+def upgrade_schema():
+    with _upgrade_lock, db.engine.begin() as conn:
+        indexes = {row[1] for row in conn.exec_driver_sql("PRAGMA index_list('products')")}
+        if 'ix_products_product_url' not in indexes:
+            # Keep a single row per product URL (saved rows first, then the newest) before making it unique
+            conn.exec_driver_sql('''
+                DELETE FROM products WHERE id NOT IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY product_url ORDER BY saved DESC, id DESC
+                        ) AS position FROM products
+                    ) WHERE position = 1
+                )
+            ''')
+            conn.exec_driver_sql('CREATE UNIQUE INDEX ix_products_product_url ON products (product_url)')
+        columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info('products')")}
+        if 'content_hash' not in columns:
+            conn.exec_driver_sql('ALTER TABLE products ADD COLUMN content_hash VARCHAR(40)')
+        if 'product_group_id' not in columns:
+            conn.exec_driver_sql('ALTER TABLE products ADD COLUMN product_group_id INTEGER')
+            conn.exec_driver_sql('CREATE INDEX ix_products_product_group_id ON products (product_group_id)')
+    ensure_search_index(db.engine)  # Full-text index over title, model, brand and category
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()  # This will create the database and tables
+        upgrade_schema()
         print("Database and tables created!")
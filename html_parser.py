@@ -0,0 +1,51 @@
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # BeautifulSoup's 'lxml' backend, a C parser several times faster than html.parser
+except ImportError:
+    lxml = None
+
+# HTML parsing for the spiders. Pages are parsed with the pure-Python html.parser unless a spider asks for
+# another backend (StoreSpider(parser=...)), and can be limited to the elements a spider reads: with parse_only,
+# only the tags with those names (and everything inside them) are built into the tree, the rest of the page is
+# skipped. lxml is faster but isn't a dependency of the project, so it is only used by spiders that ask for it
+# and falls back to html.parser when it isn't installed, like any backend that isn't.
+
+FALLBACK_PARSER = 'html.parser'
+BACKENDS = ('lxml', FALLBACK_PARSER)
+LEADING_TAG = re.compile(r'\s*([a-zA-Z][a-zA-Z0-9]*)(?![a-zA-Z0-9-])')
+
+
+# Function to get the backends that can be used here
+def available_backends():
+    return [backend for backend in BACKENDS if backend != 'lxml' or lxml is not None]
+
+
+DEFAULT_PARSER = FALLBACK_PARSER
+
+
+# Function to get the backend to use for the parser asked for (None: the default one)
+def resolve_backend(parser=None):
+    if parser is None:
+        return DEFAULT_PARSER
+    return parser if parser in available_backends() else FALLBACK_PARSER
+
+
+# Function to get the names of the tags a list of CSS selectors starts from, for parse_only.
+# None when a selector doesn't start with a tag name ('.price', '[itemprop]'): the whole page is then needed.
+def selector_tags(selectors):
+    tags = set()
+    for selector in selectors:
+        for part in selector.split(','):
+            match = LEADING_TAG.match(part)
+            if match is None:
+                return None
+            tags.add(match.group(1).lower())
+    return sorted(tags)
+
+
+# Function to parse a page; parse_only (tag names) limits the tree to those elements and their contents
+def parse_html(content, parser=None, parse_only=None):
+    strainer = SoupStrainer(parse_only) if parse_only else None
+    return BeautifulSoup(content, resolve_backend(parser), parse_only=strainer)
@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import requests
+from requests.structures import CaseInsensitiveDict
+from rate_limiter import PoliteSession
+
+# Persistent cache for crawled pages, stored in SQLite next to the products database
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'http_cache.db')
+DEFAULT_TTL = 15 * 60  # Seconds a cached page is served without asking the server
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # Least recently used pages are evicted above this size
+
+# Headers that describe the wire encoding of the original body, not the decoded body we store
+SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+# Function to build the cache key: lower-case scheme and host, no default port or fragment, sorted query
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not (scheme == 'http' and parts.port == 80 or scheme == 'https' and parts.port == 443):
+        host = f'{host}:{parts.port}'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+class HttpCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'revalidated': 0, 'misses': 0, 'bytes_saved': 0, 'evicted': 0}
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status INTEGER,
+                headers TEXT,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL,
+                last_access REAL,
+                size INTEGER
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS ix_responses_last_access ON responses (last_access)')
+        self.conn.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT status, headers, body, etag, last_modified, stored_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+            self.conn.commit()
+        status, headers, body, etag, last_modified, stored_at = row
+        return {
+            'status': status,
+            'headers': json.loads(headers),
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': stored_at,
+        }
+
+    def is_fresh(self, entry):
+        return time.time() - entry['stored_at'] < self.ttl
+
+    def put(self, key, response):
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in SKIPPED_HEADERS}
+        body = response.content
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, response.status_code, json.dumps(headers), body, response.headers.get('ETag'),
+                 response.headers.get('Last-Modified'), now, now, len(body)),
+            )
+            self._evict()
+            self.conn.commit()
+
+    # Mark a revalidated (304) entry as fresh again
+    def refresh(self, key):
+        with self.lock:
+            self.conn.execute('UPDATE responses SET stored_at = ? WHERE key = ?', (time.time(), key))
+            self.conn.commit()
+
+    # Drop least recently used entries until the cache fits in max_bytes
+    def _evict(self):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+            self.counters['evicted'] += 1
+
+    def record(self, outcome, bytes_saved=0):
+        with self.lock:
+            self.counters[outcome] += 1
+            self.counters['bytes_saved'] += bytes_saved
+
+    def stats(self):
+        with self.lock:
+            entries, size = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+            return {**self.counters, 'entries': entries, 'bytes_stored': size}
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute('DELETE FROM responses')
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+# The cache every spider session uses unless it is given another one
+def get_shared_cache():
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = HttpCache()
+        return _shared_cache
+
+
+def _cached_response(entry, request):
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response._content = entry['body']
+    response.url = request.url
+    response.request = request
+    response.reason = 'OK'
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+
+# Polite session that answers GET requests from an HttpCache and revalidates stale pages
+class CachedSession(PoliteSession):
+    def __init__(self, cache, scheduler=None, retry_after_attempts=3):
+        super().__init__(scheduler, retry_after_attempts)
+        self.cache = cache
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET' or kwargs.get('stream'):
+            return super().send(request, **kwargs)
+
+        key = normalize_url(request.url)
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.record('hits', len(entry['body']))
+            return _cached_response(entry, request)
+
+        if entry is not None:
+            request = request.copy()
+            if entry['etag']:
+                request.headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().send(request, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.cache.refresh(key)
+            self.cache.record('revalidated', len(entry['body']))
+            return _cached_response(entry, request)
+
+        self.cache.record('misses')
+        if response.status_code == 200 and 'no-store' not in response.headers.get('Cache-Control', ''):
+            self.cache.put(key, response)
+        return response
@@ -0,0 +1,132 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Scrape jobs run in a small background pool so /api/scrape can answer right away
+MAX_CONCURRENT_JOBS = 4  # Each job has its own result set; the politeness scheduler still paces every store
+MAX_FINISHED_JOBS = 100  # Finished jobs kept around for status requests
+
+
+def normalize_query(query):
+    return ' '.join(query.lower().split())
+
+
+# Jobs are coalesced on the normalized query and the options they run with
+def job_key(query, options=None):
+    return normalize_query(query), tuple(sorted((options or {}).items()))
+
+
+class ScrapeJob:
+    def __init__(self, query, options=None):
+        self.id = uuid.uuid4().hex
+        self.query = query
+        self.options = options or {}  # Passed through to the runner, e.g. {'incremental': True}
+        self.key = job_key(query, self.options)
+        self.state = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.stores = {}
+        self.items = 0
+        self.stats = {}
+        self.error = None
+        self.lock = threading.Lock()
+
+    # Progress callbacks used by RunSpiders
+    def store_started(self, store):
+        with self.lock:
+            self.stores[store] = {'state': 'running', 'items': 0, 'started_at': time.time(), 'finished_at': None, 'seconds': None, 'error': None}
+
+    def store_item(self, store):
+        with self.lock:
+            self.stores[store]['items'] += 1
+            self.items += 1
+
+    # counts holds the product pages that failed ('page_errors') and the fetched/skipped/unchanged page counts of an incremental scrape
+    def store_finished(self, store, error=None, counts=None):
+        with self.lock:
+            progress = self.stores[store]
+            progress['state'] = 'failed' if error else 'succeeded'
+            progress['error'] = str(error) if error else None
+            progress.update(counts or {})
+            progress['finished_at'] = time.time()
+            progress['seconds'] = round(progress['finished_at'] - progress['started_at'], 3)
+
+    def to_dict(self):
+        with self.lock:
+            end = self.finished_at or time.time()
+            return {
+                'job_id': self.id,
+                'query': self.query,
+                'options': dict(self.options),
+                'state': self.state,
+                'items': self.items,
+                'stores': {store: dict(progress) for store, progress in self.stores.items()},
+                'stats': dict(self.stats),
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'seconds': round(end - self.started_at, 3) if self.started_at else None,
+            }
+
+
+# Runs scrape jobs on a bounded pool; a query that is already queued or running with the same options is not started twice
+class JobManager:
+    def __init__(self, runner, max_workers=MAX_CONCURRENT_JOBS):
+        self.runner = runner
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scrape-job')
+        self.jobs = OrderedDict()
+        self.active = {}  # job_key -> job that is queued or running
+        self.lock = threading.Lock()
+
+    # Returns (job, created); created is False when the request was coalesced onto a running job with the same options
+    def submit(self, query, **options):
+        key = job_key(query, options)
+        with self.lock:
+            job = self.active.get(key)
+            if job is not None:
+                return job, False
+            job = ScrapeJob(query, options)
+            self.jobs[job.id] = job
+            self.active[key] = job
+            self._prune()
+        self.executor.submit(self._run, job)
+        return job, True
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    # Ids of every job still known (queued, running or kept for status requests)
+    def job_ids(self):
+        with self.lock:
+            return list(self.jobs)
+
+    def _run(self, job):
+        with job.lock:
+            job.state = 'running'
+            job.started_at = time.time()
+        try:
+            stats = self.runner(job)
+            with job.lock:
+                job.stats = stats or {}
+                job.state = 'succeeded'
+        except Exception as e:
+            print(f"Scrape job {job.id} for '{job.query}' failed: {e}")
+            with job.lock:
+                job.state = 'failed'
+                job.error = str(e)
+        finally:
+            with job.lock:
+                job.finished_at = time.time()
+            with self.lock:
+                if self.active.get(job.key) is job:
+                    del self.active[job.key]
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
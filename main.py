@@ -1,10 +1,8 @@
-from run_spiders import RunSpiders
-from data_processing import process_and_save
+from pipeline import run_pipeline
 
 
 
 if __name__ == '__main__':
     x = input()
-    RunSpiders(x)
-    process_and_save(x)
+    run_pipeline(x, export_csv=True)
     
\ No newline at end of file
@@ -0,0 +1,142 @@
+import re
+from collections import Counter, defaultdict
+from sqlalchemy import bindparam
+from database_setup import db, Product
+
+# Cross-store product matching. Every product gets a set of model codes (its normalized model string plus
+# model-like tokens of its title). Products are only compared with others that share a blocking key,
+# a prefix of one of those codes, so the work grows with the number of products instead of its square.
+# Matched products end up with the same product_group_id: the smallest id in the group. Products that match
+# no other product have none (NULL), so new unmatched products don't have to be written.
+
+MIN_CODE_LENGTH = 7  # Shorter codes are series names (DU7000, C350) rather than model numbers
+BLOCK_KEY_LENGTH = MIN_CODE_LENGTH  # Blocking key: the first characters of a model code, shared by any two codes that match
+MAX_BLOCK_SIZE = 200  # Larger blocks come from generic codes and are not compared pair by pair
+UPDATE_BATCH_SIZE = 1000
+
+CODE_PATTERN = re.compile(r'[^0-9A-Z]')
+TOKEN_PATTERN = re.compile(r'[0-9A-Za-z][0-9A-Za-z./-]*')
+UNKNOWN_VALUES = {'', 'N/A', 'NAN', 'NONE'}
+
+
+# Function to reduce a model string to upper-case letters and digits ('UA-55 DU7000' -> 'UA55DU7000')
+def normalize_model(model):
+    return CODE_PATTERN.sub('', str(model or '').upper())
+
+
+# Function to decide if a code can be a model number: long enough and made of letters and digits
+def is_model_code(code):
+    return len(code) >= MIN_CODE_LENGTH and not code.isalpha() and not code.isdigit()
+
+
+# Function to get every model code of a product: its model field plus model-like words of its title
+def model_codes(title, model):
+    codes = {normalize_model(token) for token in TOKEN_PATTERN.findall(str(title or ''))}
+    codes.add(normalize_model(model))
+    return {code for code in codes if is_model_code(code)}
+
+
+def normalize_brand(brand):
+    brand = str(brand or '').strip().upper()
+    return None if brand in UNKNOWN_VALUES else brand
+
+
+# Function to compare the model codes of two products; a code may extend the other with a regional suffix (UXJO, .AMAE)
+def codes_match(codes, other_codes):
+    for code in codes:
+        for other in other_codes:
+            if code.startswith(other) or other.startswith(code):
+                return True
+    return False
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)  # The smallest id becomes the group id
+
+
+# Function to group products that are the same item at different stores.
+# products is an iterable of (id, title, model, brand, store); returns {id: group id}.
+def match_products(products):
+    records = {}
+    blocks = defaultdict(list)
+    for product_id, title, model, brand, store in products:
+        codes = model_codes(title, model)
+        records[product_id] = (codes, normalize_brand(brand), store)
+        for code in codes:
+            blocks[code[:BLOCK_KEY_LENGTH]].append(product_id)
+
+    groups = UnionFind()
+    compared = set()
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+        for i, product_id in enumerate(members):
+            codes, brand, store = records[product_id]
+            for other_id in members[i + 1:]:
+                pair = (product_id, other_id) if product_id < other_id else (other_id, product_id)
+                if pair in compared:
+                    continue
+                compared.add(pair)
+                other_codes, other_brand, other_store = records[other_id]
+                if store == other_store:
+                    continue  # A store lists each product once
+                if brand and other_brand and brand != other_brand:
+                    continue
+                if codes_match(codes, other_codes):
+                    groups.union(product_id, other_id)
+
+    return {product_id: groups.find(product_id) for product_id in records}
+
+
+# Function to match every product in the database and store the group ids that changed (must run inside an app context)
+def assign_product_groups():
+    rows = db.session.query(Product.id, Product.title, Product.model, Product.brand, Product.store, Product.product_group_id).all()
+    current = {row[0]: row[5] for row in rows}
+    groups = match_products(row[:5] for row in rows)
+    sizes = Counter(groups.values())
+    stored = {product_id: group_id if sizes[group_id] > 1 else None for product_id, group_id in groups.items()}
+
+    changes = [{'product_id': product_id, 'group_id': group_id} for product_id, group_id in stored.items() if current[product_id] != group_id]
+    table = Product.__table__
+    # Grouping is not a content change, so the timestamp used for freshness is left alone
+    statement = table.update().where(table.c.id == bindparam('product_id')).values(
+        product_group_id=bindparam('group_id'), timestamp=table.c.timestamp
+    )
+    for start in range(0, len(changes), UPDATE_BATCH_SIZE):
+        db.session.execute(statement, changes[start:start + UPDATE_BATCH_SIZE])
+    db.session.commit()
+
+    return {
+        'products': len(groups),
+        'matched': sum(size for size in sizes.values() if size > 1),
+        'groups': sum(1 for size in sizes.values() if size > 1),
+        'changed': len(changes),
+    }
+
+
+# Function to score predicted groups against labelled ones, counting pairs of products put in the same group
+def evaluate_matches(predicted, labels):
+    def pairs(groups):
+        members = defaultdict(list)
+        for product_id, group in groups.items():
+            members[group].append(product_id)
+        return {(a, b) for ids in members.values() for i, a in enumerate(sorted(ids)) for b in sorted(ids)[i + 1:]}
+
+    predicted_pairs, true_pairs = pairs(predicted), pairs(labels)
+    correct = len(predicted_pairs & true_pairs)
+    return {
+        'precision': correct / len(predicted_pairs) if predicted_pairs else 1.0,
+        'recall': correct / len(true_pairs) if true_pairs else 1.0,
+    }
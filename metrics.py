@@ -0,0 +1,225 @@
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Crawl and pipeline instrumentation. Every fetch, parse, cleaning and upsert step is recorded in
+# process-wide counters and histograms, served in the Prometheus text format on /metrics, and in the
+# CrawlMetrics of the crawl it ran for (a job's summary). Recording is a lock and a few additions,
+# cheap enough to stay on in production.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # Seconds
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)  # Seconds per batch
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in [*zip(names, values), *extra]]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        return [f'{self.name}{_format_labels(self.labels, key)} {value}' for key, value in sorted(values.items())]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}  # Label values -> [count per bucket (+Inf last), sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self.lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                entry = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self.lock:
+            values = {key: ([*entry[0]], entry[1], entry[2]) for key, entry in self.values.items()}
+        lines = []
+        for key, (buckets, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip([*map(str, self.buckets), '+Inf'], buckets):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, [("le", bound)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    # Function to write every metric in the Prometheus text exposition format
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+HTTP_REQUESTS = REGISTRY.counter('smartspider_http_requests_total', 'HTTP requests sent to the stores.', ['host', 'status'])
+HTTP_RETRIES = REGISTRY.counter('smartspider_http_retries_total', 'Requests repeated after an error or a Retry-After answer.', ['host'])
+HTTP_BYTES = REGISTRY.counter('smartspider_http_response_bytes_total', 'Bytes of response bodies downloaded.', ['host'])
+HTTP_SECONDS = REGISTRY.histogram('smartspider_http_request_seconds', 'Time from sending a request to having its body.', ['host'])
+HTTP_WAIT_SECONDS = REGISTRY.histogram('smartspider_http_wait_seconds', 'Time a request waited for the politeness scheduler.', ['host'])
+PARSE_SECONDS = REGISTRY.histogram('smartspider_parse_seconds', 'Time spent parsing one product page.', ['host'])
+STAGE_SECONDS = REGISTRY.histogram('smartspider_stage_seconds', 'Time spent per batch in each pipeline stage.', ['stage'], STAGE_BUCKETS)
+STAGE_ROWS = REGISTRY.counter('smartspider_stage_rows_total', 'Products handled by each pipeline stage.', ['stage'])
+
+
+# The numbers of one crawl, for the summary of a scrape job
+class CrawlMetrics:
+    def __init__(self):
+        self.hosts = {}
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def _host(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = {
+                'requests': 0, 'errors': 0, 'retries': 0, 'bytes': 0,
+                'fetch_seconds': 0.0, 'max_fetch_seconds': 0.0, 'wait_seconds': 0.0, 'pages_parsed': 0, 'parse_seconds': 0.0,
+            }
+        return self.hosts[host]
+
+    def add_request(self, host, status, seconds, wait_seconds, size, retries):
+        with self.lock:
+            entry = self._host(host)
+            entry['requests'] += 1
+            entry['errors'] += status == 'error' or status >= 400
+            entry['retries'] += retries
+            entry['bytes'] += size
+            entry['fetch_seconds'] += seconds
+            entry['max_fetch_seconds'] = max(entry['max_fetch_seconds'], seconds)
+            entry['wait_seconds'] += wait_seconds
+
+    def add_parse(self, host, seconds):
+        with self.lock:
+            entry = self._host(host)
+            entry['pages_parsed'] += 1
+            entry['parse_seconds'] += seconds
+
+    def add_stage(self, stage, seconds, rows):
+        with self.lock:
+            entry = self.stages.setdefault(stage, {'batches': 0, 'rows': 0, 'seconds': 0.0})
+            entry['batches'] += 1
+            entry['rows'] += rows
+            entry['seconds'] += seconds
+
+    def summary(self):
+        with self.lock:
+            hosts = {}
+            for host, entry in self.hosts.items():
+                hosts[host] = {key: round(value, 4) if isinstance(value, float) else value for key, value in entry.items()}
+                hosts[host]['avg_fetch_seconds'] = round(entry['fetch_seconds'] / entry['requests'], 4) if entry['requests'] else None
+                hosts[host]['avg_parse_seconds'] = round(entry['parse_seconds'] / entry['pages_parsed'], 4) if entry['pages_parsed'] else None
+            stages = {stage: dict(entry, seconds=round(entry['seconds'], 4)) for stage, entry in self.stages.items()}
+        return {'hosts': hosts, 'stages': stages}
+
+
+# CrawlMetrics of the crawl the current code runs for. Threads do not inherit it by themselves;
+# executors that crawl for a job submit their work through in_current_context.
+_current = contextvars.ContextVar('crawl_metrics', default=None)
+
+
+@contextmanager
+def collecting(crawl_metrics):
+    token = _current.set(crawl_metrics)
+    try:
+        yield crawl_metrics
+    finally:
+        _current.reset(token)
+
+
+# Function to wrap fn so it runs with the caller's context (and so its CrawlMetrics) in another thread
+def in_current_context(fn):
+    context = contextvars.copy_context()
+    return functools.partial(context.run, fn)
+
+
+def observe_request(host, status, seconds, wait_seconds=0.0, size=0, retries=0):
+    HTTP_REQUESTS.inc(host, str(status))
+    HTTP_SECONDS.observe(seconds, host)
+    HTTP_WAIT_SECONDS.observe(wait_seconds, host)
+    if size:
+        HTTP_BYTES.inc(host, amount=size)
+    if retries:
+        HTTP_RETRIES.inc(host, amount=retries)
+    crawl_metrics = _current.get()
+    if crawl_metrics is not None:
+        crawl_metrics.add_request(host, status, seconds, wait_seconds, size, retries)
+
+
+def observe_parse(host, seconds):
+    PARSE_SECONDS.observe(seconds, host)
+    crawl_metrics = _current.get()
+    if crawl_metrics is not None:
+        crawl_metrics.add_parse(host, seconds)
+
+
+def observe_stage(stage, seconds, rows=0):
+    STAGE_SECONDS.observe(seconds, stage)
+    STAGE_ROWS.inc(stage, amount=rows)
+    crawl_metrics = _current.get()
+    if crawl_metrics is not None:
+        crawl_metrics.add_stage(stage, seconds, rows)
+
+
+# Decorator timing a pipeline stage; rows is read from the first argument (a DataFrame or a list)
+def timed_stage(stage):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(data, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(data, *args, **kwargs)
+            finally:
+                observe_stage(stage, time.perf_counter() - started, len(data))
+        return wrapper
+    return decorator
@@ -0,0 +1,93 @@
+import base64
+import binascii
+import json
+from sqlalchemy import and_, or_
+
+# Keyset (cursor) pagination and streamed JSON for the product listings.
+# A page is read with "WHERE (sort keys) come after the cursor ... LIMIT n", so every page costs the
+# same no matter how deep the client has paged, and a streamed export never holds the whole table.
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+STREAM_CHUNK_SIZE = 500  # Rows fetched from the database cursor at a time while streaming
+STREAM_FORMATS = {'ndjson': 'application/x-ndjson', 'json': 'application/json'}
+
+
+class PaginationError(ValueError):
+    pass
+
+
+# Function to turn the values of the last row's sort keys into an opaque cursor string
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+# Function to read a cursor back into the sort key values it was made from
+def decode_cursor(cursor, count):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise PaginationError('Invalid cursor.')
+    if not isinstance(values, list) or len(values) != count:
+        raise PaginationError('Invalid cursor.')
+    return values
+
+
+# Function to read limit/cursor/stream from the query string; paginated is False when none of them was given
+def parse_page_args(args):
+    paginated = 'limit' in args or 'cursor' in args
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise PaginationError('limit must be an integer.')
+    if limit < 1:
+        raise PaginationError('limit must be at least 1.')
+    stream = args.get('stream', '').strip().lower() or None
+    if stream and stream not in STREAM_FORMATS:
+        raise PaginationError(f"stream must be one of: {', '.join(STREAM_FORMATS)}.")
+    return paginated, min(limit, MAX_LIMIT), args.get('cursor') or None, stream
+
+
+# Function to order a query by its sort keys and skip everything up to the cursor.
+# keys is a list of (expression, descending) pairs and must end with a unique column such as the id.
+def apply_keyset(query, keys, cursor=None):
+    query = query.add_columns(*(expression for expression, _ in keys))
+    query = query.order_by(None).order_by(*(expression.desc() if descending else expression for expression, descending in keys))
+    if cursor is None:
+        return query
+    values = decode_cursor(cursor, len(keys))
+    # (k1 after v1) OR (k1 = v1 AND k2 after v2) OR ...
+    conditions = []
+    for i, (expression, descending) in enumerate(keys):
+        after = expression < values[i] if descending else expression > values[i]
+        conditions.append(and_(*(keys[j][0] == values[j] for j in range(i)), after))
+    return query.filter(or_(*conditions))
+
+
+# Function to fetch one page; rows come from a query built by apply_keyset
+def fetch_page(query, keys, limit, cursor, serialize):
+    rows = apply_keyset(query, keys, cursor).limit(limit + 1).all()
+    next_cursor = encode_cursor(list(rows[limit - 1][1:])) if len(rows) > limit else None
+    return {
+        "items": [serialize(row[0]) for row in rows[:limit]],
+        "next_cursor": next_cursor,
+        "limit": limit,
+    }
+
+
+# Function to stream the serialized rows of a query one chunk at a time, as NDJSON lines or as one JSON array.
+# The cursor is checked right away, so a bad one raises before the response has started.
+def stream_rows(query, keys, cursor, serialize, stream):
+    rows = apply_keyset(query, keys, cursor).yield_per(STREAM_CHUNK_SIZE)
+
+    def ndjson():
+        for row in rows:
+            yield json.dumps(serialize(row[0])) + '\n'
+
+    def json_array():
+        yield '['
+        for i, row in enumerate(rows):
+            yield (',' if i else '') + json.dumps(serialize(row[0]))
+        yield ']\n'
+
+    return ndjson() if stream == 'ndjson' else json_array()
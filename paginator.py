@@ -0,0 +1,77 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from html_parser import parse_html
+from metrics import in_current_context
+
+# Search result pagination shared by the spiders. Listing pages are read in order until max_pages, an
+# empty page, a page that repeats an earlier one (stores that answer every page past the end with the
+# last one), an error status, or the last page announced by the store's pagination links. The next page
+# is downloaded while the product URLs of the current one are being dispatched.
+
+# Shopify ("pagination") and WooCommerce ("page-numbers", "woocommerce-pagination") pagination blocks
+PAGINATION_SELECTOR = '.pagination, .page-numbers, .woocommerce-pagination'
+PAGE_IN_HREF = re.compile(r'(?:[?&](?:page|paged)=|/page/)(\d+)')
+
+
+# Function to read the highest page number linked from the pagination block, or None without one
+def last_page_number(soup):
+    numbers = []
+    for block in soup.select(PAGINATION_SELECTOR):
+        for tag in block.find_all(['a', 'span']) or [block]:
+            text = tag.get_text(strip=True)
+            if text.isdigit():
+                numbers.append(int(text))
+            match = PAGE_IN_HREF.search(tag.get('href', ''))
+            if match:
+                numbers.append(int(match.group(1)))
+    return max(numbers) if numbers else None
+
+
+# Function to read one listing page: (product URLs, last page number or None), or None on an error status
+def read_page(fetch, url, parse, parser=None):
+    response = fetch(url)
+    if response.status_code >= 400:
+        return None
+    soup = parse_html(response.content, parser)
+    return parse(soup), last_page_number(soup)
+
+
+# Function to yield the product URLs of each listing page. fetch(url) returns a response, page_url(page)
+# the URL of a page (from 1) and parse(soup) the product URLs on it. parser is the html_parser backend.
+def paginate(fetch, page_url, parse, max_pages, prefetch=True, parser=None):
+    seen_pages = set()
+    last_page = None
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(in_current_context(read_page), fetch, page_url(1), parse, parser) if max_pages >= 1 else None
+        page = 1
+        while pending is not None:
+            result = pending.result()
+            pending = None
+            if result is None:
+                break  # Error status: past the last page, or the store is failing
+            urls, announced = result
+            key = frozenset(urls)
+            if not urls or key in seen_pages:
+                break
+            seen_pages.add(key)
+            if announced is not None:
+                last_page = max(last_page or 0, announced, page)
+
+            has_next = page < max_pages and (last_page is None or page < last_page)
+            if has_next and prefetch:
+                pending = executor.submit(in_current_context(read_page), fetch, page_url(page + 1), parse, parser)
+            yield urls
+            if has_next and not prefetch:
+                pending = executor.submit(in_current_context(read_page), fetch, page_url(page + 1), parse, parser)
+            page += 1
+
+
+# Function to flatten the pages into the product URLs still to fetch, applying the crawl's URL dedup and
+# recrawl selection page by page, so page 1's products are dispatched before page 2 is read
+def new_product_urls(pages, dedup=None, recrawl=None):
+    for urls in pages:
+        if dedup is not None:
+            urls = dedup.select(urls)  # Skip links already seen in this crawl
+        if recrawl is not None:
+            urls = recrawl.select(urls)  # Skip products refreshed recently
+        yield from urls
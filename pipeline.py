@@ -0,0 +1,155 @@
+import contextvars
+import os
+import queue
+import threading
+import time
+import pandas as pd
+from data_processing import app, db, upgrade_schema, normalize_columns, clean_frame, save_products, fill_missing_prices
+from run_spiders import RunSpiders
+from recrawl import DEFAULT_MAX_AGE, RecrawlState
+from matching import assign_product_groups
+from metrics import CrawlMetrics, collecting, observe_stage
+from sinks import CsvSink, SCRAPED_DATA_DIR
+from url_dedup import UrlDeduplicator
+
+# Streaming pipeline: spiders push products into a bounded queue while a consumer thread
+# cleans them and saves them in small batches, so ingest overlaps with crawling.
+
+QUEUE_SIZE = 500  # Spiders block when this many products are waiting to be saved
+BATCH_SIZE = 50  # Products saved per database transaction
+FLUSH_INTERVAL = 1.0  # Seconds before a partial batch is saved anyway
+
+_END = object()
+
+
+class ProductStream:
+    def __init__(self, maxsize=QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    # Used as the spiders' sink
+    def put(self, product):
+        self.queue.put(product)
+
+    def close(self):
+        self.queue.put(_END)
+
+
+# Consumer thread that normalizes products and saves them in micro-batches
+class StreamingIngestor(threading.Thread):
+    def __init__(self, stream, query, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, on_saved=None, job_id=None):
+        super().__init__(daemon=True)
+        self.stream = stream
+        self.query = query
+        self.job_id = job_id  # Saved products are added to this job's result set
+        self.on_saved = on_saved  # Called after every batch that changed the products table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = {'received': 0, 'inserted': 0, 'updated': 0, 'batches': 0, 'failed_batches': 0}
+        self.context = contextvars.copy_context()  # Cleaning and upsert times go to the metrics of the crawl that started it
+
+    def run(self):
+        self.context.run(self.ingest)
+
+    def ingest(self):
+        with app.app_context():
+            db.create_all()
+            upgrade_schema()
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                try:
+                    product = self.stream.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    product = None
+
+                if product is _END:
+                    break
+                if product is not None:
+                    batch.append(product)
+                    self.stats['received'] += 1
+                if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                    if batch:
+                        self.flush(batch)
+                        batch = []
+                    deadline = time.monotonic() + self.flush_interval
+            if batch:
+                self.flush(batch)
+
+    def flush(self, batch):
+        try:
+            data = normalize_columns(pd.DataFrame(batch))
+            saved = save_products(clean_frame(data, self.query), job_id=self.job_id)
+            self.stats['inserted'] += saved['inserted']
+            self.stats['updated'] += saved['updated']
+            self.stats['batches'] += 1
+            if self.on_saved is not None:
+                self.on_saved()
+        except Exception as e:
+            db.session.rollback()
+            self.stats['failed_batches'] += 1
+            print(f"Failed to save a batch of {len(batch)} products: {e}")
+
+
+# Main function to crawl every store and save the products while the crawl is still running.
+# With incremental=True, product pages refreshed in the last max_age seconds or unchanged since the last scrape are reused.
+# With a job_id the products go into that job's result set and CSV exports into Scraped_Data/<job_id>.
+# With fast=True the products are read from the search results pages (see RunSpiders), without most product pages.
+# The returned stats include the crawl's metrics: requests, bytes and fetch/parse times per host, and time per stage.
+def run_pipeline(query, export_csv=False, batch_size=BATCH_SIZE, queue_size=QUEUE_SIZE, session=None, progress=None, on_saved=None,
+                 incremental=False, max_age=DEFAULT_MAX_AGE, job_id=None, fast=False):
+    crawl_metrics = CrawlMetrics()
+    with collecting(crawl_metrics):
+        stats = _run_pipeline(query, export_csv, batch_size, queue_size, session, progress, on_saved, incremental, max_age, job_id, fast)
+    stats['metrics'] = crawl_metrics.summary()
+    print(f"Pipeline finished: {stats}")
+    return stats
+
+
+def _run_pipeline(query, export_csv, batch_size, queue_size, session, progress, on_saved, incremental, max_age, job_id, fast):
+    recrawl = None
+    if incremental:
+        with app.app_context():
+            db.create_all()
+            upgrade_schema()
+            recrawl = RecrawlState.load(max_age)
+
+    dedup = UrlDeduplicator()
+    stream = ProductStream(queue_size)
+    csv_folder = os.path.join(SCRAPED_DATA_DIR, job_id) if job_id else SCRAPED_DATA_DIR
+    csv_sink = CsvSink(csv_folder) if export_csv else None
+    ingestor = StreamingIngestor(stream, query, batch_size, on_saved=on_saved, job_id=job_id)
+    ingestor.start()
+
+    def sink(product):
+        if csv_sink is not None:
+            csv_sink(product)
+        stream.put(product)
+
+    try:
+        RunSpiders(query, sink=sink, session=session, progress=progress, recrawl=recrawl, dedup=dedup, fast=fast)
+    finally:
+        stream.close()
+        ingestor.join()
+        if csv_sink is not None:
+            csv_sink.close()
+    ingestor.stats['dedup'] = dedup.counts()
+
+    if recrawl is not None:
+        with app.app_context():
+            ingestor.stats['reused'] = recrawl.touch(query, job_id)
+        ingestor.stats['recrawl'] = recrawl.counts()
+        if ingestor.stats['reused'] and on_saved is not None:
+            on_saved()
+
+    ingestor.stats['prices_filled'] = fill_missing_prices(query)
+    if ingestor.stats['prices_filled'] and on_saved is not None:
+        on_saved()
+
+    # Link the new products to the same products at other stores
+    with app.app_context():
+        started = time.perf_counter()
+        ingestor.stats['matching'] = assign_product_groups()
+        observe_stage('matching', time.perf_counter() - started, ingestor.stats['matching']['products'])
+    if ingestor.stats['matching']['changed'] and on_saved is not None:
+        on_saved()
+    return ingestor.stats
@@ -0,0 +1,205 @@
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+from urllib3.util.retry import Retry
+from metrics import observe_request
+from transport import ACCEPT_ENCODING, PooledAdapter
+
+# Budget used for any host that has no entry in HOST_LIMITS
+DEFAULT_RATE = 5.0  # Requests per second
+DEFAULT_MAX_IN_FLIGHT = 4  # Requests waiting on the server at the same time
+
+# Per-host politeness budget: host -> (requests per second, max requests in flight)
+HOST_LIMITS = {
+    'smartbuy-me.com': (8.0, 8),
+    'diamondstarjo.com': (8.0, 8),
+    'bmsmena.com': (4.0, 4),
+    'newvision.jo': (4.0, 4),
+    'leaders.jo': (4.0, 4),
+}
+
+# Status codes whose Retry-After header makes every thread back off from the host
+RETRY_AFTER_STATUSES = (429, 503)
+
+
+def host_of(url):
+    host = urlsplit(url).hostname or ''
+    return host[4:] if host.startswith('www.') else host
+
+
+# Function to turn a Retry-After header (seconds or an HTTP date) into a delay in seconds
+def parse_retry_after(value):
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+# urllib3 retry policy that leaves 429/503 answers with a Retry-After to ThrottledAdapter. urllib3 would
+# sleep and retry them inside one send, holding the host's slot while the other threads keep hitting it;
+# ThrottledAdapter blocks the whole host instead and retries with a fresh slot and token.
+class SchedulerRetry(Retry):
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if has_retry_after and status_code in RETRY_AFTER_STATUSES:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+# Token bucket plus in-flight limit for a single host
+class HostBucket:
+    def __init__(self, rate, max_in_flight, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.lock = threading.Lock()
+
+    # Returns 0 when a token was taken, otherwise how long to wait before trying again
+    def try_take(self):
+        with self.lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def block_for(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+# Politeness scheduler shared by every spider and thread: one bucket per host
+class PolitenessScheduler:
+    def __init__(self, limits=None, default_rate=DEFAULT_RATE, default_max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        self.limits = HOST_LIMITS if limits is None else limits
+        self.default_rate = default_rate
+        self.default_max_in_flight = default_max_in_flight
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = host_of(url)
+        with self.lock:
+            if host not in self.buckets:
+                rate, max_in_flight = self.limits.get(host, (self.default_rate, self.default_max_in_flight))
+                self.buckets[host] = HostBucket(rate, max_in_flight)
+            return self.buckets[host]
+
+    # Number of requests to the url's host allowed at the same time (the size of its connection pool)
+    def max_in_flight(self, url):
+        return self.limits.get(host_of(url), (self.default_rate, self.default_max_in_flight))[1]
+
+    # Wait for a free in-flight slot and a token for the url's host
+    def acquire(self, url):
+        bucket = self.bucket(url)
+        bucket.in_flight.acquire()
+        while True:
+            wait = bucket.try_take()
+            if wait <= 0:
+                return bucket
+            time.sleep(wait)
+
+    def release(self, url):
+        self.bucket(url).in_flight.release()
+
+    @contextmanager
+    def slot(self, url):
+        self.acquire(url)
+        try:
+            yield
+        finally:
+            self.release(url)
+
+    # Stop handing out tokens for the host (used for Retry-After)
+    def defer(self, url, seconds):
+        self.bucket(url).block_for(seconds)
+
+
+SHARED_SCHEDULER = PolitenessScheduler()
+
+
+# Wraps the session's real adapter so every request, its redirects and its Retry-After retries go through the scheduler.
+# Other retries (connection errors, retried status codes without Retry-After) are made by urllib3 within the slot.
+class ThrottledAdapter:
+    def __init__(self, adapter, scheduler, retry_after_attempts):
+        self.adapter = adapter
+        self.scheduler = scheduler
+        self.retry_after_attempts = retry_after_attempts
+
+    def send(self, request, **kwargs):
+        host = host_of(request.url)
+        for attempt in range(self.retry_after_attempts + 1):
+            waited = time.perf_counter()
+            with self.scheduler.slot(request.url):
+                started = time.perf_counter()
+                try:
+                    response = self.adapter.send(request, **kwargs)
+                    if not kwargs.get('stream'):
+                        response.content  # Download the body while the slot is still held
+                except Exception:
+                    observe_request(host, 'error', time.perf_counter() - started, started - waited, retries=int(attempt > 0))
+                    raise
+            # Retries made by urllib3 (connection errors, retried status codes) plus our Retry-After ones
+            retries = len(getattr(getattr(response.raw, 'retries', None), 'history', None) or ()) + int(attempt > 0)
+            size = 0 if kwargs.get('stream') else len(response.content)
+            observe_request(host, response.status_code, time.perf_counter() - started, started - waited, size, retries)
+
+            delay = parse_retry_after(response.headers.get('Retry-After')) if response.status_code in RETRY_AFTER_STATUSES else None
+            if delay is None or attempt == self.retry_after_attempts:
+                return response
+            print(f"{host_of(request.url)} answered {response.status_code}, retrying in {delay:.1f}s")
+            self.scheduler.defer(request.url, delay)
+            response.close()
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+# Session whose requests are scheduled per host by a PolitenessScheduler. Connections come from one
+# keep-alive pool per host, sized to the number of requests the scheduler lets through to it.
+class PoliteSession(requests.Session):
+    def __init__(self, scheduler=None, retry_after_attempts=3, max_retries=0):
+        super().__init__()
+        self.scheduler = scheduler or SHARED_SCHEDULER
+        self.retry_after_attempts = retry_after_attempts
+        self.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        adapter = PooledAdapter(self.scheduler.max_in_flight, max_retries=max_retries)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def get_adapter(self, url):
+        return ThrottledAdapter(super().get_adapter(url), self.scheduler, self.retry_after_attempts)
+
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+# Session behind polite_get, created on first use (benchmarks mount their fixture adapters on it)
+def default_session():
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = PoliteSession()
+        return _default_session
+
+
+# Used by spiders that were not handed a session, so they still respect the shared budget
+def polite_get(url, **kwargs):
+    return default_session().get(url, **kwargs)
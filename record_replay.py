@@ -0,0 +1,218 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from http_cache import SKIPPED_HEADERS, normalize_url
+from metrics import CrawlMetrics, collecting, in_current_context
+from rate_limiter import PolitenessScheduler
+from run_spiders import RunSpiders, create_session
+
+# Record/replay transport for the spiders' sessions. create_session(..., transport=Recorder(path)) saves
+# every request/response pair the crawl makes into a zip archive (an index plus one compressed copy of
+# each distinct body); create_session(..., transport=Replayer(path)) answers the same requests from the
+# archive without touching the stores, optionally with simulated latency and bandwidth. The politeness
+# scheduler and retries still run on top, so concurrency and scheduling changes can be load-tested offline.
+# benchmarks/recorded_stores.py records its store pages with the same Recorder and writes them out as files.
+# Usage:
+#   python record_replay.py record crawl.zip --query tv
+#   python record_replay.py replay crawl.zip --latency recorded --bandwidth 2000000 --crawls 8
+
+INDEX_NAME = 'index.json'
+MISSING_STATUS = 404  # Answer to a request the archive has no response for
+
+
+def body_name(digest):
+    return f'bodies/{digest}'
+
+
+# Request/response pairs keyed by method and normalized URL, saved as a zip archive
+class TransportArchive:
+    def __init__(self, entries=None, bodies=None, query=None):
+        self.query = query  # Search the crawl was recorded for
+        self.entries = entries if entries is not None else {}  # (method, key) -> entry without the body
+        self.bodies = bodies if bodies is not None else {}  # sha1 -> body
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        with zipfile.ZipFile(path) as archive:
+            index = json.loads(archive.read(INDEX_NAME))
+            bodies = {digest: archive.read(body_name(digest)) for digest in {entry['body'] for entry in index['entries']}}
+        return cls({(entry['method'], normalize_url(entry['url'])): entry for entry in index['entries']}, bodies, index.get('query'))
+
+    # tags (optional) are saved with the entry, e.g. the store and kind of page it was fetched for
+    def add(self, request, response, elapsed, tags=None):
+        body = response.content
+        digest = hashlib.sha1(body).hexdigest()
+        entry = {
+            'method': request.method,
+            'url': request.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {name: value for name, value in response.headers.items() if name.lower() not in SKIPPED_HEADERS},
+            'elapsed': round(elapsed, 4),
+            'body': digest,
+            **(tags or {}),
+        }
+        with self.lock:
+            self.entries.setdefault((request.method, normalize_url(request.url)), entry)  # The first answer wins
+            self.bodies.setdefault(digest, body)
+
+    def get(self, method, url):
+        entry = self.entries.get((method, normalize_url(url)))
+        return (entry, self.bodies[entry['body']]) if entry is not None else (None, None)
+
+    # Function to get the (entry, body) pairs in the order they were recorded
+    def items(self):
+        with self.lock:
+            return [(entry, self.bodies[entry['body']]) for entry in self.entries.values()]
+
+    def save(self, path):
+        with self.lock:
+            entries, bodies = list(self.entries.values()), dict(self.bodies)
+        tmp_path = f'{path}.tmp'
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(INDEX_NAME, json.dumps({
+                'query': self.query, 'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'entries': entries,
+            }))
+            for digest, body in bodies.items():
+                archive.writestr(body_name(digest), body)
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# Adapter that passes requests on to the real adapter and adds every answer to the archive, with the current tags
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, adapter, archive, tags=None):
+        super().__init__()
+        self.adapter = adapter
+        self.archive = archive
+        self.tags = tags if tags is not None else {}
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        response.content  # The recorded time includes downloading the body
+        self.archive.add(request, response, time.perf_counter() - started, dict(self.tags))
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+# Adapter that answers from the archive. latency is seconds per request, or 'recorded' for the time the
+# store took when the archive was made; bandwidth (bytes per second) adds the transfer time of the body.
+class ReplayAdapter(HTTPAdapter):
+    def __init__(self, archive, latency=0.0, bandwidth=None):
+        super().__init__()
+        self.archive = archive
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.counters = {'hits': 0, 'misses': 0, 'bytes': 0}
+        self.lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        entry, body = self.archive.get(request.method, request.url)
+        with self.lock:
+            self.counters['hits' if entry is not None else 'misses'] += 1
+            self.counters['bytes'] += len(body or b'')
+        if entry is None:
+            entry, body = {'status': MISSING_STATUS, 'reason': 'Not Recorded', 'headers': {'Content-Type': 'text/plain'}, 'elapsed': 0.0}, b''
+
+        delay = entry['elapsed'] if self.latency == 'recorded' else self.latency
+        if self.bandwidth:
+            delay += len(body) / self.bandwidth
+        if delay:
+            time.sleep(delay)
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry['reason']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+    def close(self):
+        pass
+
+
+# Passed to create_session as transport=...; the session's real adapter is wrapped by the recorder.
+# tags are saved with every response recorded while they are set (recorder.tags['store'] = ...).
+class Recorder:
+    def __init__(self, path, query=None):
+        self.path = path
+        self.archive = TransportArchive(query=query)
+        self.tags = {}
+
+    def adapter(self, adapter):
+        return RecordingAdapter(adapter, self.archive, self.tags)
+
+    def save(self):
+        self.archive.save(self.path)
+        return len(self.archive)
+
+
+# Passed to create_session as transport=...; the session's real adapter is replaced by the archive
+class Replayer:
+    def __init__(self, path, latency=0.0, bandwidth=None):
+        self.archive = TransportArchive.load(path)
+        self.replay = ReplayAdapter(self.archive, latency, bandwidth)
+
+    def adapter(self, adapter):
+        return self.replay
+
+    def stats(self):
+        with self.replay.lock:
+            return dict(self.replay.counters, entries=len(self.archive))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record a crawl, or replay a recorded crawl offline.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_command = commands.add_parser('record')
+    record_command.add_argument('archive')
+    record_command.add_argument('--query', required=True)
+    replay_command = commands.add_parser('replay')
+    replay_command.add_argument('archive')
+    replay_command.add_argument('--query', help='defaults to the query the archive was recorded for')
+    replay_command.add_argument('--latency', default='0', help="seconds per request, or 'recorded'")
+    replay_command.add_argument('--bandwidth', type=float, help='bytes per second')
+    replay_command.add_argument('--crawls', type=int, default=1, help='crawls run at the same time')
+    replay_command.add_argument('--unthrottled', action='store_true', help="ignore the stores' politeness limits")
+    args = parser.parse_args()
+
+    products = []
+    if args.command == 'record':
+        recorder = Recorder(args.archive, args.query)
+        RunSpiders(args.query, sink=products.append, session=create_session(retries=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504], transport=recorder))
+        print(f'Recorded {recorder.save()} responses ({len(products)} products) into {args.archive}')
+        return
+
+    replayer = Replayer(args.archive, args.latency if args.latency == 'recorded' else float(args.latency), args.bandwidth)
+    scheduler = PolitenessScheduler(limits={}, default_rate=1_000_000, default_max_in_flight=1024) if args.unthrottled else None
+    session = create_session(retries=0, backoff_factor=0, status_forcelist=[], transport=replayer, **({'scheduler': scheduler} if scheduler else {}))
+    query = args.query or replayer.archive.query
+    start = time.perf_counter()
+    with collecting(CrawlMetrics()) as crawl_metrics, ThreadPoolExecutor(args.crawls) as executor:
+        crawl = lambda: RunSpiders(query, sink=products.append, session=session)
+        for future in [executor.submit(in_current_context(crawl)) for _ in range(args.crawls)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    print(f'{args.crawls} crawl(s), {len(products)} products in {elapsed:.2f}s; replay: {replayer.stats()}')
+    print(json.dumps(crawl_metrics.summary()['hosts'], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import hashlib
+import threading
+import time
+from sqlalchemy import func
+from database_setup import db, Product
+from metrics import observe_parse
+from rate_limiter import host_of
+from result_sets import record_results
+
+# Incremental recrawls: listing pages are always fetched, but a product page refreshed less than
+# max_age seconds ago is skipped, and a fetched page whose HTML hash matches the stored one is not
+# parsed or written again. Those products are only re-tagged with the current query at the end.
+
+DEFAULT_MAX_AGE = 6 * 60 * 60  # Seconds a scraped product counts as fresh
+TOUCH_BATCH_SIZE = 500  # URLs per UPDATE ... WHERE product_url IN (...)
+
+
+def content_hash(content):
+    return hashlib.sha1(content).hexdigest()
+
+
+# What the database already knows about every product, loaded once per scrape (must run inside an app context)
+class RecrawlState:
+    def __init__(self, fresh_urls, hashes):
+        self.fresh_urls = fresh_urls
+        self.hashes = hashes
+        self.skipped = set()  # Fresh URLs that were not fetched
+        self.unchanged = set()  # Fetched URLs whose page had not changed
+        self.stores = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, max_age=DEFAULT_MAX_AGE):
+        fresh = Product.timestamp >= func.datetime('now', f'-{int(max_age)} seconds')
+        rows = db.session.query(Product.product_url, Product.content_hash, fresh).all()
+        return cls({url for url, _, is_fresh in rows if is_fresh}, {url: digest for url, digest, _ in rows if digest})
+
+    def for_store(self, store):
+        with self.lock:
+            if store not in self.stores:
+                self.stores[store] = StoreRecrawl(self, store)
+            return self.stores[store]
+
+    def counts(self):
+        with self.lock:
+            return {store: recrawl.counts() for store, recrawl in self.stores.items()}
+
+    # Function to tag the products that were reused with the current query, so they are listed with this
+    # scrape's results (must run inside an app context). Unchanged pages were just checked, so their
+    # timestamp is refreshed; skipped ones keep theirs. With a job_id they join that job's result set.
+    def touch(self, query, job_id=None):
+        search_query = query.lower() if query else 'n/a'
+        touched = 0
+        for urls, timestamp in ((self.unchanged, func.now()), (self.skipped, Product.timestamp)):
+            urls = sorted(urls)
+            for start in range(0, len(urls), TOUCH_BATCH_SIZE):
+                touched += Product.query.filter(Product.product_url.in_(urls[start:start + TOUCH_BATCH_SIZE])).update(
+                    {Product.search_query: search_query, Product.timestamp: timestamp}, synchronize_session=False
+                )
+        if job_id is not None:
+            record_results(job_id, self.unchanged | self.skipped)
+        db.session.commit()
+        return touched
+
+
+# One store's view of the recrawl state, with its fetched/skipped/unchanged counters
+class StoreRecrawl:
+    def __init__(self, state, store):
+        self.state = state
+        self.store = store
+        self.fetched = 0
+        self.skipped = 0
+        self.unchanged = 0
+        self.lock = threading.Lock()
+
+    # Function to drop the product URLs that are still fresh
+    def select(self, urls):
+        selected, skipped = [], []
+        for url in dict.fromkeys(urls):
+            (skipped if url.strip() in self.state.fresh_urls else selected).append(url)
+        with self.lock:
+            self.skipped += len(skipped)
+        with self.state.lock:
+            self.state.skipped.update(url.strip() for url in skipped)
+        return selected
+
+    # Function to record a fetched page; returns its hash, or None when the page is the same as last time
+    def check(self, url, content):
+        digest = content_hash(content)
+        unchanged = self.state.hashes.get(url.strip()) == digest
+        with self.lock:
+            self.fetched += 1
+            self.unchanged += unchanged
+        if unchanged:
+            with self.state.lock:
+                self.state.unchanged.add(url.strip())
+            return None
+        return digest
+
+    def counts(self):
+        with self.lock:
+            return {'fetched': self.fetched, 'skipped': self.skipped, 'unchanged': self.unchanged}
+
+
+# Function to build the fetch function a spider hands to fetch_concurrently from its download and parse steps.
+# Without a recrawl every page is parsed; with one, unchanged pages yield nothing and new ones carry their hash.
+# Parse times are recorded in the crawl metrics.
+def product_fetcher(fetch_page, parse_page, recrawl=None):
+    def parse(url, content):
+        started = time.perf_counter()
+        try:
+            return parse_page(url, content)
+        finally:
+            observe_parse(host_of(url), time.perf_counter() - started)
+
+    def fetch_product(url):
+        content = fetch_page(url)
+        if recrawl is None:
+            return parse(url, content)
+        digest = recrawl.check(url, content)
+        if digest is None:
+            return None
+        product = parse(url, content)
+        if product is not None:
+            product['Content Hash'] = digest
+        return product
+    return fetch_product
@@ -0,0 +1,119 @@
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import Response, current_app, request
+
+# In-process cache for the read endpoints. Entries are keyed by the dataset version, the data being served
+# (scope, e.g. the app's database), the path and the query string; every write bumps the version, so a cached
+# response never outlives the data it was built from, and apps serving different databases never share one.
+# Writers in other processes (crawl workers) can't bump it: they touch a stamp file next to the database
+# instead (mark_changed), and the stamp's modification time is part of the version of the caches watching it.
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 300  # Seconds; a safety net, writes already invalidate the cache
+
+
+class CachedResponse:
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.stored_at = time.monotonic()
+
+
+def _stamp_time(stamp_path):
+    try:
+        return os.stat(stamp_path).st_mtime_ns
+    except (OSError, TypeError):
+        return 0
+
+
+# Function for writers in other processes: mark the data as changed for the caches watching the stamp file
+def mark_changed(stamp_path):
+    if stamp_path is None:
+        return
+    changed = max(time.time_ns(), _stamp_time(stamp_path) + 1)  # The file system's own clock is too coarse
+    with open(stamp_path, 'a'):
+        pass
+    os.utime(stamp_path, ns=(changed, changed))
+
+
+# stamp (optional): function giving the stamp file of the data being served (called while handling a request)
+# scope (optional): function giving what identifies the data being served (called while handling a request)
+class ResponseCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, stamp=None, scope=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stamp = stamp
+        self.scope = scope
+        self.entries = OrderedDict()
+        self.version = 0
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry.stored_at > self.ttl:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return entry
+
+    # The version of the data: bumped by invalidate, and by the other processes through the stamp file
+    def current_version(self):
+        if self.stamp is None:
+            return self.version
+        return self.version, _stamp_time(self.stamp())
+
+    def put(self, key, entry):
+        with self.lock:
+            if key[0] != self.current_version():
+                return  # The data changed while the response was being built
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    # Function to call after every write to the products table
+    def invalidate(self):
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
+            self.counters['invalidations'] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, entries=len(self.entries), version=self.version)
+
+    # Decorator for GET views: serves cached bodies with a strong ETag and answers If-None-Match with 304
+    def cached(self, view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            scope = self.scope() if self.scope is not None else None
+            key = (self.current_version(), scope, request.path, tuple(sorted(request.args.items(multi=True))))
+            entry = self.get(key)
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = CachedResponse(response.get_data(), response.mimetype)
+                self.put(key, entry)
+
+            if entry.etag in request.if_none_match:
+                with self.lock:
+                    self.counters['not_modified'] += 1
+                response = Response(status=304)
+            else:
+                response = Response(entry.body, mimetype=entry.mimetype)
+            response.set_etag(entry.etag)
+            response.headers['Cache-Control'] = 'no-cache'  # Clients may keep the body but must revalidate
+            return response
+        return wrapper
@@ -0,0 +1,39 @@
+from sqlalchemy import and_, bindparam, or_, text
+from database_setup import db, Product, JobProduct
+
+# Job-scoped result sets. Products stay one row per product URL, shared by every job, and each job
+# lists the products it found in job_products. Unsaved products are only removed once no job that is
+# still known lists them, so a scrape starting never deletes the results of one that is running.
+
+RECORD_BATCH_SIZE = 500  # URLs per INSERT ... SELECT ... WHERE product_url IN (...)
+
+
+# Function to add products to a job's result set by URL. Runs in the caller's transaction, so products
+# and their result set rows are committed together (must run inside an app context).
+def record_results(job_id, product_urls):
+    urls = sorted(set(product_urls))
+    statement = text(
+        'INSERT OR IGNORE INTO job_products (job_id, product_id) '
+        'SELECT :job_id, id FROM products WHERE product_url IN :urls'
+    ).bindparams(bindparam('urls', expanding=True))
+    for start in range(0, len(urls), RECORD_BATCH_SIZE):
+        db.session.execute(statement, {'job_id': job_id, 'urls': urls[start:start + RECORD_BATCH_SIZE]})
+
+
+# Function to drop the result sets of jobs that are gone, then every unsaved product no remaining
+# job lists (must run inside an app context). Returns the number of deleted products.
+def release_products(keep_job_ids):
+    keep_job_ids = list(keep_job_ids)
+    JobProduct.query.filter(JobProduct.job_id.notin_(keep_job_ids)).delete(synchronize_session=False)
+    listed = db.session.query(JobProduct.product_id)
+    deleted = Product.query.filter(
+        or_(Product.saved == False, Product.saved == None),
+        Product.id.notin_(listed),
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+# Function to limit a Product query to one job's results
+def filter_job_results(products_query, job_id):
+    return products_query.join(JobProduct, and_(JobProduct.product_id == Product.id, JobProduct.job_id == job_id))
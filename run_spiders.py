@@ -1,48 +1,105 @@
-import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
+from rate_limiter import PoliteSession, SchedulerRetry, SHARED_SCHEDULER
+from http_cache import CachedSession, get_shared_cache
+from transport import PooledAdapter, transport_stats
+from url_dedup import UrlDeduplicator
+from metrics import in_current_context
+from concurrent_fetch import DEFAULT_MAX_WORKERS
 from Spiders.DiamondStar_Spider import CrawlDiamondStar
 from Spiders.BMS_Spider import CrawlBMS
 from Spiders.SmartBuy_Spider import CrawlSmartBuy
 from Spiders.Leaders_Spider import CrawlLeaders
 from Spiders.LGvision_Spider import CrawlLGvision
 
-def create_session(retries, backoff_factor, status_forcelist):
-    session = requests.Session()
-    retry = Retry(
+# Max number of product pages fetched at the same time for each store
+STORE_CONCURRENCY = {
+    'CrawlBMS': 4,
+    'CrawlDiamondStar': 8,
+    'CrawlLGvision': 4,
+    'CrawlSmartBuy': 8,
+}
+
+# transport (optional) is a record_replay Recorder or Replayer: the crawl is then saved to, or answered from, an archive
+def create_session(retries, backoff_factor, status_forcelist, scheduler=SHARED_SCHEDULER, cache=None, transport=None):
+    # Requests are paced per host by the shared politeness scheduler, and answered from the page cache when one is given
+    session = CachedSession(cache, scheduler) if cache is not None else PoliteSession(scheduler)
+    # 429/503 answers with a Retry-After are retried by the session, which defers the whole host
+    retry = SchedulerRetry(
         total=retries,
         read=retries,
         connect=retries,
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist,
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    # One keep-alive pool per store host, as large as the scheduler's in-flight limit for it
+    adapter = PooledAdapter(scheduler.max_in_flight, max_retries=retry)
+    if transport is not None:
+        adapter = transport.adapter(adapter)
     session.mount('http://', adapter)
     session.mount('https://', adapter)
     return session
 
-def RunSpiders(query):
+# progress (optional) is told when each spider starts, emits a product and finishes.
+# recrawl (optional) is a RecrawlState: fresh and unchanged product pages are then skipped.
+# dedup (optional) is the UrlDeduplicator of the crawl; a product linked more than once is only fetched once.
+# fast=True reads the products from the search results pages and only fetches the product pages of the
+# products whose card lacks a title, price, model or category (or one of the tuple of fields given instead of True).
+def RunSpiders(query, concurrency=None, sink=None, session=None, progress=None, recrawl=None, dedup=None, fast=False):
     search_term = query
     pages = 3
-    session = create_session(retries=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504])
+    cache = None  # The page cache is only used by the session built here
+    if session is None:
+        cache = get_shared_cache()
+        session = create_session(retries=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504], cache=cache)
     spiders = [
         CrawlBMS,
         CrawlDiamondStar,
         CrawlLGvision,
         CrawlSmartBuy
     ]
+    concurrency = {**STORE_CONCURRENCY, **(concurrency or {})}
+    if dedup is None:
+        dedup = UrlDeduplicator()
+
+    def run_spider(spider):
+        spider_name = spider.__name__
+        spider_sink = sink
+        if progress is not None:
+            progress.store_started(spider_name)
+            if sink is not None:
+                spider_sink = lambda product: (progress.store_item(spider_name), sink(product))
+        store_recrawl = recrawl.for_store(spider_name) if recrawl is not None else None
+        errors = []  # Product pages that failed; the store's other products are still scraped
+        spider(search_term, pages, session, concurrency.get(spider_name, DEFAULT_MAX_WORKERS), sink=spider_sink, recrawl=store_recrawl,
+               dedup=dedup.for_store(spider_name), fast=fast, errors=errors)
+        return errors
     
     with ThreadPoolExecutor() as executor:
-        futures = {executor.submit(spider, search_term, pages, session): spider.__name__ for spider in spiders}
+        futures = {executor.submit(in_current_context(run_spider), spider): spider.__name__ for spider in spiders}
         
         for future in as_completed(futures):
             spider_name = futures[future]
+            page_errors = []
             try:
-                future.result()
-                print(f'{spider_name} completed successfully.')
+                page_errors = future.result()
+                print(f'{spider_name} completed successfully ({len(page_errors)} product pages failed).')
+                error = None
             except Exception as e:
                 print(f'{spider_name} generated an exception: {e}')
+                error = e
+            if progress is not None:
+                counts = dedup.for_store(spider_name).counts()
+                counts['page_errors'] = [f'{url}: {e}' for url, e in page_errors]
+                if recrawl is not None:
+                    counts.update(recrawl.for_store(spider_name).counts())
+                progress.store_finished(spider_name, error, counts)
+
+    if cache is not None:
+        print(f'HTTP cache: {cache.stats()}')
+    print(f'Connections: {transport_stats(session)}')
+    print(f'URL dedup: {dedup.counts()}')
+    if recrawl is not None:
+        print(f'Recrawl: {recrawl.counts()}')
 
 
 '''def RunSpiders():
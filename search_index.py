@@ -0,0 +1,75 @@
+import re
+from sqlalchemy import Float, column, false, literal_column, table, text
+
+# SQLite FTS5 index over the product text. It is an external-content table on top of `products`
+# and is kept in sync by triggers, so every insert, upsert and delete updates it automatically.
+
+FTS_TABLE = 'products_fts'
+
+# Weight of each indexed column when ranking (title, model, brand, category)
+COLUMN_WEIGHTS = (5.0, 10.0, 3.0, 2.0)
+RANK = f"bm25({FTS_TABLE}, {', '.join(str(w) for w in COLUMN_WEIGHTS)})"
+
+CREATE_STATEMENTS = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, model, brand, category,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, title, model, brand, category)
+        VALUES (new.id, new.title, new.model, new.brand, new.category);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, model, brand, category)
+        VALUES ('delete', old.id, old.title, old.model, old.brand, old.category);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF title, model, brand, category ON products BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, model, brand, category)
+        VALUES ('delete', old.id, old.title, old.model, old.brand, old.category);
+        INSERT INTO {FTS_TABLE} (rowid, title, model, brand, category)
+        VALUES (new.id, new.title, new.model, new.brand, new.category);
+    END''',
+]
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+_ready_engines = set()
+
+
+# Function to create the index and its triggers, filling it from the existing products the first time
+def ensure_search_index(engine):
+    if str(engine.url) in _ready_engines:
+        return
+    with engine.begin() as conn:
+        exists = conn.exec_driver_sql(f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{FTS_TABLE}'").first()
+        for statement in CREATE_STATEMENTS:
+            conn.exec_driver_sql(statement)
+        if not exists:
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+    _ready_engines.add(str(engine.url))
+
+
+# Function to turn user input into an FTS5 query: every word must match, as a whole word or a prefix
+def build_match_query(search_text):
+    tokens = TOKEN_PATTERN.findall(search_text.lower())
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+# Function to get the bm25 score of each match (lower is better); only valid on a query built by apply_search
+def search_rank():
+    return literal_column(RANK, Float)
+
+
+# Function to limit a Product query to full-text matches, best match first
+def apply_search(products_query, model, search_text):
+    match_query = build_match_query(search_text)
+    if not match_query:
+        return products_query.filter(false())
+    ensure_search_index(products_query.session.get_bind())
+    fts = table(FTS_TABLE, column('rowid'))
+    return (
+        products_query.join(fts, fts.c.rowid == model.id)
+        .filter(text(f'{FTS_TABLE} MATCH :match')).params(match=match_query)
+        .order_by(search_rank(), model.id)
+    )
@@ -0,0 +1,49 @@
+import os
+import threading
+import pandas as pd
+
+# Folder the per-store CSV exports are written to
+SCRAPED_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Scraped_Data')
+
+# CSV file written for each store (keyed by the 'Store' field of the scraped products)
+CSV_FILES = {
+    'BMS': 'BMSproducts.csv',
+    'Diamond Star': 'DiamondStarProducts.csv',
+    'LG vision': 'LGVisionProducts.csv',
+    'Leaders': 'LeadersProducts.csv',
+    'Smart Buy': 'SmartBuyProducts.csv',
+}
+
+
+# Function to write a store's products to its CSV file in Scraped_Data (or another folder), overwriting the old file
+def write_products_csv(products, csv_name, folder=SCRAPED_DATA_DIR):
+    os.makedirs(folder, exist_ok=True)  # Create the folder if it doesn't exist
+    df = pd.DataFrame(products)
+    df.to_csv(os.path.join(folder, csv_name), index=False)
+
+
+# Function used by every spider to hand over its products: into the sink when one is given,
+# otherwise into the store's CSV file like before
+def deliver_products(products, sink, csv_name):
+    if sink is None:
+        write_products_csv(list(products), csv_name)
+        return
+    for product in products:
+        sink(product)
+
+
+# Optional sink that still produces the per-store CSV files while streaming.
+# Jobs pass their own folder so that scrapes running at the same time don't overwrite each other's files.
+class CsvSink:
+    def __init__(self, folder=SCRAPED_DATA_DIR):
+        self.folder = folder
+        self.products = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, product):
+        with self.lock:
+            self.products.setdefault(product.get('Store', 'N/A'), []).append(product)
+
+    def close(self):
+        for store, products in self.products.items():
+            write_products_csv(products, CSV_FILES.get(store, f'{store.replace(" ", "")}Products.csv'), self.folder)
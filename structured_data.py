@@ -0,0 +1,121 @@
+import html
+import json
+import re
+from decimal import Decimal, InvalidOperation
+
+# schema.org Product data read straight from the raw bytes of a product page, without building a DOM.
+# Shopify and WooCommerce stores print their products as JSON-LD (<script type="application/ld+json">);
+# a few themes only have microdata (itemprop attributes), which is read into the same JSON-LD shape.
+# Spiders read their fields from here first and only parse the page when a field is missing.
+
+JSON_LD_SCRIPT = re.compile(rb'<script\b[^>]*\btype\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script\s*>', re.I | re.S)
+MICRODATA_PRODUCT = re.compile(rb'\bitemtype\s*=\s*["\']https?://schema\.org/Product/?["\']', re.I)
+ITEMPROP_TAG = re.compile(rb'<([a-z][a-z0-9]*)\b([^>]*?)\bitemprop\s*=\s*["\']([^"\']+)["\']([^>]*)>([^<]*)', re.I)
+ATTRIBUTE = rb'\b%s\s*=\s*(?:"([^"]*)"|\'([^\']*)\')'
+
+# Record field -> paths of the value in the schema.org Product (keys and list indexes), the first found wins
+SCHEMA_PATHS = {
+    'Title': [('name',)],
+    'Model': [('sku',), ('mpn',)],
+    'Brand': [('brand', 'name'), ('brand',)],
+    'Category': [('category',)],
+    'Price': [('offers', 0, 'price'), ('offers', 'price'), ('offers', 0, 'lowPrice'), ('offers', 'lowPrice')],
+    'Image URL': [('image', 'url'), ('image', 0, 'url'), ('image', 0), ('image',)],
+}
+
+
+def _is_product(item):
+    kind = item.get('@type')
+    return kind == 'Product' or isinstance(kind, list) and 'Product' in kind
+
+
+# Function to find the Product in the JSON-LD blocks of a page (top level, in a list or in an @graph), or None
+def find_json_ld_product(content):
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    for block in JSON_LD_SCRIPT.findall(content):
+        try:
+            data = json.loads(block)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"Error parsing JSON: {e}")
+            continue
+        items = data if isinstance(data, list) else data.get('@graph', [data]) if isinstance(data, dict) else []
+        for item in items:
+            if isinstance(item, dict) and _is_product(item):
+                return item
+    return None
+
+
+def _attribute(attributes, name):
+    match = re.search(ATTRIBUTE % name, attributes, re.I)
+    return None if match is None else (match.group(1) if match.group(1) is not None else match.group(2))
+
+
+# Function to read the microdata of a page's Product into the JSON-LD shape, or None when it has none.
+# The first value of every property is kept: the content attribute, the link of <a>/<link>/<img>, or the tag's text.
+def find_microdata_product(content):
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    start = MICRODATA_PRODUCT.search(content)
+    if start is None:
+        return None
+
+    properties = {}
+    for tag, before, name, after, text in ITEMPROP_TAG.findall(content, start.end()):
+        attributes = before + after
+        if b'itemscope' in attributes.lower():
+            continue  # Nested items (brand, offers) only give their own properties
+        value = _attribute(attributes, b'content')
+        if value is None and tag.lower() in (b'a', b'link', b'img'):
+            value = _attribute(attributes, b'src' if tag.lower() == b'img' else b'href')
+        if value is None:
+            value = text
+        value = html.unescape(value.decode('utf-8', 'replace')).strip()
+        if value:
+            properties.setdefault(name.decode('ascii', 'replace'), value)
+    if not properties:
+        return None
+
+    product = {'@type': 'Product'}
+    for name in ('name', 'sku', 'mpn', 'category', 'image'):
+        if name in properties:
+            product[name] = properties[name]
+    if 'brand' in properties:
+        product['brand'] = {'name': properties['brand']}
+    if 'price' in properties:
+        product['offers'] = [{'price': properties['price'], 'priceCurrency': properties.get('priceCurrency')}]
+    return product
+
+
+# Function to get a page's schema.org Product: its JSON-LD, otherwise its microdata, otherwise None
+def find_product(content):
+    product = find_json_ld_product(content)
+    return product if product is not None else find_microdata_product(content)
+
+
+# Function to read a value from a Product by the first of the paths that leads to a plain value
+def read_path(data, paths):
+    for path in paths:
+        value = data
+        for key in path:
+            if isinstance(key, int) and isinstance(value, list) and len(value) > key:
+                value = value[key]
+            elif isinstance(key, str) and isinstance(value, dict) and key in value:
+                value = value[key]
+            else:
+                value = None
+                break
+        if value is not None and not isinstance(value, (dict, list)):
+            return value
+    return None
+
+
+
+# Function to read a schema.org price (a number, or a string like "1,299.00") as a plain decimal string
+# without trailing zeros ("493.00" -> "493", 249.9 -> "249.9"); None when it isn't a number
+def schema_price(value):
+    try:
+        price = Decimal(str(value).replace(',', '').strip())
+    except InvalidOperation:
+        return None
+    return format(price.normalize(), 'f') if price.is_finite() else None
@@ -1,28 +1,58 @@
+import os
+import shutil
+import tempfile
+import time
 import unittest
-from app import app
+from unittest import mock
+from app import create_app, init_database, scrape_jobs
+from database_setup import db, Product
 
 class FlaskAPITest(unittest.TestCase):
     def setUp(self):
-        self.app = app.test_client()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.api = create_app(f"sqlite:///{os.path.join(self.tmp_dir, 'products.db')}")
+        init_database(self.api)  # What starting the server does
+        with self.api.app_context():
+            db.session.add(Product(title='Laptop 15', model='LP15', price=499.0, product_url='https://store/p/1', store='BMS', search_query='laptop'))
+            db.session.commit()
+        self.app = self.api.test_client()
         self.app.testing = True
 
+    def tearDown(self):
+        with self.api.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(self.tmp_dir)
+
     def test_scrape(self):
-        response = self.app.post(
-            '/api/scrape',
-            json={"query": "laptop"}
-        )
-        self.assertEqual(response.status_code, 200)
-        print(response.json)
+        runs = []
+        # The job runs in the background; stub the scrape so it doesn't crawl the stores or write products.db
+        with mock.patch.object(scrape_jobs, 'runner', lambda job: runs.append(job.query)):
+            response = self.app.post(
+                '/api/scrape',
+                json={"query": "laptop"}
+            )
+            self.assertEqual(response.status_code, 202)
+
+            job_id = response.json['job_id']
+            for _ in range(100):
+                job = self.app.get(f"/api/jobs/{job_id}")
+                if job.json['state'] == 'succeeded':
+                    break
+                time.sleep(0.02)
+        self.assertEqual(job.status_code, 200)
+        self.assertEqual((job.json['query'], job.json['state']), ('laptop', 'succeeded'))
+        self.assertEqual(runs, ['laptop'])
 
     def test_get_products(self):
         response = self.app.get('/api/products?query=laptop')
         self.assertEqual(response.status_code, 200)
-        print(response.json)
+        self.assertEqual([product['title'] for product in response.json], ['Laptop 15'])
 
     def test_get_product(self):
         response = self.app.get('/api/product/1')
         self.assertEqual(response.status_code, 200)
-        print(response.json)
+        self.assertEqual(response.json['model'], 'LP15')
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
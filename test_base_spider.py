@@ -0,0 +1,118 @@
+import unittest
+from benchmarks.fixture_server import FixtureServer, route_stores_to
+from rate_limiter import PolitenessScheduler
+from run_spiders import create_session
+from url_dedup import UrlDeduplicator
+from Spiders.base_spider import Field, StoreSpider
+from Spiders.BMS_Spider import CrawlBMS
+from Spiders.DiamondStar_Spider import CrawlDiamondStar
+from Spiders.Leaders_Spider import CrawlLeaders
+
+PAGE = b'''<html><head><script type="application/ld+json">{"@type": "Organization", "name": "Shop"}</script>
+<script type="application/ld+json">{"@type": "Product", "name": "TV 55", "offers": [{"price": "499.00"}], "image": {"url": "https://x.jo/tv.jpg"}}</script></head>
+<body><h1>TV 55 | QA55</h1><p class="price"><span class="amount">520 JD</span></p>
+<span class="cat"><a>TV</a><a>OLED</a></span><img class="main" data-src="//x.jo/tv.jpg"></body></html>'''
+
+
+def spider(fields, **kwargs):
+    return StoreSpider('Shop', 'ShopProducts.csv', 'https://x.jo/search?q={query}&page={page}', 'h3 a', fields, **kwargs)
+
+
+class FieldTest(unittest.TestCase):
+    def test_fields_from_selectors_and_json_ld(self):
+        product = spider({
+            'Title': Field('h2', 'h1'),
+            'Model': Field(derive=lambda product: product['Title'].split('|')[-1].strip()),
+            'Price': Field('p.price ins .amount', 'p.price .amount', clean=lambda price: price.split()[0]),
+            'Category': Field('span.cat a', join=', '),
+            'Image URL': Field('img.main', attr='data-src', clean=lambda src: 'https:' + src),
+            'Brand': Field(value='LG'),
+            'Offer': Field(json_ld=[('offers', 0, 'price')]),
+            'Image': Field(json_ld=[('image', 'url'), ('image',)]),
+            'Sku': Field(json_ld=[('sku',)]),
+        }).parse_product('https://x.jo/tv', PAGE)
+
+        self.assertEqual(product, {
+            'Title': 'TV 55 | QA55', 'Model': 'QA55', 'Price': '520', 'Category': 'TV, OLED', 'Image URL': 'https://x.jo/tv.jpg',
+            'Brand': 'LG', 'Offer': '499.00', 'Image': 'https://x.jo/tv.jpg', 'Sku': 'N/A',
+            'Product URL': 'https://x.jo/tv', 'Store': 'Shop',
+        })
+
+    def test_pages_without_the_required_json_ld(self):
+        json_ld_spider = spider({'Title': Field(json_ld=[('name',)])}, requires_json_ld=True)
+        self.assertIsNone(json_ld_spider.parse_product('https://x.jo/tv', b'<html><h1>TV</h1></html>'))
+        self.assertEqual(json_ld_spider.parse_product('https://x.jo/tv', PAGE)['Title'], 'TV 55')
+
+
+class LeadersSpiderTest(unittest.TestCase):
+    def test_crawls_through_the_session_without_keeping_products(self):
+        with FixtureServer(latency=0, pages=2, per_page=3) as server:
+            session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=PolitenessScheduler(limits={}, default_rate=1000))
+            route_stores_to(session, server.base_url)
+            dedup = UrlDeduplicator().for_store('CrawlLeaders')
+
+            crawls = []
+            for _ in range(2):
+                products = []
+                CrawlLeaders('tv', pages=3, session=session, max_workers=4, sink=products.append)
+                crawls.append(products)
+            CrawlLeaders('tv', pages=3, session=session, sink=crawls[0].append, dedup=dedup)
+            CrawlLeaders('tv', pages=3, session=session, sink=crawls[0].append, dedup=dedup)
+
+        self.assertEqual(len(crawls[1]), 6)  # The second crawl doesn't carry the first one's products
+        self.assertEqual(len(crawls[0]), 12)  # Pages already crawled with the same deduplicator are skipped
+        self.assertEqual({product['Model'] for product in crawls[1]} & {'N/A'}, set())
+        self.assertTrue(all(product['Store'] == 'Leaders' and product['Brand'] == 'Samsung' for product in crawls[1]))
+
+
+class FastModeTest(unittest.TestCase):
+    def crawl(self, fast, spider=CrawlDiamondStar):
+        with FixtureServer(latency=0, pages=2, per_page=3) as server:
+            session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=PolitenessScheduler(limits={}, default_rate=1000))
+            route_stores_to(session, server.base_url)
+            products = []
+            spider('tv', pages=3, session=session, max_workers=4, sink=products.append, fast=fast)
+            return sorted(products, key=lambda product: product['Product URL']), len(server.request_log)
+
+    def test_products_from_the_search_results_pages(self):
+        full, full_requests = self.crawl(False, CrawlBMS)
+        fast, fast_requests = self.crawl(True, CrawlBMS)
+        self.assertEqual((full_requests, fast_requests), (8, 2))  # 2 listing pages, 6 product pages; BMS cards have every field
+        self.assertEqual(fast, full)
+
+    def test_product_pages_for_the_fields_cards_lack(self):
+        full, _ = self.crawl(False)
+        fast, requests_made = self.crawl(True)
+        self.assertEqual(requests_made, 8)  # Diamond Star cards have no model
+        self.assertEqual(fast, full)
+        self.assertNotIn('N/A', {product['Model'] for product in fast})
+
+    def test_fields_chosen_by_the_caller(self):
+        full, _ = self.crawl(False)
+        cards, requests_made = self.crawl(('Title', 'Price'))
+        self.assertEqual(requests_made, 2)
+        for product, card in zip(full, cards):
+            self.assertEqual({name: card[name] for name in ('Title', 'Brand', 'Price', 'Image URL', 'Product URL', 'Store')},
+                             {name: product[name] for name in ('Title', 'Brand', 'Price', 'Image URL', 'Product URL', 'Store')})
+            self.assertEqual((card['Model'], card['Category']), ('N/A', 'N/A'))  # Only on the product pages
+
+    def test_card_links_cleaned_of_tracking_parameters(self):
+        listing = b'''<html><body><div class="card"><h3><a href="/products/tv?_pos=1&_sid=abc&_ss=r">TV 55</a></h3>
+<span class="price">499</span></div></body></html>'''
+
+        class Session:
+            requests = []
+
+            def get(self, url, headers=None):
+                self.requests.append(url)
+                return type('Response', (), {'status_code': 200, 'content': listing})()
+
+        shop = spider({'Title': Field('h1'), 'Price': Field('.price')}, listing_cards='div.card',
+                      listing_fields={'Title': Field('h3 a'), 'Price': Field('span.price')})
+        products = []
+        shop.crawl('tv', session=Session(), sink=products.append, dedup=UrlDeduplicator().for_store('Shop'), fast=('Title', 'Price'))
+        self.assertEqual(Session.requests, ['https://x.jo/search?q=tv&page=1'])
+        self.assertEqual(products, [{'Title': 'TV 55', 'Price': '499', 'Product URL': 'https://x.jo/products/tv', 'Store': 'Shop'}])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,49 @@
+import unittest
+from brand_resolver import BrandResolver, brand_key, get_brand_resolver
+
+ALIASES = {
+    'Samsung': ['Samsung Electronics', 'سامسونج'],
+    'LG': ['L.G', 'LG Electronics'],
+    'Black & Decker': ['Black and Decker', 'Black+Decker'],
+    'Hisense': [],
+}
+
+
+class BrandResolverTest(unittest.TestCase):
+    def setUp(self):
+        self.resolver = BrandResolver(ALIASES)
+
+    def test_exact_aliases_ignore_case_and_punctuation(self):
+        self.assertEqual(self.resolver.resolve('samsung electronics'), 'Samsung')
+        self.assertEqual(self.resolver.resolve('Lg'), 'LG')
+        self.assertEqual(self.resolver.resolve('l.g.'), 'LG')
+        self.assertEqual(self.resolver.resolve('BLACK + DECKER'), 'Black & Decker')
+        self.assertEqual(self.resolver.resolve('سامسونج'), 'Samsung')
+
+    def test_fuzzy_fallback(self):
+        self.assertEqual(self.resolver.resolve('Samsnug'), 'Samsung')
+        self.assertEqual(self.resolver.resolve('Hisens'), 'Hisense')
+        self.assertIsNone(self.resolver.resolve('Conti'))
+        self.assertIsNone(self.resolver.resolve('Lx'))  # Too short to guess
+        self.assertIsNone(self.resolver.resolve('N/A'))
+
+    def test_results_are_memoized(self):
+        self.resolver.resolve('Samsnug')
+        self.resolver.resolve('Samsnug')
+        self.assertEqual(self.resolver.resolve.cache_info().hits, 1)
+
+    def test_brand_from_title(self):
+        self.assertEqual(self.resolver.from_title('Black and Decker Steam Iron'), 'Black & Decker')
+        self.assertEqual(self.resolver.from_title('LG OLED evo 65'), 'LG')
+        self.assertEqual(self.resolver.from_title('Ultra Slim TV'), 'Ultra')
+        self.assertEqual(self.resolver.from_title(''), 'N/A')
+
+    def test_bundled_dictionary(self):
+        resolver = get_brand_resolver()
+        self.assertEqual(resolver.resolve('Phillips'), 'Philips')
+        self.assertEqual(resolver.resolve('Samsnug'), 'Samsung')
+        self.assertEqual(brand_key(' De\'Longhi '), 'delonghi')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,35 @@
+import time
+import unittest
+from concurrent_fetch import fetch_concurrently
+
+
+# Pages that take longer the earlier they come, so they finish in reverse order; 'broken' pages raise
+def fetch(url):
+    if 'broken' in url:
+        raise ValueError(f'no product at {url}')
+    time.sleep(0.02 * (5 - int(url[-1])))
+    return None if url.endswith('3') else url.upper()
+
+
+class FetchConcurrentlyTest(unittest.TestCase):
+    urls = [f'https://x.jo/p{i}' for i in range(5)]
+
+    def test_results_in_the_order_of_the_urls(self):
+        expected = ['HTTPS://X.JO/P0', 'HTTPS://X.JO/P1', 'HTTPS://X.JO/P2', 'HTTPS://X.JO/P4']
+        self.assertEqual(list(fetch_concurrently(fetch, self.urls, max_workers=1)), expected)
+        self.assertEqual(list(fetch_concurrently(fetch, self.urls, max_workers=4)), expected)
+
+    def test_errors_collected_or_raised(self):
+        urls = [*self.urls[:2], 'https://x.jo/broken1', *self.urls[2:]]
+        for max_workers in (1, 4):
+            errors = []
+            with self.assertLogs('concurrent_fetch', 'WARNING'):
+                products = list(fetch_concurrently(fetch, urls, max_workers, errors))
+            self.assertEqual(len(products), 4)
+            self.assertEqual([(url, type(error)) for url, error in errors], [('https://x.jo/broken1', ValueError)])
+            with self.assertRaises(ValueError):
+                list(fetch_concurrently(fetch, urls, max_workers))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+from flask import Flask
+from benchmarks.fixture_server import FixtureServer, route_stores_to
+from crawl_worker import CrawlWorker, claim_tasks, enqueue, finish_task, frontier_counts, seed_frontier
+from database_setup import db, Product, FrontierTask, upgrade_schema
+from rate_limiter import PolitenessScheduler
+from result_sets import filter_job_results
+from run_spiders import create_session
+
+PRODUCTS = 4 * 2 * 5  # Stores x listing pages x products per page
+
+
+def make_app(database_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{database_path}'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}  # Several processes write to the file
+    db.init_app(app)
+    return app
+
+
+# Runs in a separate process
+def worker_process(database_path, base_url, worker_id):
+    session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=PolitenessScheduler(limits={}, default_rate=1000, default_max_in_flight=16))
+    route_stores_to(session, base_url)
+    CrawlWorker(worker_id, session=session, app=make_app(database_path), threads=4, pages=2, poll_interval=0.1).run()
+
+
+class CrawlWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FixtureServer(latency=0.02, pages=2, per_page=5).start()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.database_path = os.path.join(self.tmp_dir, 'products.db')
+        self.app = make_app(self.database_path)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        upgrade_schema()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+        shutil.rmtree(self.tmp_dir)
+        self.server.stop()
+
+    def test_worker_processes_share_the_frontier(self):
+        job_id = seed_frontier('tv')
+        seed_frontier('tv', job_id)  # Seeding twice queues nothing new
+        self.assertEqual(frontier_counts(job_id)['pending'], 4)
+
+        context = multiprocessing.get_context('spawn')
+        workers = [context.Process(target=worker_process, args=(self.database_path, self.server.base_url, f'worker-{i}')) for i in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(120)
+            self.assertEqual(worker.exitcode, 0)
+
+        self.assertEqual(frontier_counts(job_id), {'pending': 0, 'leased': 0, 'done': 4 + PRODUCTS, 'failed': 0})
+        self.assertEqual(filter_job_results(Product.query, job_id).count(), PRODUCTS)
+        # Every product page was fetched by exactly one worker
+        product_pages = Counter(path for _, path in self.server.request_log if '/product' in path)
+        self.assertEqual(len(product_pages), PRODUCTS)
+        self.assertEqual(set(product_pages.values()), {1})
+
+    def test_expired_lease_is_taken_over(self):
+        job_id = seed_frontier('tv', stores=['CrawlBMS'])
+        self.assertEqual(enqueue(job_id, 'listing', 'CrawlBMS', ['tv'], 'tv'), 0)
+        [task] = claim_tasks('worker-a', 10, lease_timeout=-1)  # Worker A's lease is already over
+        db.session.expunge(task)  # Keep A's copy of the task, as if A ran in another process
+        [retry] = claim_tasks('worker-b', 10)
+        self.assertEqual(claim_tasks('worker-c', 10), [])
+        self.assertEqual(retry.attempts, 2)
+
+        self.assertEqual(finish_task(task), 0)  # A's late result no longer owns the task
+        self.assertEqual(finish_task(retry), 1)
+        db.session.commit()
+        self.assertEqual(frontier_counts(job_id)['done'], 1)
+        self.assertEqual(FrontierTask.query.one().lease_owner, 'worker-b')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+import pandas as pd
+from data_processing import clean_frame, normalize_columns, preprocess_row
+
+ROWS = [
+    {'Title': '  samsung 55" crystal uhd ', 'Model': 'ua55du7000', 'Brand': 'samsnug', 'Category': 'TELEVISION',
+     'Price': '1,299 JD', 'Image URL': ' https://cdn/x.jpg ', 'Product URL': 'https://store/p/1 ', 'Store': 'Smart Buy'},
+    {'Title': 'LG OLED evo', 'Model': np.nan, 'Brand': 'lg', 'Category': '', 'Price': '499.00JOD',
+     'Image URL': '', 'Product URL': 'https://store/p/2', 'Store': 'LG vision'},
+    {'Title': '', 'Model': 'N/A', 'Brand': np.nan, 'Category': 'Home Appliances', 'Price': np.nan,
+     'Image URL': np.nan, 'Product URL': np.nan, 'Store': 'BMS'},
+    {'Title': 'Conti Iron', 'Model': '  ', 'Brand': 'Conti', 'Category': 'N/A', 'Price': '1.2.3',
+     'Image URL': 'N/A', 'Product URL': 'https://store/p/4', 'Store': 'Diamond Star'},
+    {'Title': 'Sony Bravia', 'Model': 'KD-55', 'Brand': '  ', 'Category': 'tv', 'Price': 'Call us',
+     'Image URL': 'https://cdn/y.jpg', 'Product URL': '', 'Store': ''},
+    {'Title': 'Philips Kettle', 'Model': 'HD9350', 'Brand': 'Phillips', 'Category': 'kitchen', 'Price': 35.5,
+     'Image URL': 'https://cdn/z.jpg', 'Product URL': 'https://store/p/6', 'Store': 'Leaders'},
+]
+
+
+def rowwise(data, query):
+    return pd.DataFrame(data.apply(lambda row: preprocess_row(row, query), axis=1).tolist())
+
+
+class CleanFrameTest(unittest.TestCase):
+    def test_matches_row_by_row_cleaning(self):
+        data = normalize_columns(pd.DataFrame(ROWS))
+        pd.testing.assert_frame_equal(clean_frame(data, 'Smart TV'), rowwise(data, 'Smart TV'))
+
+    def test_missing_columns_and_query(self):
+        data = normalize_columns(pd.DataFrame([{'Title': 'x', 'Price': '10'}]))
+        cleaned = clean_frame(data, '')
+        self.assertEqual(cleaned.loc[0, 'brand'], 'N/A')
+        self.assertEqual(cleaned.loc[0, 'search_query'], 'n/a')
+        self.assertEqual(cleaned.loc[0, 'price'], 10.0)
+
+    def test_empty_frame(self):
+        data = normalize_columns(pd.DataFrame(columns=['Title']))
+        self.assertEqual(len(clean_frame(data, 'tv')), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,43 @@
+import copy
+import unittest
+from unittest import mock
+import html_parser
+from benchmarks.recorded_stores import SPIDERS, recorded_pages
+from html_parser import parse_html, resolve_backend, selector_tags
+
+
+class HtmlParserTest(unittest.TestCase):
+    def test_selector_tags(self):
+        self.assertEqual(selector_tags(['p.price ins span', 'a[rel~="tag"]', 'span:-soup-contains("Model") > strong', 'h1, h2.title']),
+                         ['a', 'h1', 'h2', 'p', 'span'])
+        self.assertIsNone(selector_tags(['h1', '.woocommerce-loop-product__title']))  # Needs the whole page
+
+    def test_missing_backends_fall_back_to_html_parser(self):
+        with mock.patch.object(html_parser, 'lxml', None):
+            self.assertEqual(resolve_backend('lxml'), 'html.parser')
+        self.assertEqual(resolve_backend('no-such-parser'), 'html.parser')
+        with mock.patch.object(html_parser, 'lxml', object()):
+            self.assertEqual(resolve_backend(), 'html.parser')  # lxml only when a spider asks for it
+        soup = parse_html(b'<html><body><div><h1>Title</h1><p>Text</p></div></body></html>', 'html.parser', ['h1'])
+        self.assertEqual(str(soup), '<h1>Title</h1>')
+
+    def test_spiders_choose_their_backend(self):
+        self.assertEqual({spider.store: spider.parser for spider in SPIDERS},
+                         {spider.store: 'html.parser' for spider in SPIDERS})
+
+    def test_spiders_read_the_same_fields_from_partial_trees(self):
+        spiders = {spider.store: spider for spider in SPIDERS if spider.parse_only}
+        for store, _, url, body in recorded_pages(kind='product'):
+            if store not in spiders:
+                continue
+            spider = copy.copy(spiders[store])
+            spider.reads_json_ld = False  # Every field from the selectors
+            strained = spider.parse_product(url, body)
+            spider.parse_only = None
+            for backend in html_parser.available_backends():
+                spider.parser = backend
+                self.assertEqual(spider.parse_product(url, body), strained, f'{store} {backend}')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
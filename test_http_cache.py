@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from benchmarks.fixture_server import FixtureServer, route_stores_to
+from http_cache import HttpCache, normalize_url
+from rate_limiter import PolitenessScheduler
+from run_spiders import create_session
+
+PRODUCT_URL = 'https://smartbuy-me.com/products/smartbuy-me-p1-{}'
+
+
+class HttpCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FixtureServer(latency=0).start()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = HttpCache(os.path.join(self.tmp_dir, 'cache.db'))
+
+    def tearDown(self):
+        self.server.stop()
+        self.cache.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def make_session(self):
+        scheduler = PolitenessScheduler(limits={}, default_rate=1000.0)
+        session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=scheduler, cache=self.cache)
+        return route_stores_to(session, self.server.base_url)
+
+    def test_fresh_pages_are_served_without_a_request(self):
+        session = self.make_session()
+        first = session.get(PRODUCT_URL.format(1))
+        second = session.get(PRODUCT_URL.format(1))
+
+        self.assertEqual(len(self.server.request_log), 1)
+        self.assertEqual(first.content, second.content)
+        self.assertTrue(second.from_cache)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['bytes_saved'], len(first.content))
+
+    def test_stale_pages_are_revalidated(self):
+        session = self.make_session()
+        first = session.get(PRODUCT_URL.format(1))
+        self.cache.ttl = 0
+        second = session.get(PRODUCT_URL.format(1))
+
+        self.assertEqual(len(self.server.request_log), 2)
+        self.assertEqual(self.server.not_modified, 1)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(self.cache.stats()['revalidated'], 1)
+
+    def test_least_recently_used_pages_are_evicted(self):
+        session = self.make_session()
+        page_size = len(session.get(PRODUCT_URL.format(0)).content)
+        self.cache.max_bytes = page_size * 3
+        for i in range(1, 3):
+            session.get(PRODUCT_URL.format(i))
+        session.get(PRODUCT_URL.format(0))  # Page 0 is now the most recently used
+        session.get(PRODUCT_URL.format(3))
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['entries'], 3)
+        self.assertIsNone(self.cache.get(normalize_url(PRODUCT_URL.format(1))))
+        self.assertIsNotNone(self.cache.get(normalize_url(PRODUCT_URL.format(0))))
+
+    def test_normalize_url(self):
+        self.assertEqual(
+            normalize_url('HTTPS://SmartBuy-Me.com:443/search?q=tv&type=product#top'),
+            normalize_url('https://smartbuy-me.com/search?type=product&q=tv'),
+        )
+        self.assertEqual(normalize_url('https://leaders.jo'), 'https://leaders.jo/')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
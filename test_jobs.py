@@ -0,0 +1,90 @@
+import threading
+import time
+import unittest
+from jobs import JobManager
+
+
+class JobManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.runs = []
+
+    def runner(self, job):
+        self.runs.append(job.query)
+        job.store_started('CrawlBMS')
+        job.store_item('CrawlBMS')
+        self.release.wait(5)
+        job.store_finished('CrawlBMS')
+        return {'inserted': 1}
+
+    def wait_for(self, job, state):
+        for _ in range(100):
+            if job.state == state:
+                return
+            time.sleep(0.02)
+        self.fail(f'job stayed {job.state}')
+
+    def test_same_query_is_coalesced(self):
+        manager = JobManager(self.runner, max_workers=2)
+        job, created = manager.submit('Smart  TV')
+        same, same_created = manager.submit('smart tv ')
+        other, other_created = manager.submit('laptop')
+
+        self.assertTrue(created)
+        self.assertFalse(same_created)
+        self.assertIs(same, job)
+        self.assertTrue(other_created)
+        self.release.set()
+        self.wait_for(job, 'succeeded')
+        self.wait_for(other, 'succeeded')
+        self.assertEqual(sorted(self.runs), ['Smart  TV', 'laptop'])
+
+        # Once finished, the same query starts a new job
+        again, again_created = manager.submit('smart tv')
+        self.assertTrue(again_created)
+        self.assertNotEqual(again.id, job.id)
+
+    def test_same_query_with_other_options_is_a_new_job(self):
+        manager = JobManager(self.runner, max_workers=4)
+        job, _ = manager.submit('smart tv', incremental=True, max_age=3600)
+        same, same_created = manager.submit('Smart TV', max_age=3600, incremental=True)
+        fast, fast_created = manager.submit('smart tv', fast=True)
+        full, full_created = manager.submit('smart tv')
+
+        self.assertFalse(same_created)
+        self.assertIs(same, job)
+        self.assertTrue(fast_created and full_created)
+        self.assertEqual(len({job.id, fast.id, full.id}), 3)
+        self.assertEqual((fast.options, full.options), ({'fast': True}, {}))
+        self.release.set()
+        for started in (job, fast, full):
+            self.wait_for(started, 'succeeded')
+
+    def test_status_reports_progress(self):
+        manager = JobManager(self.runner)
+        job, _ = manager.submit('tv')
+        self.wait_for(job, 'running')
+        time.sleep(0.05)
+        status = manager.get(job.id).to_dict()
+        self.assertEqual(status['state'], 'running')
+        self.assertEqual(status['stores']['CrawlBMS']['items'], 1)
+
+        self.release.set()
+        self.wait_for(job, 'succeeded')
+        status = job.to_dict()
+        self.assertEqual(status['items'], 1)
+        self.assertEqual(status['stores']['CrawlBMS']['state'], 'succeeded')
+        self.assertEqual(status['stats'], {'inserted': 1})
+        self.assertIsNotNone(status['seconds'])
+
+    def test_failed_job(self):
+        def failing(job):
+            raise RuntimeError('boom')
+        manager = JobManager(failing)
+        job, _ = manager.submit('tv')
+        self.wait_for(job, 'failed')
+        self.assertEqual(job.to_dict()['error'], 'boom')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
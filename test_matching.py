@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from flask import Flask
+from database_setup import db, Product, upgrade_schema
+from matching import assign_product_groups, evaluate_matches, match_products, model_codes, normalize_model
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'benchmarks', 'fixtures', 'product_matches.json')
+
+
+class MatchingTest(unittest.TestCase):
+    def test_labelled_fixtures(self):
+        products = json.load(open(FIXTURE_PATH))['products']
+        groups = match_products((p['id'], p['title'], p['model'], p['brand'], p['store']) for p in products)
+        scores = evaluate_matches(groups, {p['id']: p['group'] for p in products})
+        self.assertEqual(scores['precision'], 1.0)
+        self.assertGreaterEqual(scores['recall'], 0.85)
+
+    def test_model_codes(self):
+        self.assertEqual(normalize_model(' ua-55 du7000/fh '), 'UA55DU7000FH')
+        self.assertEqual(model_codes('Samsung 55" Crystal UHD DU7000 | UA55DU7000', 'Samsung'), {'UA55DU7000'})
+        self.assertEqual(model_codes('LG 9kg Washing Machine', 'N/A'), set())
+
+    def test_same_store_and_brand_conflicts_do_not_match(self):
+        groups = match_products([
+            (1, 'TV', 'UA55DU7000', 'Samsung', 'Smart Buy'),
+            (2, 'TV', 'UA55DU7000UXJO', 'Samsung', 'Smart Buy'),
+            (3, 'TV', 'UA55DU7000', 'Hisense', 'BMS'),
+        ])
+        self.assertEqual(groups, {1: 1, 2: 2, 3: 3})
+
+
+class AssignGroupsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.tmp_dir, 'products.db')}"
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        upgrade_schema()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_groups_are_stored_without_touching_timestamps(self):
+        scraped_at = datetime(2024, 1, 1)
+        db.session.add_all([
+            Product(title='Sony Bravia X75K', model='KD-55X75K', brand='Sony', store='Smart Buy', product_url='a', timestamp=scraped_at),
+            Product(title='Sony 55 X75K', model='KD55X75K', brand='Sony', store='Diamond Star', product_url='b', timestamp=scraped_at),
+            Product(title='Hisense 55A6K', model='55A6K', brand='Hisense', store='BMS', product_url='c', timestamp=scraped_at),
+        ])
+        db.session.commit()
+
+        self.assertEqual(assign_product_groups(), {'products': 3, 'matched': 2, 'groups': 1, 'changed': 2})
+        self.assertEqual(assign_product_groups()['changed'], 0)
+        products = Product.query.order_by(Product.id).all()
+        self.assertEqual([p.product_group_id for p in products], [1, 1, None])  # Unmatched products have no group
+        self.assertTrue(all(p.timestamp == scraped_at for p in products))
+
+    def test_only_real_changes_are_written(self):
+        db.session.add_all([
+            Product(title='Sony Bravia X75K', model='KD-55X75K', brand='Sony', store='Smart Buy', product_url='a'),
+            Product(title='Sony 55 X75K', model='KD55X75K', brand='Sony', store='Diamond Star', product_url='b'),
+        ])
+        db.session.commit()
+        assign_product_groups()
+
+        db.session.add(Product(title='Hisense 55A6K', model='55A6K', brand='Hisense', store='BMS', product_url='c'))
+        db.session.commit()
+        self.assertEqual(assign_product_groups()['changed'], 0)  # A new product that matches nothing
+
+        Product.query.filter_by(product_url='b').delete()
+        db.session.commit()
+        self.assertEqual(assign_product_groups(), {'products': 2, 'matched': 0, 'groups': 0, 'changed': 1})
+        self.assertEqual([p.product_group_id for p in Product.query.order_by(Product.id)], [None, None])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,66 @@
+import unittest
+import pandas as pd
+from app import app
+from benchmarks.fixture_server import FixtureServer, route_stores_to
+from data_processing import clean_frame, normalize_columns
+from metrics import CrawlMetrics, MetricsRegistry, collecting
+from rate_limiter import PolitenessScheduler
+from run_spiders import RunSpiders, create_session
+
+
+class RegistryTest(unittest.TestCase):
+    def test_prometheus_text_format(self):
+        registry = MetricsRegistry()
+        requests = registry.counter('requests_total', 'Requests.', ['host'])
+        latency = registry.histogram('latency_seconds', 'Latency.', ['host'], buckets=(0.1, 1.0))
+        requests.inc('a"b.jo')
+        requests.inc('a"b.jo', amount=2)
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value, 'x.jo')
+
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE requests_total counter', lines)
+        self.assertIn('requests_total{host="a\\"b.jo"} 3', lines)
+        self.assertIn('# TYPE latency_seconds histogram', lines)
+        self.assertIn('latency_seconds_bucket{host="x.jo",le="0.1"} 2', lines)
+        self.assertIn('latency_seconds_bucket{host="x.jo",le="1.0"} 3', lines)
+        self.assertIn('latency_seconds_bucket{host="x.jo",le="+Inf"} 4', lines)
+        self.assertIn('latency_seconds_sum{host="x.jo"} 3.65', lines)
+        self.assertIn('latency_seconds_count{host="x.jo"} 4', lines)
+
+
+class CrawlMetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FixtureServer(latency=0.01, pages=2, per_page=5).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_crawl_records_every_stage(self):
+        session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=PolitenessScheduler(limits={}, default_rate=1000, default_max_in_flight=16))
+        route_stores_to(session, self.server.base_url)
+        products = []
+        with collecting(CrawlMetrics()) as crawl_metrics:
+            RunSpiders('tv', sink=products.append, session=session)
+            clean_frame(normalize_columns(pd.DataFrame(products)), 'tv')
+        summary = crawl_metrics.summary()
+
+        self.assertEqual(sum(host['requests'] for host in summary['hosts'].values()), len(self.server.request_log))
+        self.assertEqual(sum(host['pages_parsed'] for host in summary['hosts'].values()), len(products))
+        for host in ['bmsmena.com', 'diamondstarjo.com', 'newvision.jo', 'smartbuy-me.com']:
+            self.assertGreater(summary['hosts'][host]['bytes'], 0, host)
+            self.assertGreater(summary['hosts'][host]['avg_fetch_seconds'], 0, host)
+        self.assertEqual(summary['hosts']['diamondstarjo.com']['errors'], 0)  # The pagination links end the crawl at the fixture's last page
+        self.assertEqual(summary['stages']['clean'], {'batches': 1, 'rows': len(products), 'seconds': summary['stages']['clean']['seconds']})
+
+    def test_metrics_endpoint(self):
+        response = app.test_client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        body = response.get_data(as_text=True)
+        for name in ['smartspider_http_requests_total', 'smartspider_http_request_seconds', 'smartspider_parse_seconds', 'smartspider_stage_seconds']:
+            self.assertIn(f'# TYPE {name} ', body)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from flask import Flask
+import pagination
+from app import create_app, init_database, serialize_product
+from database_setup import db, Product
+from pagination import PaginationError, decode_cursor, encode_cursor, fetch_page, stream_rows
+
+
+class ProductPagingAPITest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.api = create_app(f"sqlite:///{os.path.join(self.tmp_dir, 'products.db')}")
+        init_database(self.api)
+        with self.api.app_context():
+            db.session.add_all(Product(title=f'Product {i}', saved=i % 2 == 0, product_url=f'https://store/p/{i}') for i in range(17))
+            db.session.commit()
+        self.app = self.api.test_client()
+        self.app.testing = True
+
+    def tearDown(self):
+        with self.api.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(self.tmp_dir)
+
+    def page_through(self, path, limit):
+        paged, cursor, pages = [], None, 0
+        while True:
+            page = self.app.get(f'{path}?limit={limit}' + (f'&cursor={cursor}' if cursor else '')).json
+            self.assertLessEqual(len(page['items']), limit)
+            paged += page['items']
+            pages += 1
+            cursor = page['next_cursor']
+            if not cursor:
+                return paged, pages
+
+    def test_pages_cover_the_full_list(self):
+        everything = self.app.get('/api/products').json
+        self.assertEqual(len(everything), 17)
+        paged, pages = self.page_through('/api/products', 7)
+        self.assertEqual(pages, 3)
+        self.assertEqual(paged, everything)
+
+        saved = self.app.get('/api/saved_products').json
+        self.assertEqual(len(saved), 9)
+        self.assertEqual(self.page_through('/api/saved_products', 4), (saved, 3))
+
+    def test_streamed_formats_match_the_full_list(self):
+        everything = self.app.get('/api/products').json
+        self.assertEqual(len(everything), 17)
+        with mock.patch.object(pagination, 'STREAM_CHUNK_SIZE', 5):  # Several database fetches per stream
+            response = self.app.get('/api/products?stream=ndjson')
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            self.assertEqual([json.loads(line) for line in response.get_data(as_text=True).splitlines()], everything)
+            self.assertEqual(json.loads(self.app.get('/api/products?stream=json').get_data(as_text=True)), everything)
+
+            cursor = self.app.get('/api/products?limit=7').json['next_cursor']
+            resumed = self.app.get(f'/api/products?stream=ndjson&cursor={cursor}').get_data(as_text=True).splitlines()
+            self.assertEqual([json.loads(line) for line in resumed], everything[7:])
+
+    def test_bad_arguments(self):
+        self.assertEqual(self.app.get('/api/products?cursor=not-a-cursor').status_code, 400)
+        self.assertEqual(self.app.get('/api/products?limit=zero').status_code, 400)
+        self.assertEqual(self.app.get('/api/products?stream=ndjson&cursor=abc').status_code, 400)
+        self.assertEqual(self.app.get('/api/products?stream=xml').status_code, 400)
+
+
+class KeysetTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.tmp_dir, 'products.db')}"
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        # Several products share a brand, so the id has to break ties
+        db.session.add_all(Product(title=f'Product {i}', brand='ABC'[i % 3], product_url=f'https://store/p/{i}') for i in range(10))
+        db.session.commit()
+        self.keys = [(Product.brand, True), (Product.id, False)]
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_descending_keys_with_ties(self):
+        expected = [p.id for p in Product.query.order_by(Product.brand.desc(), Product.id).all()]
+        paged, cursor = [], None
+        while True:
+            page = fetch_page(Product.query, self.keys, 3, cursor, serialize_product)
+            paged += [item['id'] for item in page['items']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(paged, expected)
+
+        # Streaming resumes from a cursor too
+        cursor = fetch_page(Product.query, self.keys, 4, None, serialize_product)['next_cursor']
+        lines = list(stream_rows(Product.query, self.keys, cursor, serialize_product, 'ndjson'))
+        self.assertEqual([json.loads(line)['id'] for line in lines], expected[4:])
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(['2024-05-01 10:00:00', 7]), 2), ['2024-05-01 10:00:00', 7])
+        with self.assertRaises(PaginationError):
+            decode_cursor(encode_cursor([7]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
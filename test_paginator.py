@@ -0,0 +1,96 @@
+import threading
+import unittest
+from bs4 import BeautifulSoup
+from benchmarks.fixture_server import FixtureServer, route_stores_to, shopify_pagination, woocommerce_pagination
+from paginator import last_page_number, paginate
+from rate_limiter import PolitenessScheduler
+from run_spiders import create_session
+from Spiders.BMS_Spider import get_product_urls_bmsmena
+from Spiders.DiamondStar_Spider import scrape_product_urls_diamondstar
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+
+# Listing pages as '<a>url</a>' lists; pages past the end repeat the last one
+def fake_store(pages, log):
+    def fetch(url):
+        log.append(url)
+        page = min(int(url), len(pages))
+        return FakeResponse(''.join(f'<a>{product}</a>' for product in pages[page - 1]))
+    return fetch
+
+
+def parse(soup):
+    return [a.get_text() for a in soup.find_all('a')]
+
+
+class LastPageTest(unittest.TestCase):
+    def test_store_pagination_markup(self):
+        shopify = BeautifulSoup(shopify_pagination(2, 7, lambda n: f'/search?page={n}&q=tv'), 'html.parser')
+        woocommerce = BeautifulSoup(woocommerce_pagination(1, 4, lambda n: f'https://x.jo/page/{n}/?s=tv'), 'html.parser')
+        self.assertEqual(last_page_number(shopify), 7)
+        self.assertEqual(last_page_number(woocommerce), 4)
+        self.assertIsNone(last_page_number(BeautifulSoup('<div class="products"><a href="/p/1">1</a></div>', 'html.parser')))
+
+
+class PaginateTest(unittest.TestCase):
+    def test_repeated_and_empty_pages_stop(self):
+        log = []
+        pages = list(paginate(fake_store([['a', 'b'], ['c']], log), str, parse, max_pages=10))
+        self.assertEqual(pages, [['a', 'b'], ['c']])
+        self.assertEqual(log, ['1', '2', '3'])  # Page 3 repeats page 2
+
+        log = []
+        self.assertEqual(list(paginate(fake_store([['a'], []], log), str, parse, max_pages=10)), [['a']])
+        self.assertEqual(log, ['1', '2'])
+
+    def test_next_page_is_fetched_while_the_current_one_is_dispatched(self):
+        log = []
+        second_page_requested = threading.Event()
+        fetch = fake_store([['a'], ['b'], ['c']], log)
+
+        def signalling_fetch(url):
+            response = fetch(url)
+            if url == '2':
+                second_page_requested.set()
+            return response
+
+        pages = paginate(signalling_fetch, str, parse, max_pages=3)
+        self.assertEqual(next(pages), ['a'])
+        self.assertTrue(second_page_requested.wait(5))  # Requested before the caller asked for page 2
+        self.assertEqual(list(pages), [['b'], ['c']])
+
+        log = []
+        pages = paginate(fake_store([['a'], ['b']], log), str, parse, max_pages=2, prefetch=False)
+        self.assertEqual(next(pages), ['a'])
+        self.assertEqual(log, ['1'])
+
+
+class SpiderPaginationTest(unittest.TestCase):
+    def crawl(self, pagination, list_products, max_pages):
+        with FixtureServer(latency=0, pages=2, per_page=3, pagination=pagination) as server:
+            session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=PolitenessScheduler(limits={}, default_rate=1000))
+            route_stores_to(session, server.base_url)
+            urls = list_products('tv', max_pages, session)
+            return urls, len(server.request_log)
+
+    def test_last_page_from_the_pagination_links(self):
+        urls, requests_made = self.crawl(True, lambda q, pages, session: scrape_product_urls_diamondstar(q, pages, session=session), 10)
+        self.assertEqual((len(urls), requests_made), (6, 2))
+
+    def test_stores_without_pagination_links(self):
+        # Diamond Star answers 404 past the last page, BMS an empty page
+        urls, requests_made = self.crawl(False, lambda q, pages, session: scrape_product_urls_diamondstar(q, pages, session=session), 10)
+        self.assertEqual((len(urls), requests_made), (6, 3))
+        urls, requests_made = self.crawl(False, lambda q, pages, session: get_product_urls_bmsmena(q, pages, session=session), 10)
+        self.assertEqual((len(urls), requests_made), (6, 3))
+        urls, requests_made = self.crawl(False, lambda q, pages, session: get_product_urls_bmsmena(q, pages, session=session), 1)
+        self.assertEqual((len(urls), requests_made), (3, 1))  # max_pages is respected
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,97 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.fixture_server import FixtureAdapter, FixtureServer, route_stores_to
+from rate_limiter import PolitenessScheduler, parse_retry_after
+from run_spiders import create_session
+
+PRODUCT_URL = 'https://smartbuy-me.com/products/smartbuy-me-p1-{}'
+
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FixtureServer(latency=0).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def make_session(self, limits):
+        scheduler = PolitenessScheduler(limits=limits)
+        session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=scheduler)
+        return route_stores_to(session, self.server.base_url)
+
+    def fetch_all(self, session, count, threads=8):
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(lambda i: session.get(PRODUCT_URL.format(i)), range(count)))
+
+    def request_times(self):
+        return sorted(t for t, _ in self.server.request_log)
+
+    def test_requests_per_second_budget(self):
+        session = self.make_session({'smartbuy-me.com': (10.0, 8)})
+        responses = self.fetch_all(session, 25)
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+
+        times = self.request_times()
+        # 25 requests at 10/s need at least 2.4s, and no 1s window may hold more than 10 + 1
+        self.assertGreaterEqual(times[-1] - times[0], 2.3)
+        for i, start in enumerate(times):
+            in_window = [t for t in times[i:] if t - start < 1.0]
+            self.assertLessEqual(len(in_window), 11)
+        # Close to the allowed rate rather than far below it
+        self.assertLess(times[-1] - times[0], 3.5)
+
+    def test_max_in_flight_per_host(self):
+        self.server.latency = 0.1
+        session = self.make_session({'smartbuy-me.com': (1000.0, 2)})
+        self.fetch_all(session, 12)
+        self.assertEqual(self.server.max_in_flight, 2)
+
+    def test_hosts_have_separate_budgets(self):
+        session = self.make_session({'smartbuy-me.com': (2.0, 4), 'bmsmena.com': (1000.0, 4)})
+        session.get(PRODUCT_URL.format(0))
+        for i in range(5):
+            session.get(f'https://bmsmena.com/products/bmsmena-p1-{i}')
+        times = self.request_times()
+        self.assertLess(times[-1] - times[0], 0.4)
+
+    def test_retry_after_pauses_every_thread(self):
+        session = self.make_session({'smartbuy-me.com': (1000.0, 4)})
+        self.server.throttle(1, 1)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            first = executor.submit(session.get, PRODUCT_URL.format(0))
+            time.sleep(0.2)
+            others = list(executor.map(lambda i: session.get(PRODUCT_URL.format(i)), range(1, 6)))
+        self.assertTrue(all(r.status_code == 200 for r in [first.result()] + others))
+
+        # The 429 arrives first; its retry and every other thread's request wait for Retry-After
+        times = self.request_times()
+        self.assertEqual(len(times), 7)
+        self.assertTrue(all(t - times[0] >= 0.95 for t in times[1:]))
+
+    def test_retry_after_with_the_crawl_retry_policy(self):
+        # RunSpiders' retries: urllib3 must leave the 503 to the scheduler rather than sleep on it in one slot
+        session = create_session(retries=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504],
+                                 scheduler=PolitenessScheduler(limits={'smartbuy-me.com': (1000.0, 4)}))
+        retry = session.get_adapter('https://smartbuy-me.com').adapter.max_retries
+        route_stores_to(session, self.server.base_url, FixtureAdapter(self.server.base_url, max_retries=retry))
+        self.server.throttle(1, 1, status=503)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            first = executor.submit(session.get, PRODUCT_URL.format(0))
+            time.sleep(0.2)
+            others = list(executor.map(lambda i: session.get(PRODUCT_URL.format(i)), range(1, 6)))
+        self.assertTrue(all(r.status_code == 200 for r in [first.result()] + others))
+
+        times = self.request_times()
+        self.assertEqual(len(times), 7)
+        self.assertTrue(all(t - times[0] >= 0.95 for t in times[1:]))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('3'), 3.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
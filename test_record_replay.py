@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import zipfile
+from benchmarks.fixture_server import FixtureAdapter, FixtureServer, route_stores_to
+from rate_limiter import PolitenessScheduler
+from record_replay import Recorder, Replayer
+from run_spiders import RunSpiders, create_session
+
+
+def fast_scheduler():
+    return PolitenessScheduler(limits={}, default_rate=1000, default_max_in_flight=16)
+
+
+class RecordReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'crawl.zip')
+        self.server = FixtureServer(latency=0, pages=2, per_page=4).start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def record(self):
+        recorder = Recorder(self.path, query='tv')
+        session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=fast_scheduler())
+        route_stores_to(session, self.server.base_url, adapter=recorder.adapter(FixtureAdapter(self.server.base_url)))
+        products = []
+        RunSpiders('tv', sink=products.append, session=session)
+        recorder.save()
+        return products
+
+    def test_replayed_crawl_matches_the_recorded_one(self):
+        recorded = self.record()
+        requests_made = len(self.server.request_log)
+        with zipfile.ZipFile(self.path) as archive:
+            self.assertIn('index.json', archive.namelist())
+
+        replayer = Replayer(self.path)
+        replayed = []
+        RunSpiders(replayer.archive.query, sink=replayed.append,
+                   session=create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=fast_scheduler(), transport=replayer))
+
+        key = lambda product: product['Product URL']
+        self.assertEqual(sorted(replayed, key=key), sorted(recorded, key=key))
+        self.assertEqual(len(self.server.request_log), requests_made)  # Nothing reached the server
+        stats = replayer.stats()
+        self.assertEqual(stats['hits'], requests_made)
+        self.assertEqual(stats['misses'], 0)
+
+    def test_latency_bandwidth_and_missing_pages(self):
+        self.record()
+        replayer = Replayer(self.path, latency=0.05, bandwidth=1_000_000)
+        session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=fast_scheduler(), transport=replayer)
+        url = next(entry['url'] for entry in replayer.archive.entries.values() if entry['status'] == 200)
+
+        start = time.perf_counter()
+        response = session.get(url)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05 + len(response.content) / 1_000_000)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(session.get('https://smartbuy-me.com/products/not-recorded').status_code, 404)
+        self.assertEqual(replayer.stats()['misses'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
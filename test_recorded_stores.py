@@ -0,0 +1,55 @@
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from benchmarks.bench_offline import PARSERS
+from benchmarks.fixture_server import FixtureAdapter, FixtureServer
+from benchmarks.recorded_stores import RecordedStoreServer, load_manifest, record, recorded_pages, recorded_session
+from rate_limiter import PolitenessScheduler
+import run_spiders
+from run_spiders import RunSpiders
+
+
+class RecordedStoresTest(unittest.TestCase):
+    def setUp(self):
+        self.server = RecordedStoreServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_every_recorded_page_is_served_back(self):
+        session = recorded_session(self.server)
+        for entry in load_manifest()['pages']:
+            response = session.get(entry['url'])
+            self.assertEqual(response.status_code, entry['status'], entry['url'])
+        self.assertEqual({entry['store'] for entry in load_manifest()['pages']}, {'BMS', 'Diamond Star', 'LG vision', 'Smart Buy', 'Leaders'})
+
+    def test_parsers_read_the_recorded_pages(self):
+        for store, kind, url, body in recorded_pages(kind='product'):
+            if store in PARSERS:
+                product = PARSERS[store](url, body)
+                self.assertNotEqual(product['Title'], 'N/A', url)
+                self.assertNotEqual(product['Price'], 'N/A', url)
+
+    def test_crawl_of_the_recorded_query(self):
+        products = []
+        with mock.patch.object(run_spiders, 'get_shared_cache') as shared_cache:
+            RunSpiders(load_manifest()['query'], sink=products.append, session=recorded_session(self.server))
+        shared_cache.assert_not_called()  # The page cache belongs to RunSpiders' own session
+        crawled = [url for store, _, url, _ in recorded_pages(kind='product') if store != 'Leaders']  # RunSpiders does not crawl Leaders
+        self.assertEqual(sorted(product['Product URL'] for product in products), sorted(crawled))
+
+    def test_recording_matches_the_committed_pages(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with FixtureServer(latency=0, pages=2, per_page=3, chrome=True) as server:
+                manifest = record(FixtureAdapter(server.base_url), self.server.manifest['source'], fixtures_dir=tmp_dir,
+                                  scheduler=PolitenessScheduler(limits={}, default_rate=1000))
+            self.assertEqual(manifest['pages'], load_manifest()['pages'])
+            self.assertEqual(recorded_pages(tmp_dir), recorded_pages())
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+import pandas as pd
+from flask import Flask
+from benchmarks.fixture_server import FixtureServer, route_stores_to
+from database_setup import db, Product, upgrade_schema
+from data_processing import clean_frame, normalize_columns, save_products
+from rate_limiter import PolitenessScheduler
+from recrawl import RecrawlState
+from run_spiders import create_session
+from Spiders.SmartBuy_Spider import CrawlSmartBuy
+
+
+class IncrementalRecrawlTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FixtureServer(latency=0, pages=1, per_page=6).start()
+        session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=PolitenessScheduler(default_rate=1000))
+        self.session = route_stores_to(session, self.server.base_url)
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.tmp_dir, 'products.db')}"
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        upgrade_schema()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+        shutil.rmtree(self.tmp_dir)
+        self.server.stop()
+
+    def crawl(self, max_age):
+        state = RecrawlState.load(max_age)
+        products = []
+        CrawlSmartBuy('tv', 1, self.session, 4, sink=products.append, recrawl=state.for_store('CrawlSmartBuy'))
+        if products:
+            save_products(clean_frame(normalize_columns(pd.DataFrame(products)), 'tv'))
+        return state, products
+
+    def test_fresh_and_unchanged_pages_are_reused(self):
+        state, products = self.crawl(max_age=3600)
+        self.assertEqual(len(products), 6)
+        self.assertEqual(state.counts()['CrawlSmartBuy'], {'fetched': 6, 'skipped': 0, 'unchanged': 0})
+        self.assertEqual(Product.query.filter(Product.content_hash.isnot(None)).count(), 6)
+
+        # Everything was just scraped, so no product page is requested
+        requests = len(self.server.request_log)
+        state, products = self.crawl(max_age=3600)
+        self.assertEqual(products, [])
+        self.assertEqual(state.counts()['CrawlSmartBuy'], {'fetched': 0, 'skipped': 6, 'unchanged': 0})
+        self.assertEqual(len(self.server.request_log), requests + 1)  # The listing page only
+
+        # Past the max age pages are fetched again, but only a changed one is parsed and saved
+        changed = Product.query.order_by(Product.id).first()
+        Product.query.update({Product.timestamp: datetime(2024, 1, 1)})
+        Product.query.filter_by(id=changed.id).update({Product.content_hash: 'outdated', Product.timestamp: datetime(2024, 1, 1)})
+        db.session.commit()
+        state, products = self.crawl(max_age=3600)
+        self.assertEqual([product['Product URL'] for product in products], [changed.product_url])
+        self.assertEqual(state.counts()['CrawlSmartBuy'], {'fetched': 6, 'skipped': 0, 'unchanged': 5})
+        self.assertNotEqual(db.session.get(Product, changed.id).content_hash, 'outdated')
+
+        # Reused products are listed under the new query
+        self.assertEqual(state.touch('Smart TV'), 5)
+        self.assertEqual(Product.query.filter_by(search_query='smart tv').count(), 5)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask, Response, jsonify, request
+from app import create_app, init_database
+from database_setup import db, Product, products_stamp
+from response_cache import ResponseCache, mark_changed
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = 0
+        self.cache = ResponseCache(max_entries=2)
+        test_app = Flask(__name__)
+
+        @test_app.route('/items')
+        @self.cache.cached
+        def items():
+            self.calls += 1
+            if request.args.get('missing'):
+                return jsonify({"status": "error"}), 404
+            if request.args.get('stream'):
+                return Response(iter(['[', ']']), mimetype='application/json')
+            return jsonify({"page": request.args.get('page'), "calls": self.calls})
+
+        self.client = test_app.test_client()
+
+    def test_hit_etag_and_not_modified(self):
+        first = self.client.get('/items?page=1')
+        second = self.client.get('/items?page=1')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(first.json, second.json)
+        self.assertEqual(first.headers['ETag'], second.headers['ETag'])
+        self.assertFalse(first.headers['ETag'].startswith('W/'))
+
+        revalidated = self.client.get('/items?page=1', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.data, b'')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.cache.stats()['not_modified'], 1)
+
+    def test_invalidate_bumps_version(self):
+        etag = self.client.get('/items?page=1').headers['ETag']
+        self.cache.invalidate()
+        response = self.client.get('/items?page=1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['calls'], 2)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_lru_and_uncacheable_responses(self):
+        for page in ('1', '2', '3'):
+            self.client.get(f'/items?page={page}')
+        self.assertEqual(self.cache.stats()['entries'], 2)
+        self.client.get('/items?page=1')  # Evicted as least recently used
+        self.assertEqual(self.calls, 4)
+
+        for _ in range(2):
+            self.client.get('/items?missing=1')
+            self.client.get('/items?stream=1')
+        self.assertEqual(self.calls, 8)
+
+
+class ProductAPICacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.api = create_app(f"sqlite:///{os.path.join(self.tmp_dir, 'products.db')}")
+        init_database(self.api)
+        with self.api.app_context():
+            product = Product(title='Cached Tv', product_url='https://store/cached-tv')
+            db.session.add(product)
+            db.session.commit()
+            self.product_id = product.id
+        self.app = self.api.test_client()
+        self.app.testing = True
+
+    def tearDown(self):
+        with self.api.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_writes_invalidate_reads(self):
+        before = self.app.get('/api/saved_products')
+        self.assertEqual(self.app.get('/api/saved_products', headers={'If-None-Match': before.headers['ETag']}).status_code, 304)
+
+        self.app.post('/api/save_product', json={'id': self.product_id})
+        after = self.app.get('/api/saved_products', headers={'If-None-Match': before.headers['ETag']})
+        self.assertEqual(after.status_code, 200)
+        self.assertIn(self.product_id, [product['id'] for product in after.json])
+
+        self.app.delete(f'/api/delete_saved_product/{self.product_id}')
+        self.assertNotIn(self.product_id, [product['id'] for product in self.app.get('/api/saved_products').json])
+
+    def test_writes_of_other_processes_invalidate_reads(self):
+        before = self.app.get('/api/products')
+        with self.api.app_context():
+            # What a crawl worker does: write the products, then touch the stamp next to the database
+            db.session.add(Product(title='Crawled Tv', product_url='https://store/crawled-tv'))
+            db.session.commit()
+            self.assertEqual(self.app.get('/api/products').json, before.json)  # Not marked yet
+            mark_changed(products_stamp())
+        after = self.app.get('/api/products', headers={'If-None-Match': before.headers['ETag']})
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual([product['title'] for product in after.json], ['Cached Tv', 'Crawled Tv'])
+
+    def test_apps_on_other_databases_keep_their_own_responses(self):
+        cached = self.app.get('/api/products').json
+        other = create_app(f"sqlite:///{os.path.join(self.tmp_dir, 'other.db')}")
+        init_database(other)
+        try:
+            with other.app_context():
+                db.session.add(Product(title='Other Tv', product_url='https://store/other-tv'))
+                db.session.commit()
+            self.assertEqual([product['title'] for product in other.test_client().get('/api/products').json], ['Other Tv'])
+            self.assertEqual(self.app.get('/api/products').json, cached)
+        finally:
+            with other.app_context():
+                db.session.remove()
+                db.engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from flask import Flask
+from benchmarks.fixture_server import FixtureServer, route_stores_to
+from database_setup import db, Product, JobProduct, upgrade_schema
+from pipeline import run_pipeline
+from rate_limiter import PolitenessScheduler
+from result_sets import filter_job_results, release_products
+from run_spiders import create_session
+
+QUERIES = {'job-tv': 'Smart TV', 'job-fridge': 'fridge', 'job-oven': 'oven'}
+PRODUCTS_PER_JOB = 4 * 2 * 5  # Stores run by RunSpiders x listing pages x products per page
+
+
+class ConcurrentJobsTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FixtureServer(latency=0.01, pages=2, per_page=5, per_query=True).start()
+        session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=PolitenessScheduler(limits={}, default_rate=1000, default_max_in_flight=16))
+        self.session = route_stores_to(session, self.server.base_url)
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.tmp_dir, 'products.db')}"
+        db.init_app(self.app)
+        # The pipeline saves through the data_processing app; point it at the temporary database
+        self.patches = [mock.patch('pipeline.app', self.app), mock.patch('data_processing.app', self.app)]
+        for patch in self.patches:
+            patch.start()
+        with self.app.app_context():
+            db.create_all()
+            upgrade_schema()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.tmp_dir)
+        self.server.stop()
+
+    def run_job(self, job_id, errors):
+        try:
+            with self.app.app_context():
+                release_products(list(QUERIES) + ['job-late'])  # What a starting job does instead of wiping the table
+            run_pipeline(QUERIES[job_id], session=self.session, job_id=job_id)
+        except Exception as e:
+            errors.append(e)
+
+    def test_parallel_jobs_keep_their_own_results(self):
+        with self.app.app_context():
+            db.session.add(Product(title='Old result', product_url='https://old/1'))
+            db.session.add(Product(title='Saved', product_url='https://old/2', saved=True))
+            db.session.commit()
+
+        errors = []
+        threads = [threading.Thread(target=self.run_job, args=(job_id, errors)) for job_id in QUERIES]
+        for thread in threads:
+            thread.start()
+        # Another job starting while the others are still crawling
+        threads[0].join(0.3)
+        with self.app.app_context():
+            release_products(list(QUERIES) + ['job-late'])
+        for thread in threads:
+            thread.join(60)
+        self.assertEqual(errors, [])
+
+        with self.app.app_context():
+            for job_id, query in QUERIES.items():
+                urls = [p.product_url for p in filter_job_results(Product.query, job_id)]
+                slug = ''.join(c for c in query.lower() if c.isalnum())
+                self.assertEqual(len(urls), PRODUCTS_PER_JOB, job_id)
+                self.assertTrue(all(f'-{slug}-p' in url for url in urls), job_id)
+            self.assertEqual(Product.query.filter_by(product_url='https://old/1').count(), 0)
+            self.assertEqual(Product.query.filter_by(saved=True).count(), 1)
+            self.assertEqual(Product.query.count(), len(QUERIES) * PRODUCTS_PER_JOB + 1)
+
+            # Once a job is forgotten its unsaved products can go
+            release_products(['job-tv', 'job-fridge'])
+            self.assertEqual(JobProduct.query.filter_by(job_id='job-oven').count(), 0)
+            self.assertEqual(Product.query.count(), 2 * PRODUCTS_PER_JOB + 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from flask import Flask
+from database_setup import db, Product, upgrade_schema
+from data_processing import save_products
+from search_index import apply_search, build_match_query
+
+PRODUCTS = [
+    ('Samsung 55" Crystal Uhd Tv', 'Ua55Du7000', 'Samsung', 'Television'),
+    ('Lg Oled Evo 65 Inch', 'Oled65C3', 'LG', 'Television'),
+    ('Conti Rice Cooker', 'Epc08A001', 'Conti', 'Kitchen Appliances'),
+    ('Samsung Galaxy A05S', 'Sm-A057', 'Samsung', 'Mobiles'),
+]
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(self.tmp_dir, 'products.db')}"
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        upgrade_schema()
+        save_products(pd.DataFrame([
+            {'title': title, 'model': model, 'brand': brand, 'category': category, 'price': 1.0,
+             'product_url': f'https://store/p/{i}', 'image_url': 'N/A', 'store': 'Smart Buy', 'search_query': 'tv'}
+            for i, (title, model, brand, category) in enumerate(PRODUCTS)
+        ]))
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+        shutil.rmtree(self.tmp_dir)
+
+    def search(self, search_text):
+        return [product.title for product in apply_search(Product.query, Product, search_text).all()]
+
+    def test_prefix_and_all_words(self):
+        self.assertEqual(self.search('sams galaxy'), ['Samsung Galaxy A05S'])
+        self.assertEqual(self.search('oled65'), ['Lg Oled Evo 65 Inch'])
+        self.assertEqual(self.search('kitchen'), ['Conti Rice Cooker'])
+        self.assertEqual(self.search('+++'), [])
+
+    def test_model_matches_rank_first(self):
+        results = self.search('samsung')
+        self.assertEqual(len(results), 2)
+        self.assertEqual(self.search('ua55du')[0], 'Samsung 55" Crystal Uhd Tv')
+
+    def test_index_follows_upserts_and_deletes(self):
+        save_products(pd.DataFrame([{
+            'title': 'Hisense Laser Tv', 'model': 'L9H', 'brand': 'Hisense', 'category': 'Television',
+            'price': 1.0, 'product_url': 'https://store/p/2', 'image_url': 'N/A', 'store': 'Smart Buy', 'search_query': 'tv',
+        }]))
+        self.assertEqual(self.search('rice'), [])
+        self.assertEqual(self.search('hisense'), ['Hisense Laser Tv'])
+
+        Product.query.filter_by(product_url='https://store/p/2').delete()
+        db.session.commit()
+        self.assertEqual(self.search('hisense'), [])
+
+    def test_build_match_query(self):
+        self.assertEqual(build_match_query('Samsung "55'), '"samsung"* "55"*')
+        self.assertEqual(build_match_query('  '), '')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
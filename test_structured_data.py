@@ -0,0 +1,66 @@
+import unittest
+from unittest import mock
+import Spiders.base_spider as base_spider
+from structured_data import SCHEMA_PATHS, find_product, read_path, schema_price
+from Spiders.DiamondStar_Spider import parse_product_details_diamondstar
+from Spiders.LGvision_Spider import parse_product_details_newvision
+
+GRAPH_PAGE = b'''<html><head><script type="application/ld+json">{not json</script>
+<script type='application/ld+json'>{"@context": "https://schema.org", "@graph": [{"@type": "WebPage", "name": "Page"},
+{"@type": ["Product"], "name": "Conti Oven 60", "sku": "CO-60", "image": ["https://diamondstarjo.com/oven.jpg"],
+ "offers": {"@type": "Offer", "price": 235.5, "priceCurrency": "JOD"}}]}</script></head><body></body></html>'''
+
+MICRODATA_PAGE = b'''<html><body><div itemscope itemtype="http://schema.org/Product">
+<h1 itemprop="name">LG OLED &amp; Soundbar</h1><img itemprop="image" src="https://newvision.jo/oled.jpg">
+<div itemprop="brand" itemscope itemtype="http://schema.org/Brand"><meta itemprop="name" content="LG"></div>
+<span itemprop="sku">OLED55</span><div itemprop="offers" itemscope itemtype="http://schema.org/Offer">
+<meta itemprop="price" content="899.00"><meta itemprop="priceCurrency" content="JOD"></div></div></body></html>'''
+
+
+# A product page whose JSON-LD price differs from the one on the page
+def priced_page(json_ld_price):
+    return (b'<html><head><script type="application/ld+json">{"@type": "Product", "name": "OLED 55", "sku": "OLED55", '
+            b'"offers": [{"price": %s}]}</script></head><body><p class="price pewc-main-price"><span class="woocommerce-Price-amount amount">'
+            b'1,520.00 JOD</span></p><p class="price"><span class="woocommerce-Price-amount amount">1,520.00 JD</span></p></body></html>') % json_ld_price
+
+
+class StructuredDataTest(unittest.TestCase):
+    def test_json_ld_product_in_a_graph(self):
+        product = find_product(GRAPH_PAGE)
+        record = {field: read_path(product, paths) for field, paths in SCHEMA_PATHS.items()}
+        self.assertEqual(record, {'Title': 'Conti Oven 60', 'Model': 'CO-60', 'Brand': None, 'Category': None,
+                                  'Price': 235.5, 'Image URL': 'https://diamondstarjo.com/oven.jpg'})
+
+    def test_microdata(self):
+        product = find_product(MICRODATA_PAGE)
+        self.assertEqual(product['name'], 'LG OLED & Soundbar')
+        self.assertEqual(read_path(product, SCHEMA_PATHS['Price']), '899.00')
+        self.assertEqual(read_path(product, SCHEMA_PATHS['Image URL']), 'https://newvision.jo/oled.jpg')
+        self.assertEqual(read_path(product, SCHEMA_PATHS['Model']), 'OLED55')
+        self.assertIsNone(find_product(b'<html><body><h1>No data</h1></body></html>'))
+
+    def test_pages_are_only_parsed_for_missing_fields(self):
+        with mock.patch.object(base_spider, 'parse_html', wraps=base_spider.parse_html) as soup:
+            product = parse_product_details_diamondstar('https://diamondstarjo.com/product/oven/', GRAPH_PAGE)
+            self.assertEqual(soup.call_count, 1)  # The category is not in the JSON-LD
+            self.assertEqual((product['Title'], product['Model'], product['Price'], product['Category']), ('Conti Oven 60', 'CO-60', '235', 'N/A'))
+
+            complete = GRAPH_PAGE.replace(b'"sku"', b'"category": "Ovens", "sku"')
+            self.assertEqual(parse_product_details_diamondstar('https://diamondstarjo.com/product/oven/', complete)['Category'], 'Ovens')
+            self.assertEqual(soup.call_count, 1)
+
+    def test_json_ld_prices_are_read_as_numbers(self):
+        self.assertEqual([schema_price(price) for price in ('493.00', 249.9, '1,299.50', 500, '', ' ', 'N/A')],
+                         ['493', '249.9', '1299.5', '500', None, None, None])
+        self.assertEqual(parse_product_details_newvision('https://newvision.jo/en/product/oled/', priced_page(b'"493.00"'))['Price'], '493')
+        self.assertEqual(parse_product_details_diamondstar('https://diamondstarjo.com/product/oled/', priced_page(b'"1,299.50"'))['Price'], '1299')
+
+    def test_empty_json_ld_price_is_read_from_the_page(self):
+        for price in (b'""', b'" "'):
+            self.assertEqual(parse_product_details_newvision('https://newvision.jo/en/product/oled/', priced_page(price))['Price'], '1520')
+            product = parse_product_details_diamondstar('https://diamondstarjo.com/product/oled/', priced_page(price))
+            self.assertEqual((product['Title'], product['Price']), ('OLED 55', '1,520'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,49 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from benchmarks.fixture_server import FixtureServer
+from rate_limiter import PolitenessScheduler
+from run_spiders import create_session
+from transport import PooledAdapter, transport_stats
+
+
+class TransportTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FixtureServer(latency=0.01, chrome=True, compress=True).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def product_url(self, i):
+        return f'{self.server.base_url}/smartbuy-me.com/products/transport-{i}'
+
+    def test_pool_per_host_is_reused(self):
+        scheduler = PolitenessScheduler(limits={'127.0.0.1': (1000, 4)})
+        session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=scheduler)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(lambda i: session.get(self.product_url(i)), range(40)))
+
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        self.assertLessEqual(self.server.connections, 4)
+        (host, stats), = session.get_adapter(self.server.base_url).adapter.stats().items()
+        self.assertEqual((host, stats['pool_size'], stats['requests']), (self.server.base_url, 4, 40))
+        self.assertEqual(transport_stats(session), {'requests': 40, 'connections': stats['connections'], 'reused': 40 - stats['connections']})
+
+    def test_compressed_bodies(self):
+        session = create_session(retries=0, backoff_factor=0, status_forcelist=[], scheduler=PolitenessScheduler(limits={}))
+        response = session.get(self.product_url(0))
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn(b'application/ld+json', response.content)
+        self.assertLess(self.server.bytes_sent * 3, len(response.content))
+
+    def test_requests_get_a_default_timeout(self):
+        self.server.latency = 0.5
+        session = requests.Session()
+        session.mount('http://', PooledAdapter(timeout=(1.0, 0.1)))
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            session.get(self.product_url(0))
+        self.assertEqual(session.get(self.product_url(0), timeout=2).status_code, 200)  # An explicit timeout wins
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+from url_dedup import BloomFilter, UrlDeduplicator, canonicalize_url, clean_url
+
+
+class CanonicalizeTest(unittest.TestCase):
+    def test_tracking_and_variant_params_are_dropped(self):
+        self.assertEqual(
+            clean_url('https://SmartBuy-me.com/products/tv?_pos=1&_sid=ab12&_ss=r&variant=4411#reviews'),
+            'https://smartbuy-me.com/products/tv',
+        )
+        self.assertEqual(
+            clean_url('https://diamondstarjo.com/product/oven/?utm_source=fb&attribute_pa_color=red&lang=ar'),
+            'https://diamondstarjo.com/product/oven/?lang=ar',  # The trailing slash is kept, the store redirects without it
+        )
+
+    def test_links_to_the_same_page_share_a_key(self):
+        key = canonicalize_url('https://newvision.jo/product/tv')
+        for url in ['https://www.newvision.jo/product/tv/', 'https://newvision.jo:443/product/tv?gclid=x', 'HTTPS://NEWVISION.JO/product/tv#top']:
+            self.assertEqual(canonicalize_url(url), key, url)
+        self.assertEqual(canonicalize_url('https://x.jo/s?b=2&a=1'), canonicalize_url('https://x.jo/s?a=1&b=2'))
+        self.assertNotEqual(canonicalize_url('https://x.jo/s?a=1'), canonicalize_url('https://x.jo/s?a=2'))
+
+
+class DeduplicatorTest(unittest.TestCase):
+    def test_duplicates_are_skipped_across_pages_and_stores(self):
+        dedup = UrlDeduplicator()
+        bms = dedup.for_store('CrawlBMS')
+        self.assertEqual(bms.select(['https://bmsmena.com/products/a?_pos=1', 'https://bmsmena.com/products/b']),
+                         ['https://bmsmena.com/products/a', 'https://bmsmena.com/products/b'])
+        self.assertEqual(bms.select(['https://bmsmena.com/products/a?_pos=7', 'https://bmsmena.com/products/c']),
+                         ['https://bmsmena.com/products/c'])
+        self.assertEqual(dedup.for_store('CrawlSmartBuy').select(['https://bmsmena.com/products/b/']), [])
+
+        counts = dedup.counts()
+        self.assertEqual(counts['CrawlBMS'], {'urls': 3, 'duplicates': 1})
+        self.assertEqual(counts['CrawlSmartBuy'], {'urls': 0, 'duplicates': 1})
+        self.assertEqual(counts['total'], {'urls': 3, 'duplicates': 2})
+
+    def test_scopes_keep_jobs_apart(self):
+        bloom = BloomFilter(capacity=1000)
+        self.assertEqual(len(UrlDeduplicator(bloom, scope='job-1').for_store('s').select(['https://x.jo/p/1'])), 1)
+        self.assertEqual(len(UrlDeduplicator(bloom, scope='job-1').for_store('s').select(['https://x.jo/p/1'])), 0)
+        self.assertEqual(len(UrlDeduplicator(bloom, scope='job-2').for_store('s').select(['https://x.jo/p/1'])), 1)
+
+
+class BloomFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_saved_filter_remembers_its_keys(self):
+        path = os.path.join(self.tmp_dir, 'seen.bloom')
+        bloom = BloomFilter.open(path, capacity=5000, error_rate=0.001)
+        for i in range(5000):
+            bloom.add(f'https://x.jo/p/{i}')
+        bloom.save()
+        self.assertFalse(bloom.changed)
+
+        loaded = BloomFilter.open(path)  # The size stored in the file wins over the default capacity
+        self.assertEqual((loaded.size, loaded.hashes), (bloom.size, bloom.hashes))
+        self.assertTrue(all(f'https://x.jo/p/{i}' in loaded for i in range(5000)))
+        false_positives = sum(f'https://x.jo/q/{i}' in loaded for i in range(10000))
+        self.assertLess(false_positives, 50)  # About 10 expected at a 0.1% error rate
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
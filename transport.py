@@ -0,0 +1,75 @@
+import threading
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+# HTTP transport every spider session goes through. Each store host gets its own keep-alive connection
+# pool sized to the number of requests the politeness scheduler lets run against it at once, so threads
+# never wait for a connection and no connection is opened only to be thrown away. Requests without an
+# explicit timeout get DEFAULT_TIMEOUT, and bodies are asked for gzip/deflate compressed.
+
+DEFAULT_TIMEOUT = (5.0, 30.0)  # Seconds to connect, seconds between bytes of the answer
+DEFAULT_POOL_SIZE = 4  # Connections kept per host when no size is given for it
+ACCEPT_ENCODING = 'gzip, deflate'
+
+
+def pool_key(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc.lower()}'
+
+
+# Adapter with one connection pool per host. pool_size(url) gives the pool size for the url's host;
+# other arguments (max_retries, ...) are passed to the adapter of every host.
+class PooledAdapter(HTTPAdapter):
+    def __init__(self, pool_size=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.pool_size = pool_size or (lambda url: DEFAULT_POOL_SIZE)
+        self.timeout = timeout
+        self.adapter_kwargs = kwargs
+        self.adapters = {}
+        self.lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def host_adapter(self, url):
+        key = pool_key(url)
+        with self.lock:
+            adapter = self.adapters.get(key)
+            if adapter is None:
+                size = max(1, self.pool_size(url))
+                adapter = self.adapters[key] = HTTPAdapter(pool_connections=1, pool_maxsize=size, **self.adapter_kwargs)
+            return adapter
+
+    def send(self, request, timeout=None, **kwargs):
+        return self.host_adapter(request.url).send(request, timeout=self.timeout if timeout is None else timeout, **kwargs)
+
+    # Per host: pool size, requests sent, connections opened and requests that reused an open connection
+    def stats(self):
+        with self.lock:
+            adapters = dict(self.adapters)
+        stats = {}
+        for key, adapter in adapters.items():
+            entry = stats[key] = {'pool_size': adapter._pool_maxsize, 'requests': 0, 'connections': 0}
+            pools = adapter.poolmanager.pools
+            for pool_id in pools.keys():
+                pool = pools.get(pool_id)
+                if pool is not None:
+                    entry['requests'] += pool.num_requests
+                    entry['connections'] += pool.num_connections
+            entry['reused'] = max(0, entry['requests'] - entry['connections'])
+        return stats
+
+    def close(self):
+        with self.lock:
+            adapters, self.adapters = list(self.adapters.values()), {}
+        for adapter in adapters:
+            adapter.close()
+        super().close()
+
+
+# Function to add up the connection stats of every pooled adapter mounted on a session
+def transport_stats(session):
+    totals = {'requests': 0, 'connections': 0, 'reused': 0}
+    for adapter in {id(adapter): adapter for adapter in session.adapters.values()}.values():
+        if isinstance(adapter, PooledAdapter):
+            for entry in adapter.stats().values():
+                for name in totals:
+                    totals[name] += entry[name]
+    return totals
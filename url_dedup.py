@@ -0,0 +1,156 @@
+import hashlib
+import math
+import os
+import struct
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# URL normalization and deduplication for the crawl frontier. Links are cleaned of tracking and variant
+# parameters before they are fetched, and a product that shows up on several result pages or at several
+# places in one crawl is only fetched once. Dedup keys also ignore trailing slashes, "www." and parameter order.
+
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'yclid', 'srsltid', 'mc_cid', 'mc_eid', 'ref', '_pos', '_sid', '_ss', '_psq', '_v'}
+TRACKING_PREFIXES = ('utm_',)
+VARIANT_PARAMS = {'variant', 'variation_id'}  # Shopify and WooCommerce variants are the same product page
+VARIANT_PREFIXES = ('attribute_',)
+
+DEFAULT_CAPACITY = 1000000  # URLs a Bloom filter is sized for
+DEFAULT_ERROR_RATE = 0.0001  # Chance that a new URL is taken for one already seen
+BLOOM_HEADER = struct.Struct('<4sQI')  # Magic, number of bits, number of hashes
+BLOOM_MAGIC = b'SSBF'
+
+
+def _kept_params(query):
+    return [
+        (name, value) for name, value in parse_qsl(query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS | VARIANT_PARAMS
+        and not name.lower().startswith(TRACKING_PREFIXES + VARIANT_PREFIXES)
+    ]
+
+
+# Function to clean a link before it is fetched: no tracking or variant parameters, no fragment, lower-case host
+def clean_url(url):
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', urlencode(_kept_params(parts.query)), ''))
+
+
+# Function to get the key two links to the same page share ('https://www.x.com/p/1/?utm_source=a' -> 'https://x.com/p/1')
+def canonicalize_url(url):
+    parts = urlsplit(clean_url(url))
+    host = parts.netloc[4:] if parts.netloc.startswith('www.') else parts.netloc
+    if parts.scheme == 'https' and host.endswith(':443') or parts.scheme == 'http' and host.endswith(':80'):
+        host = host.rsplit(':', 1)[0]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme, host, path, urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True))), ''))
+
+
+# Fixed-size set of strings with no false negatives and a small false positive rate; can be saved to a file
+class BloomFilter:
+    def __init__(self, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE, path=None):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))  # Bits
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.path = path
+        self.changed = False  # Keys were added since the filter was loaded or saved
+        self.lock = threading.Lock()
+
+    # Function to load a filter saved by save(), or start an empty one that will be saved there
+    @classmethod
+    def open(cls, path, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        bloom = cls(capacity, error_rate, path)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                magic, size, hashes = BLOOM_HEADER.unpack(f.read(BLOOM_HEADER.size))
+                if magic != BLOOM_MAGIC:
+                    raise ValueError(f'{path} is not a Bloom filter file')
+                bloom.size, bloom.hashes, bloom.bits = size, hashes, bytearray(f.read())
+        return bloom
+
+    # Bit positions from two halves of one digest (Kirsch-Mitzenmacher double hashing)
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    # Function to add a key; returns False when it was (probably) there already
+    def add(self, key):
+        added = False
+        with self.lock:
+            for position in self._positions(key):
+                byte, bit = divmod(position, 8)
+                if not self.bits[byte] >> bit & 1:
+                    self.bits[byte] |= 1 << bit
+                    added = True
+            self.changed = self.changed or added
+        return added
+
+    def __contains__(self, key):
+        return all(self.bits[position // 8] >> position % 8 & 1 for position in self._positions(key))
+
+    def save(self, path=None):
+        path = path or self.path
+        with self.lock:
+            with open(path + '.tmp', 'wb') as f:
+                f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, self.size, self.hashes))
+                f.write(self.bits)
+            os.replace(path + '.tmp', path)
+            self.changed = False
+
+
+# URLs seen during one crawl. Keys are kept in a set, or in a Bloom filter when one is given so that a
+# long-running worker uses fixed memory and keeps what it has seen across restarts.
+# scope is prefixed to every key, so one Bloom filter can serve several crawl jobs.
+class UrlDeduplicator:
+    def __init__(self, bloom=None, scope=''):
+        self.bloom = bloom
+        self.scope = scope
+        self.seen = set()
+        self.stores = {}
+        self.lock = threading.Lock()
+
+    def for_store(self, store):
+        with self.lock:
+            if store not in self.stores:
+                self.stores[store] = StoreDedup(self, store)
+            return self.stores[store]
+
+    # Function to mark a URL as seen; returns False when it was seen before
+    def add(self, url):
+        key = f'{self.scope} {canonicalize_url(url)}' if self.scope else canonicalize_url(url)
+        if self.bloom is not None:
+            return self.bloom.add(key)
+        with self.lock:
+            if key in self.seen:
+                return False
+            self.seen.add(key)
+            return True
+
+    def counts(self):
+        with self.lock:
+            stores = {store: dedup.counts() for store, dedup in self.stores.items()}
+        return dict(stores, total={
+            'urls': sum(counts['urls'] for counts in stores.values()),
+            'duplicates': sum(counts['duplicates'] for counts in stores.values()),
+        })
+
+
+# One store's view of the deduplicator, with its URL and duplicate counters
+class StoreDedup:
+    def __init__(self, dedup, store):
+        self.dedup = dedup
+        self.store = store
+        self.urls = 0
+        self.duplicates = 0
+        self.lock = threading.Lock()
+
+    # Function to keep the URLs not seen before in this crawl, cleaned and in their original order
+    def select(self, urls):
+        selected = [clean_url(url) for url in urls if url and url.strip() and self.dedup.add(url)]
+        with self.lock:
+            self.urls += len(selected)
+            self.duplicates += len(urls) - len(selected)
+        return selected
+
+    def counts(self):
+        with self.lock:
+            return {'urls': self.urls, 'duplicates': self.duplicates}